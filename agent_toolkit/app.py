@@ -3,6 +3,7 @@
 from flask import Flask, request, make_response, redirect, url_for
 
 import config
+import outbox
 from models.calls import init_db
 from models.scoreboard import init_db as init_scoreboard_db
 
@@ -31,6 +32,12 @@ app.register_blueprint(underwriting_bp, url_prefix="/underwriting")
 app.register_blueprint(scoreboard_bp)
 
 
+@app.before_request
+def _start_outbox():
+    # Picks up jobs queued before a restart even if nothing new is enqueued.
+    outbox.worker.start()
+
+
 # ---------------------------------------------------------------------------
 # Theme: set via /<agent_slug>, detected by hostname, stored in cookie
 # ---------------------------------------------------------------------------
@@ -0,0 +1,101 @@
+"""Benchmark /api/suggest latency on a large synthetic calls.db.
+
+Usage (from the agent_toolkit directory):
+    python benchmarks/bench_suggest.py [--calls 100000] [--runs 200]
+
+Compares the contacts_fts prefix lookup used by get_contact_suggestions()
+with the LIKE '%q%' scan over calls it replaced.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+import db  # noqa: E402
+import timeutil  # noqa: E402
+from models import calls  # noqa: E402
+
+FIRST = ["John", "Jane", "Maria", "Jose", "Mike", "Sarah", "David", "Linda",
+         "Chris", "Karen", "Kevin", "Nancy", "Brian", "Lisa", "Mark", "Amy"]
+LAST = ["Smith", "Johnson", "Garcia", "Brown", "Nguyen", "Lopez", "Miller",
+        "Davis", "Wilson", "Moore", "Taylor", "Clark", "Lewis", "Young"]
+QUERIES = ["jo", "mar", "smi", "garc", "714", "335", "1412", "kev mo", "(949) 5"]
+
+
+def _legacy_suggest(query, limit=8):
+    with calls.get_db() as conn:
+        return conn.execute(
+            """SELECT contact_name, phone_number, MAX(call_datetime) AS last_call
+               FROM calls
+               WHERE contact_name LIKE ? OR phone_number LIKE ?
+               GROUP BY contact_name, phone_number
+               ORDER BY last_call DESC LIMIT ?""",
+            (f"%{query}%", f"%{query}%", limit),
+        ).fetchall()
+
+
+def _seed(n):
+    rng = random.Random(42)
+    rows = []
+    for i in range(n):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)}{i % 500}"
+        phone = f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        at = datetime(2025, 1 + i % 12, 1 + i % 28, 9 + i % 8, i % 60)
+        rows.append((
+            rng.choice(config.AGENT_CHOICES or ["Agent"]), name, phone,
+            at.strftime(calls.CALL_DATETIME_FORMAT), timeutil.to_epoch(at),
+            at.strftime("%Y-%m-%d"),
+            rng.choice(config.DIRECTION_CHOICES), rng.choice(config.OUTCOME_CHOICES),
+            "Discussed final expense options, call back next week",
+        ))
+    with calls.get_db() as conn:
+        conn.executemany(
+            """INSERT INTO calls (agent_name, contact_name, phone_number, call_datetime,
+                                  call_ts, call_day, direction, outcome, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        conn.commit()
+    calls.rebuild_contacts()
+
+
+def _time(fn, runs):
+    samples = []
+    for i in range(runs):
+        q = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.CALLS_DB_PATH = Path(tmp) / "calls.db"
+        start = time.perf_counter()
+        _seed(args.calls)
+        print(f"Seeded {args.calls:,} calls in {time.perf_counter() - start:.1f}s")
+
+        for label, fn in (("contacts fts", calls.get_contact_suggestions),
+                          ("legacy LIKE", _legacy_suggest)):
+            p50, p99 = _time(fn, args.runs)
+            print(f"{label:13s}  p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark /contacts/<id>/timeline lookups on a large synthetic dataset.
+
+Usage (from the agent_toolkit directory):
+    python benchmarks/bench_timeline.py [--calls 500000] [--runs 500]
+
+Seeds calls.db with ``--calls`` calls spread over ~50k numbers, plus one
+referral and one scoreboard activity per 20 contacts, then times
+get_contact_timeline() for random contacts.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+import db  # noqa: E402
+import timeutil  # noqa: E402
+from models import calls, referrals, scoreboard  # noqa: E402
+from models.timeline import get_contact_timeline  # noqa: E402
+
+
+def _phone(i):
+    return f"(714) {200 + i // 10000:03d}-{i % 10000:04d}"
+
+
+def _seed(n):
+    rng = random.Random(42)
+    contacts = max(n // 10, 1)
+    rows = []
+    for i in range(n):
+        at = datetime(2025, 1 + i % 12, 1 + i % 28, 9 + i % 8, i % 60)
+        rows.append((
+            rng.choice(config.AGENT_CHOICES or ["Agent"]), f"Contact {i % contacts}",
+            _phone(i % contacts), at.strftime(calls.CALL_DATETIME_FORMAT),
+            timeutil.to_epoch(at), at.strftime("%Y-%m-%d"),
+            rng.choice(config.DIRECTION_CHOICES), rng.choice(config.OUTCOME_CHOICES),
+            "Discussed final expense options, call back next week",
+        ))
+    with calls.get_db() as conn:
+        conn.executemany(
+            """INSERT INTO calls (agent_name, contact_name, phone_number, call_datetime,
+                                  call_ts, call_day, direction, outcome, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        conn.commit()
+    calls.rebuild_contacts()
+
+    for i in range(0, contacts, 20):
+        referrals.add_referral("Referrer", f"Contact {i}", phone=_phone(i))
+        scoreboard.log_activity("Agent", "appointment", contact_phone=_phone(i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500_000)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.CALLS_DB_PATH = Path(tmp) / "calls.db"
+        config.REFERRALS_DB_PATH = Path(tmp) / "referrals.db"
+        config.SCOREBOARD_DB_PATH = Path(tmp) / "scoreboard.db"
+        start = time.perf_counter()
+        _seed(args.calls)
+        print(f"Seeded {args.calls:,} calls in {time.perf_counter() - start:.1f}s")
+
+        with calls.get_db() as conn:
+            ids = [r[0] for r in conn.execute("SELECT id FROM contacts")]
+        rng = random.Random(7)
+        samples = []
+        for _ in range(args.runs):
+            contact_id = rng.choice(ids)
+            start = time.perf_counter()
+            get_contact_timeline(contact_id)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"timeline  p50 {statistics.median(samples):7.2f} ms   p99 {p99:7.2f} ms")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
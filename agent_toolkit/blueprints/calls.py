@@ -1,22 +1,28 @@
 """Calls blueprint – leaderboard, call logging, history, GHL sync."""
 
-import threading
-from datetime import datetime
-
+import csv
+import io
 from flask import (
     Blueprint, render_template, request, redirect, url_for, flash, jsonify,
-    make_response,
+    make_response, Response,
 )
 
 import config
+import outbox
+import timeutil
 from models.calls import (
-    log_call as db_log_call, update_call, delete_call, get_call,
-    get_calls, get_stats, get_contact_suggestions, get_follow_up_dates,
+    record_call, record_calls_bulk, update_call, delete_call, get_call,
+    get_calls_page, iter_calls, get_stats, get_contact_suggestions,
+    get_follow_up_dates, find_contact, set_ghl_contact_id, get_contact_names,
 )
+from models.timeline import get_contact_timeline
 from calendar_integration import get_calendar_urls, generate_ics
 import ghl_integration
 from ghl_integration import upsert_contact, GHLError
+from live_scoreboard import broker
+from models.scoreboard import call_milestone
 from push import save_subscription
+from slack_notify import notify_milestone
 
 calls_bp = Blueprint("calls", __name__)
 
@@ -32,7 +38,7 @@ def leaderboard():
     return render_template(
         "leaderboard.html",
         stats=stats,
-        now=datetime.now(),
+        now=timeutil.now(),
         follow_up_dates=follow_up_dates,
         calendar_id=config.AGENT_CALENDAR_IDS.get(agent_pref, ""),
         calendar_type=config.AGENT_CALENDAR_TYPES.get(agent_pref, "google"),
@@ -42,6 +48,45 @@ def leaderboard():
     )
 
 
+# ---------------------------------------------------------------------------
+# GHL pipeline sync (queued in the outbox)
+# ---------------------------------------------------------------------------
+def _ghl_contact_id(name, phone):
+    """GHL contact id for a caller, upserting only people not synced before."""
+    local = find_contact(name, phone)
+    if local is not None and local["ghl_contact_id"]:
+        return local["ghl_contact_id"]
+    contact_id = ghl_integration.upsert_contact(name=name, phone=phone)
+    if local is not None:
+        set_ghl_contact_id(local["id"], contact_id)
+    return contact_id
+
+
+def _ghl_pipeline_sync(job):
+    """Outbox handler: move one contact to its mapped GHL pipeline stage."""
+    contact, phone, outcome = job["contact"], job["phone"], job["outcome"]
+    contact_id = _ghl_contact_id(contact, phone)
+    stage_id = config.GHL_STAGE_MAP.get(outcome)
+    if stage_id and config.GHL_PIPELINE_ID:
+        ghl_integration.upsert_opportunity(
+            contact_id=contact_id,
+            pipeline_id=config.GHL_PIPELINE_ID,
+            stage_id=stage_id,
+            name=f"{contact} — {outcome}",
+        )
+
+
+outbox.register("ghl", _ghl_pipeline_sync, concurrency=2)
+
+
+def _queue_ghl_sync(contacts):
+    """Queue a pipeline sync for each (contact, phone, outcome)."""
+    outbox.enqueue_many("ghl", [
+        {"contact": contact, "phone": phone, "outcome": outcome}
+        for contact, phone, outcome in contacts
+    ])
+
+
 # ---------------------------------------------------------------------------
 # Log a new call
 # ---------------------------------------------------------------------------
@@ -55,38 +100,27 @@ def log_call_route():
 
         outcome = request.form.get("outcome", "Other")
 
-        db_log_call(
+        _, call_total = record_call(
             agent_name=agent,
             contact_name=contact,
             phone_number=phone,
             call_datetime=request.form.get(
-                "call_datetime", datetime.now().strftime("%Y-%m-%d %H:%M")
+                "call_datetime", timeutil.now().strftime("%Y-%m-%d %H:%M")
             ),
             direction=request.form.get("direction", "Outbound"),
             outcome=outcome,
             notes=request.form.get("notes", "").strip(),
             follow_up_date=request.form.get("follow_up_date") or None,
         )
+        # Logged calls count on the scoreboard; push the new totals now.
+        broker.wake()
+        milestone = call_milestone(agent, call_total)
+        if milestone:
+            notify_milestone(agent, "call", milestone)
+            flash(f"🏆 MILESTONE! {agent} hit {milestone} calls all-time!", "success")
 
         if config.GHL_ENABLED and outcome in config.GHL_STAGE_MAP:
-            def _ghl_pipeline_sync():
-                try:
-                    contact_id = ghl_integration.upsert_contact(
-                        name=contact, phone=phone,
-                    )
-                    stage_id = config.GHL_STAGE_MAP.get(outcome)
-                    if stage_id and config.GHL_PIPELINE_ID:
-                        ghl_integration.upsert_opportunity(
-                            contact_id=contact_id,
-                            pipeline_id=config.GHL_PIPELINE_ID,
-                            stage_id=stage_id,
-                            name=f"{contact} — {outcome}",
-                        )
-                except Exception as e:
-                    print(f"[GHL] Background pipeline sync failed: {e}")
-
-            t = threading.Thread(target=_ghl_pipeline_sync, daemon=True)
-            t.start()
+            _queue_ghl_sync([(contact, phone, outcome)])
 
         follow_up = request.form.get("follow_up_date")
         if follow_up:
@@ -107,10 +141,145 @@ def log_call_route():
         "log.html",
         directions=config.DIRECTION_CHOICES,
         outcomes=config.OUTCOME_CHOICES,
-        now=datetime.now(),
+        now=timeutil.now(),
     )
 
 
+# ---------------------------------------------------------------------------
+# Bulk import (power dialer exports)
+# ---------------------------------------------------------------------------
+BULK_MAX_ROWS = 5000
+
+
+def _read_bulk_payload():
+    """Return the uploaded calls as a list of dicts (JSON array or CSV)."""
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get("calls")
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array of calls.")
+        return data
+    upload = request.files.get("file")
+    if upload:
+        text = upload.read().decode("utf-8-sig")
+    elif request.mimetype == "text/csv":
+        text = request.get_data(as_text=True)
+    else:
+        raise ValueError("Send a JSON array or a CSV file.")
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _validate_bulk_row(raw, default_agent):
+    """Normalize one uploaded call. Returns ``(row, error)``."""
+    if not isinstance(raw, dict):
+        return None, "not an object"
+
+    def get(key):
+        return str(raw.get(key) or "").strip()
+
+    row = {
+        "agent_name": default_agent or get("agent_name"),
+        "contact_name": get("contact_name"),
+        "phone_number": get("phone_number"),
+        "direction": get("direction") or "Outbound",
+        "outcome": get("outcome") or "Other",
+        "notes": get("notes"),
+        "follow_up_date": None,
+    }
+    if not row["agent_name"]:
+        return None, "agent_name is required"
+    if not row["contact_name"] and not row["phone_number"]:
+        return None, "contact_name or phone_number is required"
+    if row["direction"] not in config.DIRECTION_CHOICES:
+        return None, f"unknown direction {row['direction']!r}"
+    if row["outcome"] not in config.OUTCOME_CHOICES:
+        return None, f"unknown outcome {row['outcome']!r}"
+
+    call_dt = timeutil.parse_datetime(get("call_datetime"))
+    if not call_dt:
+        return None, f"bad call_datetime {get('call_datetime')!r}"
+    row["call_datetime"] = call_dt.strftime("%Y-%m-%d %H:%M")
+
+    if get("follow_up_date"):
+        follow_up = timeutil.parse_date(get("follow_up_date"))
+        if not follow_up:
+            return None, f"bad follow_up_date {get('follow_up_date')!r}"
+        row["follow_up_date"] = follow_up.strftime("%Y-%m-%d")
+    return row, None
+
+
+@calls_bp.route("/log/bulk", methods=["POST"])
+def log_bulk():
+    """Import many calls at once from a JSON array or CSV upload.
+
+    CSV columns / JSON keys match the log form: contact_name, phone_number,
+    call_datetime, direction, outcome, notes, follow_up_date (agent_name
+    is taken from the agent cookie when present).
+    """
+    from_form = "file" in request.files
+    try:
+        payload = _read_bulk_payload()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if from_form:
+            flash(f"Import failed: {e}", "error")
+            return redirect(url_for("calls.log_call_route"))
+        return jsonify({"error": str(e)}), 400
+    if len(payload) > BULK_MAX_ROWS:
+        msg = f"Too many rows ({len(payload)}); the limit is {BULK_MAX_ROWS}."
+        if from_form:
+            flash(msg, "error")
+            return redirect(url_for("calls.log_call_route"))
+        return jsonify({"error": msg}), 400
+
+    default_agent = request.cookies.get("agent_pref", "")
+    valid, errors = [], []
+    for i, raw in enumerate(payload, start=1):
+        row, error = _validate_bulk_row(raw, default_agent)
+        if error:
+            errors.append({"row": i, "error": error})
+        else:
+            valid.append(row)
+
+    inserted, duplicates, call_totals = record_calls_bulk(valid)
+    if inserted:
+        broker.wake()
+        per_agent = {}
+        for r in inserted:
+            per_agent[r["agent_name"]] = per_agent.get(r["agent_name"], 0) + 1
+        for agent, count in per_agent.items():
+            milestone = call_milestone(agent, call_totals[agent], count)
+            if milestone:
+                notify_milestone(agent, "call", milestone)
+
+    if config.GHL_ENABLED and inserted:
+        # One sync per contact, using the outcome of their latest call.
+        latest = {}
+        for r in sorted(inserted, key=lambda r: r["call_ts"]):
+            latest[r["contact_id"]] = r
+        contacts = [
+            (r["contact_name"], r["phone_number"], r["outcome"])
+            for r in latest.values() if r["outcome"] in config.GHL_STAGE_MAP
+        ]
+        if contacts:
+            _queue_ghl_sync(contacts)
+
+    result = {
+        "inserted": len(inserted),
+        "duplicates": duplicates,
+        "rejected": len(errors),
+        "errors": errors[:50],
+    }
+    if from_form:
+        flash(
+            f"Imported {result['inserted']} calls "
+            f"({duplicates} duplicates skipped, {len(errors)} rejected).",
+            "success" if not errors else "error",
+        )
+        return redirect(url_for("calls.history"))
+    return jsonify(result)
+
+
 # ---------------------------------------------------------------------------
 # Edit call
 # ---------------------------------------------------------------------------
@@ -157,39 +326,109 @@ def delete_call_route(call_id):
 # ---------------------------------------------------------------------------
 # History
 # ---------------------------------------------------------------------------
+def _history_filters():
+    """Filters shared by the history page, its JSON API and the CSV export."""
+    return {
+        "agent_name": request.cookies.get("agent_pref", "Brett"),
+        "direction": request.args.get("direction", ""),
+        "outcome": request.args.get("outcome", ""),
+        "search": request.args.get("search", ""),
+        "date_from": request.args.get("date_from", ""),
+        "date_to": request.args.get("date_to", ""),
+    }
+
+
+def _query_filters(filters):
+    return {k: v or None for k, v in filters.items()}
+
+
 @calls_bp.route("/history")
 def history():
-    agent_pref = request.cookies.get("agent_pref", "Brett")
-    direction = request.args.get("direction", "")
-    outcome = request.args.get("outcome", "")
-    search = request.args.get("search", "")
-    date_from = request.args.get("date_from", "")
-    date_to = request.args.get("date_to", "")
-
-    calls = get_calls(
-        agent_name=agent_pref,
-        direction=direction or None,
-        outcome=outcome or None,
-        search=search or None,
-        date_from=date_from or None,
-        date_to=date_to or None,
+    filters = _history_filters()
+    calls, next_cursor = get_calls_page(
+        cursor=request.args.get("cursor"), **_query_filters(filters),
     )
     return render_template(
         "history.html",
         calls=calls,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
         directions=config.DIRECTION_CHOICES,
         outcomes=config.OUTCOME_CHOICES,
-        filters={
-            "agent_name": agent_pref,
-            "direction": direction,
-            "outcome": outcome,
-            "search": search,
-            "date_from": date_from,
-            "date_to": date_to,
-        },
+        filters=filters,
     )
 
 
+@calls_bp.route("/api/calls")
+def api_calls():
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    calls, next_cursor = get_calls_page(
+        cursor=request.args.get("cursor"), limit=limit,
+        **_query_filters(_history_filters()),
+    )
+    return jsonify({"calls": [dict(c) for c in calls], "next_cursor": next_cursor})
+
+
+EXPORT_COLUMNS = [
+    "id", "agent_name", "call_datetime", "contact_name", "phone_number",
+    "direction", "outcome", "notes", "follow_up_date",
+]
+
+
+@calls_bp.route("/history/export.csv")
+def export_csv():
+    filters = _query_filters(_history_filters())
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_COLUMNS)
+        for i, call in enumerate(iter_calls(**filters), start=1):
+            writer.writerow([call[c] for c in EXPORT_COLUMNS])
+            if i % 500 == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    resp = Response(generate(), mimetype="text/csv")
+    resp.headers["Content-Disposition"] = "attachment; filename=calls.csv"
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Contact timeline (calls, referrals and scoreboard activity for one person)
+# ---------------------------------------------------------------------------
+def _timeline_limit():
+    return min(max(request.args.get("limit", 200, type=int), 1), 1000)
+
+
+@calls_bp.route("/contacts/<int:contact_id>/timeline")
+def contact_timeline(contact_id):
+    contact, entries = get_contact_timeline(contact_id, limit=_timeline_limit())
+    if contact is None:
+        flash("Contact not found.", "error")
+        return redirect(url_for("calls.history"))
+    return render_template(
+        "contact_timeline.html",
+        contact=contact,
+        names=get_contact_names(contact_id),
+        entries=entries,
+    )
+
+
+@calls_bp.route("/contacts/<int:contact_id>/timeline.json")
+def contact_timeline_json(contact_id):
+    contact, entries = get_contact_timeline(contact_id, limit=_timeline_limit())
+    if contact is None:
+        return jsonify({"error": "Contact not found"}), 404
+    return jsonify({
+        "contact": contact,
+        "names": get_contact_names(contact_id),
+        "entries": entries,
+    })
+
+
 # ---------------------------------------------------------------------------
 # Contact auto-suggest API
 # ---------------------------------------------------------------------------
@@ -249,6 +488,8 @@ def ghl_sync(call_id):
             name=call["contact_name"],
             phone=call["phone_number"],
         )
+        if call["contact_id"]:
+            set_ghl_contact_id(call["contact_id"], contact_id)
         flash(f"Synced {call['contact_name']} to Go High Level (ID: {contact_id})", "success")
     except GHLError as e:
         flash(f"GHL sync failed: {e}", "error")
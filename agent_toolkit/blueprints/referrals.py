@@ -1,23 +1,49 @@
 """Referrals blueprint – add, list, update status, stats."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import hmac
 
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+
+import config
+import timeutil
 from models.referrals import (
-    add_referral, get_all_referrals, update_status,
-    delete_referral, get_stats, STATUSES,
+    add_referral, get_referrals_page, get_status_counts, get_referrer_names,
+    update_status, delete_referral, get_stats, apply_changes, get_changes, STATUSES,
+    SYNC_FIELDS,
 )
 
 referrals_bp = Blueprint("referrals", __name__)
 
 
+def _board_filters():
+    """Board filters from the query string; unknown statuses and bad dates are dropped."""
+    status = request.args.get("status", "")
+    filters = {
+        "status": status if status in STATUSES else "",
+        "referrer": request.args.get("referrer", "").strip(),
+    }
+    for key in ("date_from", "date_to"):
+        day = timeutil.parse_date(request.args.get(key, ""))
+        filters[key] = day.isoformat() if day else ""
+    return filters
+
+
 @referrals_bp.route("/")
 def referrals_page():
-    referrals = get_all_referrals()
-    stats = get_stats()
+    filters = _board_filters()
+    query_filters = {k: v or None for k, v in filters.items()}
+    referrals, next_cursor = get_referrals_page(
+        cursor=request.args.get("cursor"), **query_filters,
+    )
     return render_template(
         "referrals.html",
         referrals=referrals,
-        stats=stats,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+        status_counts=get_status_counts(**query_filters),
+        referrer_names=get_referrer_names(),
+        filters=filters,
+        stats=get_stats(),
         statuses=STATUSES,
     )
 
@@ -56,3 +82,63 @@ def delete(row_id):
     delete_referral(row_id)
     flash("Referral deleted.", "success")
     return redirect(url_for("referrals.referrals_page"))
+
+
+# ---------------------------------------------------------------------------
+# Desktop sync
+# ---------------------------------------------------------------------------
+SYNC_MAX_CHANGES = 1000
+SYNC_PAGE_SIZE = 500
+
+
+def _valid_change(change):
+    """True if a pushed change has the types apply_changes() compares and stores."""
+    return (
+        isinstance(change, dict)
+        and isinstance(change.get("uuid"), str)
+        and isinstance(change.get("updated_at"), str)
+        and isinstance(change.get("deleted", False), bool)
+        and all(isinstance(change.get(f), (str, type(None))) for f in SYNC_FIELDS)
+    )
+
+
+@referrals_bp.route("/sync", methods=["POST"])
+def sync():
+    """Exchange referral deltas with the desktop tracker.
+
+    Body: ``{"since": <watermark>, "changes": [...]}``.  Pushed changes are
+    merged first, then everything after ``since`` is returned as
+    ``{"changes": [...], "watermark": n, "more": bool, "applied": n,
+    "skipped": n}``; clients call again with the new watermark while
+    ``more`` is true.
+    """
+    token = config.REFERRAL_SYNC_TOKEN
+    if not token:
+        return jsonify({"error": "Referral sync is not configured."}), 404
+    sent = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    # Compare bytes: compare_digest rejects non-ASCII str arguments.
+    if not hmac.compare_digest(sent.encode(), token.encode()):
+        return jsonify({"error": "Invalid sync token."}), 401
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    since = payload.get("since", 0)
+    changes = payload.get("changes", [])
+    if not isinstance(since, int) or isinstance(since, bool) or since < 0:
+        return jsonify({"error": "since must be a non-negative integer."}), 400
+    if not isinstance(changes, list) or not all(_valid_change(c) for c in changes):
+        return jsonify({"error": "changes must be a list of objects with string "
+                                 "uuid, updated_at and fields."}), 400
+    if len(changes) > SYNC_MAX_CHANGES:
+        return jsonify({"error": f"At most {SYNC_MAX_CHANGES} changes per request."}), 400
+
+    applied, skipped = apply_changes(changes)
+    out, watermark, more = get_changes(since, SYNC_PAGE_SIZE)
+    return jsonify({
+        "changes": out,
+        "watermark": watermark,
+        "more": more,
+        "applied": applied,
+        "skipped": skipped,
+    })
@@ -2,15 +2,22 @@
 
 from flask import (
     Blueprint, render_template, request, redirect, url_for,
-    flash, jsonify,
+    flash, jsonify, Response,
 )
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import json
+import queue
+import time
 
 import config
+import timeutil
+from forecast import AgentForecast, forecast_month
+from live_scoreboard import broker
 from uppa_report import load_uppa_export
 from models.scoreboard import (
-    log_activity, get_ranked, get_leaderboard, get_recent_activity,
-    check_milestone, ACTIVITY_TYPES, ACTIVITY_LABELS, ACTIVITY_EMOJIS,
+    record_activity, get_ranked, get_leaderboard, get_snapshot, get_recent_activity,
+    get_activities_since, get_daily_series, RANK_METRICS, SERIES_MAX_DAYS,
+    MANUAL_TYPES, ACTIVITY_LABELS, ACTIVITY_EMOJIS,
     init_db,
 )
 from slack_notify import notify_activity, notify_milestone, notify_daily_summary
@@ -48,13 +55,15 @@ def scoreboard():
     if metric not in METRICS:
         metric = "policies"
 
-    ranked = get_ranked(metric, period)
-    leaderboard = get_leaderboard(period)
+    # One grouped query feeds the ranking and badges.
+    snapshot = get_snapshot()
+    ranked = snapshot.ranked(metric, period)
+    leaderboard = snapshot.board(period)
     recent = get_recent_activity(15)
 
-    month_lb = get_leaderboard("month")
-    my_month_ap = month_lb.get(agent_pref, {}).get("ap", 0.0)
-    my_month_commission = my_month_ap * config.COMMISSION_FIRST_YEAR_PCT / 100
+    forecasts = forecast_month()
+    my_forecast = forecasts.get(agent_pref) or AgentForecast(agent_pref)
+    my_month_commission = my_forecast.mtd_commission
     commission_goal = config.COMMISSION_MONTHLY_GOAL
     goal_pct = min(100, (my_month_commission / commission_goal * 100) if commission_goal else 0)
 
@@ -69,19 +78,7 @@ def scoreboard():
         bust = request.args.get("refresh_uppa") == "1"
         uppa_columns, uppa_rows, uppa_export_error = load_uppa_export(export_url, bust_cache=bust)
 
-    # Format recent feed
-    feed = []
-    for r in recent:
-        emoji = ACTIVITY_EMOJIS.get(r["activity_type"], "✅")
-        label = ACTIVITY_LABELS.get(r["activity_type"], r["activity_type"])
-        ap_str = f" · ${r['ap_amount']:,.0f} AP" if r.get("ap_amount") else ""
-        feed.append({
-            **r,
-            "emoji": emoji,
-            "label": label,
-            "ap_str": ap_str,
-            "time_str": _time_ago(r["logged_at"]),
-        })
+    feed = [_feed_item(r) for r in recent]
 
     return render_template(
         "scoreboard.html",
@@ -97,6 +94,9 @@ def scoreboard():
         commission_rate=config.COMMISSION_FIRST_YEAR_PCT,
         commission_renewal_rate=config.COMMISSION_RENEWAL_PCT,
         my_month_commission=my_month_commission,
+        my_forecast=my_forecast,
+        forecasts=forecasts,
+        commission_renewal_years=config.COMMISSION_RENEWAL_YEARS,
         commission_goal=commission_goal,
         goal_pct=goal_pct,
         uppa_ip_report_url=config.UPPA_IP_REPORT_URL or None,
@@ -104,6 +104,7 @@ def scoreboard():
         uppa_rows=uppa_rows,
         uppa_export_error=uppa_export_error,
         uppa_export_configured=bool(export_url),
+        stream_after=max((r["id"] for r in recent), default=0),
     )
 
 
@@ -117,6 +118,7 @@ def log():
         activity_type = request.form.get("activity_type", "").strip()
         count = max(1, int(request.form.get("count", 1) or 1))
         notes = request.form.get("notes", "").strip()
+        contact_phone = request.form.get("contact_phone", "").strip()
 
         ap_amount = 0.0
         if activity_type == "policy":
@@ -127,17 +129,19 @@ def log():
             except ValueError:
                 ap_amount = 0.0
 
-        if not agent or activity_type not in ACTIVITY_TYPES:
+        if not agent or activity_type not in MANUAL_TYPES:
             flash("Please fill in all required fields.", "error")
             return redirect(url_for("scoreboard.log"))
 
-        log_activity(agent, activity_type, count, ap_amount, notes)
+        _, milestone = record_activity(
+            agent, activity_type, count, ap_amount, notes, contact_phone,
+        )
+
+        broker.wake()
 
         # Slack notification
         notify_activity(agent, activity_type, count, ap_amount, notes)
 
-        # Check for milestone
-        milestone = check_milestone(agent, activity_type)
         if milestone:
             notify_milestone(agent, activity_type, milestone)
             flash(f"🏆 MILESTONE! {agent} hit {milestone} {activity_type}s all-time!", "success")
@@ -150,19 +154,123 @@ def log():
     return render_template(
         "log_activity.html",
         agents=config.AGENT_CHOICES,
-        activity_types=ACTIVITY_TYPES,
+        activity_types=MANUAL_TYPES,
         activity_labels=ACTIVITY_LABELS,
         activity_emojis=ACTIVITY_EMOJIS,
         default_agent=agent_pref,
     )
 
 
+@scoreboard_bp.route("/scoreboard/api/series")
+def api_series():
+    """Zero-filled daily totals: ?agent=&metric=&from=YYYY-MM-DD&to=YYYY-MM-DD.
+
+    Defaults to every agent, every metric and the last 30 days.
+    """
+    try:
+        end = date.fromisoformat(request.args.get("to") or timeutil.today().isoformat())
+        start = date.fromisoformat(
+            request.args.get("from") or (end - timedelta(days=29)).isoformat()
+        )
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD dates"}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+    if (end - start).days >= SERIES_MAX_DAYS:
+        return jsonify({"error": f"at most {SERIES_MAX_DAYS} days per request"}), 400
+
+    agent = request.args.get("agent", "")
+    if agent and agent not in config.AGENT_CHOICES:
+        return jsonify({"error": f"unknown agent {agent!r}"}), 400
+    metric = request.args.get("metric", "")
+    if metric and metric not in RANK_METRICS:
+        return jsonify({"error": f"unknown metric {metric!r}"}), 400
+
+    series = get_daily_series(
+        start, end,
+        agents=[agent] if agent else None,
+        metrics=(metric,) if metric else RANK_METRICS,
+    )
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), **series})
+
+
+# ---------------------------------------------------------------------------
+# Live updates (Server-Sent Events)
+# ---------------------------------------------------------------------------
+STREAM_HEARTBEAT_SECONDS = 15
+# Streams end after this long; EventSource reconnects with Last-Event-ID.
+STREAM_MAX_SECONDS = 30 * 60
+# How long a display turned away at config.SCOREBOARD_STREAM_MAX waits.
+STREAM_FULL_RETRY_SECONDS = 30
+
+
+def _sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@scoreboard_bp.route("/scoreboard/stream")
+def stream():
+    """Push new activities and leaderboard deltas to a connected display.
+
+    Events: ``activity`` (one feed item, id = activity id) and ``board``
+    (see live_scoreboard.board_delta).  A reconnect with Last-Event-ID
+    (or the page's ``?after=<activity id>``) first replays what it missed.
+
+    Each open stream holds a worker thread, so past
+    config.SCOREBOARD_STREAM_MAX per worker the display gets a 503 telling
+    EventSource to retry later.
+    """
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        last_id = request.args.get("after", type=int)
+
+    sub = broker.subscribe()
+    if sub is None:
+        resp = Response(f"retry: {STREAM_FULL_RETRY_SECONDS * 1000}\n\n", status=503,
+                        mimetype="text/event-stream")
+        resp.headers["Retry-After"] = str(STREAM_FULL_RETRY_SECONDS)
+        return resp
+
+    def generate():
+        sent = last_id or 0
+        try:
+            yield "retry: 5000\n\n"
+            if last_id is not None:
+                for row in get_activities_since(last_id):
+                    sent = row["id"]
+                    yield _sse("activity", _feed_item(row), sent)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while not sub.closed and time.monotonic() < deadline:
+                try:
+                    event, data = sub.queue.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if event == "activity":
+                    if data["id"] <= sent:
+                        continue
+                    sent = data["id"]
+                    yield _sse(event, _feed_item(data), sent)
+                else:
+                    yield _sse(event, data)
+        finally:
+            broker.unsubscribe(sub)
+
+    resp = Response(generate(), mimetype="text/event-stream")
+    # Also covers a client gone before the generator first ran.
+    resp.call_on_close(lambda: broker.unsubscribe(sub))
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
 @scoreboard_bp.route("/scoreboard/summary", methods=["POST"])
 def post_summary():
     """Manually trigger a Slack summary post."""
     period = request.form.get("period", "today")
     ranked = get_ranked("policies", period)
-    notify_daily_summary(ranked, period)
+    notify_daily_summary(ranked, period, forecasts=forecast_month())
     flash("📊 Summary posted to Slack!", "success")
     return redirect(url_for("scoreboard.scoreboard"))
 
@@ -230,10 +338,21 @@ def _build_recognition(leaderboard: dict) -> list[dict]:
     return badges
 
 
+def _feed_item(r: dict) -> dict:
+    """An activity row plus the display fields the feed shows."""
+    return {
+        **r,
+        "emoji": ACTIVITY_EMOJIS.get(r["activity_type"], "✅"),
+        "label": ACTIVITY_LABELS.get(r["activity_type"], r["activity_type"]),
+        "ap_str": f" · ${r['ap_amount']:,.0f} AP" if r.get("ap_amount") else "",
+        "time_str": _time_ago(r["logged_at"]),
+    }
+
+
 def _time_ago(logged_at: str) -> str:
     try:
         dt = datetime.strptime(logged_at, "%Y-%m-%d %H:%M:%S")
-        diff = datetime.now() - dt
+        diff = timeutil.now() - dt
         s = int(diff.total_seconds())
         if s < 60:
             return "just now"
@@ -11,7 +11,7 @@ from flask import (
 )
 
 import config
-from models.calls import get_pipeline_data
+from models.calls import get_pipeline_data, get_pipeline_column, get_outcome_totals
 
 tools_bp = Blueprint("tools", __name__)
 
@@ -477,7 +477,24 @@ def api_illustration():
 def pipeline():
     pipeline_data = get_pipeline_data()
     stages = config.OUTCOME_CHOICES
-    return render_template("pipeline.html", pipeline_data=pipeline_data, stages=stages)
+    return render_template(
+        "pipeline.html",
+        pipeline_data=pipeline_data,
+        stages=stages,
+        totals=get_outcome_totals(),
+    )
+
+
+@tools_bp.route("/pipeline/column")
+def pipeline_column():
+    """Next page of cards for one Kanban column ("load more")."""
+    outcome = request.args.get("outcome", "")
+    before = request.args.get("before", type=int)
+    before_id = request.args.get("before_id", type=int)
+    column = get_pipeline_column(outcome, before=before, before_id=before_id)
+    for card in column["cards"]:
+        card["edit_url"] = url_for("calls.edit_call_route", call_id=card["id"])
+    return jsonify(column)
 
 
 # ---------------------------------------------------------------------------
@@ -15,6 +15,11 @@ load_dotenv(PROJECT_ROOT / ".env")
 # ---------------------------------------------------------------------------
 CALLS_DB_PATH = BASE_DIR / "calls.db"
 REFERRALS_DB_PATH = BASE_DIR / "referrals.db"
+PUSH_DB_PATH = BASE_DIR / "push_subscriptions.db"
+OUTBOX_DB_PATH = BASE_DIR / "outbox.db"
+# Raw calls/activities older than the archive horizon (see maintenance.py archive).
+ARCHIVE_DB_PATH = BASE_DIR / "archive.db"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "400"))
 
 # ---------------------------------------------------------------------------
 # Flask
@@ -93,6 +98,9 @@ OUTCOME_CHOICES = ["Sale", "Callback", "No Answer", "Voicemail", "Not Interested
 
 CALENDAR_REMINDER_MINUTES = 30
 
+# Agency timezone: "today", week and day buckets follow this, not the host clock.
+TIMEZONE = os.getenv("LIFI_TIMEZONE", "America/Los_Angeles")
+
 # ---------------------------------------------------------------------------
 # Go High Level CRM
 # ---------------------------------------------------------------------------
@@ -139,6 +147,13 @@ INTEGRITY_URL = "https://connect.integrity.com"
 # Slack
 # ---------------------------------------------------------------------------
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
+# Activity logs within this many seconds of the first are posted as one digest.
+SLACK_DIGEST_SECONDS = float(os.getenv("SLACK_DIGEST_SECONDS", "30"))
+
+# Live scoreboard displays per gunicorn worker.  Each open stream holds one
+# of the worker's --threads, so keep this well under it (16 in the Procfile)
+# to leave threads for normal requests; extra displays get a 503 and retry.
+SCOREBOARD_STREAM_MAX = int(os.getenv("SCOREBOARD_STREAM_MAX", "6"))
 
 # ---------------------------------------------------------------------------
 # Scoreboard DB
@@ -158,12 +173,32 @@ UPPA_IP_REPORT_URL = os.getenv(
 UPPA_IP_EXPORT_URL = os.getenv("UPPA_IP_EXPORT_URL", "").strip()
 UPPA_IP_EXPORT_TOKEN = os.getenv("UPPA_IP_EXPORT_TOKEN", "").strip()
 
+# ---------------------------------------------------------------------------
+# Referral sync (desktop referral tracker <-> /referrals/sync)
+# ---------------------------------------------------------------------------
+# Bearer token the desktop app must send; sync is disabled while unset.
+REFERRAL_SYNC_TOKEN = os.getenv("REFERRAL_SYNC_TOKEN", "").strip()
+
+# ---------------------------------------------------------------------------
+# Outbox (queued Slack / GHL / push / email deliveries, see outbox.py)
+# ---------------------------------------------------------------------------
+# Sending threads per worker process; per-destination limits hold across workers.
+OUTBOX_MAX_WORKERS = int(os.getenv("OUTBOX_MAX_WORKERS", "8"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Retry delay doubles from OUTBOX_BACKOFF_SECONDS up to the max.
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+
 # ---------------------------------------------------------------------------
 # Web Push (VAPID)
 # ---------------------------------------------------------------------------
 VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY", "")
 VAPID_PUBLIC_KEY = os.getenv("VAPID_PUBLIC_KEY", "")
 VAPID_CLAIMS_EMAIL = os.getenv("VAPID_CLAIMS_EMAIL", "brett@fflliv.com")
+# Reminder fan-out: concurrent sends (outbox limit for "push"), and seconds
+# to wait on each push service.
+PUSH_MAX_WORKERS = int(os.getenv("PUSH_MAX_WORKERS", "8"))
+PUSH_TIMEOUT_SECONDS = float(os.getenv("PUSH_TIMEOUT_SECONDS", "10"))
 
 # ---------------------------------------------------------------------------
 # Commission Tracking
@@ -171,6 +206,8 @@ VAPID_CLAIMS_EMAIL = os.getenv("VAPID_CLAIMS_EMAIL", "brett@fflliv.com")
 COMMISSION_FIRST_YEAR_PCT = float(os.getenv("COMMISSION_FIRST_YEAR_PCT", "100"))
 COMMISSION_RENEWAL_PCT = float(os.getenv("COMMISSION_RENEWAL_PCT", "5"))
 COMMISSION_MONTHLY_GOAL = float(os.getenv("COMMISSION_MONTHLY_GOAL", "10000"))
+# Renewal years paid after the first year (years 2-10 by default).
+COMMISSION_RENEWAL_YEARS = int(os.getenv("COMMISSION_RENEWAL_YEARS", "9"))
 
 # ---------------------------------------------------------------------------
 # Daily Reminders
@@ -0,0 +1,167 @@
+"""Shared SQLite connection layer for the agent_toolkit models.
+
+Every model used to open a fresh connection per query and re-run its
+PRAGMAs (and sometimes CREATE TABLE + commit) each time.  This module keeps
+one long-lived connection per database file per thread, tuned once when it
+is opened, and runs each database's schema setup once per process.
+
+Connections are keyed by process id as well as path so a gunicorn worker
+never reuses a handle inherited from its parent across ``fork()``.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Applied once per connection, right after it is opened.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -8000),          # ~8 MB page cache
+    ("mmap_size", 64 * 1024 * 1024),
+    ("busy_timeout", 5000),         # ms to wait on a locked database
+    ("temp_store", "MEMORY"),
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_open_counts: dict[str, int] = {}
+_schema_ready: set[tuple[int, str]] = set()
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5)
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    with _lock:
+        _open_counts[path] = _open_counts.get(path, 0) + 1
+    return conn
+
+
+def get_conn(path, init=None) -> sqlite3.Connection:
+    """Return this thread's connection to ``path``, opening it if needed.
+
+    ``init`` is an optional ``callable(conn)`` that creates the schema.  It
+    runs (and is committed) once per process per database path.
+    """
+    path = str(path)
+    pid = os.getpid()
+    conns = getattr(_local, "conns", None)
+    if conns is None or getattr(_local, "pid", None) != pid:
+        conns = _local.conns = {}
+        _local.pid = pid
+
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = _open(path)
+
+    if init is not None and (pid, path) not in _schema_ready:
+        with _lock:
+            if (pid, path) not in _schema_ready:
+                init(conn)
+                conn.commit()
+                _schema_ready.add((pid, path))
+    return conn
+
+
+@contextmanager
+def connection(path, init=None):
+    """Borrow the pooled connection for ``path``.
+
+    Callers still commit their own writes.  Anything left uncommitted when
+    the block exits (including on error) is rolled back so the long-lived
+    connection never carries an open transaction into the next request.
+    """
+    conn = get_conn(path, init)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+@contextmanager
+def attached(conn, path, schema):
+    """ATTACH ``path`` to ``conn`` as ``schema`` for the duration of the block.
+
+    The schema is detached again on the way out (rolling back anything left
+    uncommitted, as connection() does), so a later ``BEGIN IMMEDIATE`` on
+    the pooled connection only locks its own database.  Nested use of a
+    schema that is already attached to the same file leaves it to the
+    outer block.
+    """
+    path = str(path)
+    current = {r["name"]: r["file"] for r in conn.execute("PRAGMA database_list")}
+    if schema in current and os.path.realpath(current[schema]) == os.path.realpath(path):
+        yield conn
+        return
+    if schema in current:
+        conn.execute(f"DETACH DATABASE {schema}")
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"DETACH DATABASE {schema}")
+
+
+def apply_migrations(conn, migrations):
+    """Bring ``conn`` up to the latest schema version.
+
+    ``migrations`` is an ordered sequence; entry *n* (1-based) is schema
+    version *n* and is either a ``callable(conn)`` or a tuple of SQL
+    statements.  Applied versions are recorded in ``schema_version``.  Each
+    step runs in its own ``BEGIN IMMEDIATE`` transaction and re-checks the
+    version inside it, so two workers starting together can't both apply it.
+    """
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "applied_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')))"
+    )
+    for version, step in enumerate(migrations, start=1):
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                for sql in step:
+                    conn.execute(sql)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def schema_version(conn) -> int:
+    """Return the highest migration version applied to ``conn``."""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def open_counts() -> dict[str, int]:
+    """Return how many connections have been opened per database path."""
+    with _lock:
+        return dict(_open_counts)
+
+
+def close_all():
+    """Close this thread's connections and forget schema/open bookkeeping.
+
+    Meant for tests and for scripts that swap database paths at runtime.
+    """
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+    with _lock:
+        _open_counts.clear()
+        _schema_ready.clear()
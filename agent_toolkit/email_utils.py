@@ -1,4 +1,8 @@
-"""Email utility – send illustration PDFs to clients via SMTP."""
+"""Email utility – send illustration PDFs to clients via SMTP.
+
+Illustration emails go out inline so the agent sees any error; automated
+HTML emails (follow-up reminders) are queued in the outbox.
+"""
 
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -6,6 +10,7 @@ from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 
 import config
+import outbox
 
 
 class EmailError(Exception):
@@ -20,6 +25,37 @@ def _check_config():
     return None
 
 
+def _smtp_send(msg):
+    with smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT, timeout=15) as server:
+        server.starttls()
+        server.login(config.SMTP_EMAIL, config.SMTP_PASSWORD)
+        server.send_message(msg)
+
+
+def _send_queued(job):
+    """Outbox handler: send one queued HTML email."""
+    err = _check_config()
+    if err:
+        raise outbox.PermanentError(err)
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = job["subject"]
+    msg["From"] = config.SMTP_EMAIL
+    msg["To"] = job["to"]
+    msg.attach(MIMEText(job["html"], "html"))
+    try:
+        _smtp_send(msg)
+    except smtplib.SMTPAuthenticationError as e:
+        raise outbox.PermanentError(f"SMTP authentication failed: {e}")
+
+
+outbox.register("email", _send_queued, concurrency=1)
+
+
+def queue_html_email(to, subject, html):
+    """Queue an HTML email from SMTP_EMAIL for delivery by the outbox."""
+    outbox.enqueue("email", {"to": to, "subject": subject, "html": html})
+
+
 def send_illustration_email(client_name, client_email, pdf_bytes, filename):
     """Send a branded illustration PDF to a client.
 
@@ -57,10 +93,7 @@ def send_illustration_email(client_name, client_email, pdf_bytes, filename):
     msg.attach(attachment)
 
     try:
-        with smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT, timeout=15) as server:
-            server.starttls()
-            server.login(config.SMTP_EMAIL, config.SMTP_PASSWORD)
-            server.send_message(msg)
+        _smtp_send(msg)
     except smtplib.SMTPAuthenticationError:
         raise EmailError(
             "SMTP authentication failed. Check SMTP_EMAIL and SMTP_PASSWORD in .env. "
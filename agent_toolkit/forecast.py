@@ -0,0 +1,80 @@
+"""Month-end pacing and commission forecasts for the scoreboard.
+
+Projects each agent's month-end annual premium from their month-to-date
+daily series, paced on working days (Mon-Fri) since that is when policies
+get written, then turns AP into first-year and renewal commission using
+the COMMISSION_* settings.  The whole team comes from one
+get_daily_series() call.
+"""
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import config
+import timeutil
+from models.scoreboard import get_daily_series
+
+
+@dataclass
+class AgentForecast:
+    agent: str
+    mtd_ap: float = 0.0
+    projected_ap: float = 0.0
+    mtd_commission: float = 0.0
+    projected_commission: float = 0.0
+    projected_renewals: float = 0.0
+    goal_pct: float = 0.0
+
+    @property
+    def on_pace(self) -> bool:
+        return self.goal_pct >= 100
+
+
+def _workdays(start: date, end: date) -> int:
+    """Weekdays in ``[start, end]``."""
+    return sum(1 for i in range((end - start).days + 1)
+               if (start + timedelta(days=i)).weekday() < 5)
+
+
+def _pace_days(now: datetime) -> tuple[float, int]:
+    """(working days elapsed, working days in the month) as of ``now``.
+
+    Today counts for the share of it that has passed, and at least one
+    day is always treated as elapsed so the 1st doesn't extrapolate wildly.
+    """
+    today = now.date()
+    first = today.replace(day=1)
+    last = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    elapsed = _workdays(first, today - timedelta(days=1)) if today > first else 0
+    if today.weekday() < 5:
+        elapsed += (now.hour * 60 + now.minute) / (24 * 60)
+    return max(elapsed, 1.0), max(_workdays(first, last), 1)
+
+
+def forecast_month(now: datetime | None = None) -> dict[str, AgentForecast]:
+    """Month-end forecast for every configured agent, keyed by name."""
+    now = now or timeutil.now()
+    today = now.date()
+    series = get_daily_series(today.replace(day=1), today, metrics=("ap",))
+    elapsed, total = _pace_days(now)
+    scale = max(total / elapsed, 1.0)
+    first_year = config.COMMISSION_FIRST_YEAR_PCT / 100
+    renewals = config.COMMISSION_RENEWAL_PCT / 100 * config.COMMISSION_RENEWAL_YEARS
+    goal = config.COMMISSION_MONTHLY_GOAL
+
+    forecasts = {}
+    for agent, metrics in series["agents"].items():
+        mtd_ap = sum(metrics["ap"])
+        projected_ap = mtd_ap * scale
+        projected_commission = projected_ap * first_year
+        forecasts[agent] = AgentForecast(
+            agent=agent,
+            mtd_ap=mtd_ap,
+            projected_ap=projected_ap,
+            mtd_commission=mtd_ap * first_year,
+            projected_commission=projected_commission,
+            projected_renewals=projected_ap * renewals,
+            goal_pct=projected_commission / goal * 100 if goal else 0.0,
+        )
+    return forecasts
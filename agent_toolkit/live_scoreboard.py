@@ -0,0 +1,184 @@
+"""In-process broker for the live scoreboard stream.
+
+Each gunicorn worker runs one background thread that follows the
+activities table by id.  AUTOINCREMENT ids only go up, so the last id seen
+is a change cursor shared by every worker through scoreboard.db.  When new
+activities appear, the thread fans them out to this worker's SSE
+subscribers together with a board delta: the totals that changed and any
+rankings whose order moved.  The leaderboard is recomputed once per batch
+of new activity per worker, not once per viewer.
+
+Calls logged in the call log count towards the "calls" metric too.  They
+don't produce feed items, but calls.db's data_version is checked on every
+poll and a change triggers the same board recompute.
+"""
+
+import os
+import queue
+import threading
+
+import config
+from models import calls, scoreboard
+
+POLL_SECONDS = 1.0
+QUEUE_SIZE = 100
+BATCH_SIZE = 100
+
+
+class Subscriber:
+    """One connected stream.  ``closed`` is set if it fell too far behind."""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.closed = False
+
+
+class ScoreboardBroker:
+
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._subscribers: set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        # _cursor, _calls_version and _snapshot are read and replaced only
+        # under _lock; _generation changes whenever they are reset, so a poll
+        # that raced a reset drops its now-stale result.
+        self._cursor = None
+        self._calls_version = None
+        self._snapshot = None
+        self._generation = 0
+
+    def subscribe(self) -> Subscriber | None:
+        """Register a stream, or return None if config.SCOREBOARD_STREAM_MAX are open."""
+        sub = Subscriber()
+        with self._lock:
+            if len(self._subscribers) >= config.SCOREBOARD_STREAM_MAX:
+                return None
+            self._subscribers.add(sub)
+            self._ensure_thread()
+            if self._cursor is None:
+                # Start from "now" before returning, so nothing logged right
+                # after the first subscriber connects is missed.
+                self._reset()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def wake(self):
+        """Poll now instead of at the next tick (after a local write)."""
+        self._wake.set()
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait((event, data))
+            except queue.Full:
+                # A stalled client is dropped; EventSource will reconnect.
+                sub.closed = True
+                self.unsubscribe(sub)
+
+    def poll(self):
+        """Publish activities logged since the cursor. Returns how many.
+
+        A board delta is also published when only calls.db changed.
+        """
+        with self._lock:
+            if self._cursor is None:
+                self._reset()
+                return 0
+            cursor, seen_version = self._cursor, self._calls_version
+            previous, generation = self._snapshot, self._generation
+        rows = scoreboard.get_activities_since(cursor, BATCH_SIZE)
+        calls_version = calls.data_version()
+        if not rows and calls_version == seen_version:
+            return 0
+        snapshot = scoreboard.get_snapshot()
+        with self._lock:
+            if self._generation != generation:
+                # Went idle or a subscriber reset the cursor meanwhile.
+                return 0
+            self._calls_version = calls_version
+            if rows:
+                self._cursor = rows[-1]["id"]
+            self._snapshot = snapshot
+        for row in rows:
+            self.publish("activity", row)
+        delta = board_delta(previous, snapshot)
+        if delta:
+            self.publish("board", delta)
+        return len(rows)
+
+    def _reset(self):
+        """Start from "now".  Caller holds _lock."""
+        self._generation += 1
+        self._cursor = scoreboard.latest_activity_id()
+        self._calls_version = calls.data_version()
+        self._snapshot = scoreboard.get_snapshot()
+
+    def _go_idle(self):
+        """Forget the cursor.  Caller holds _lock."""
+        self._generation += 1
+        self._cursor = None
+
+    def _ensure_thread(self):
+        # Threads don't survive fork(); a worker starts its own on first use.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        self._pid = pid
+        self._go_idle()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="scoreboard-broker")
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Idle: nobody to tell, so don't touch the database.
+                    self._go_idle()
+                idle = self._cursor is None
+            if idle:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            try:
+                # Drain big backlogs without waiting between batches.
+                if self.poll() < BATCH_SIZE:
+                    self._wake.wait(self.poll_seconds)
+                    self._wake.clear()
+            except Exception as e:
+                print(f"[Scoreboard] Live broker poll failed: {e}")
+                self._wake.wait(self.poll_seconds)
+
+
+def board_delta(old, new) -> dict:
+    """What changed between two LeaderboardSnapshots, per period.
+
+    ``{period: {"totals": {agent: totals}, "ranks": {metric: [agent, ...]}}}``
+    with only the agents whose totals moved and the metrics whose order
+    changed.  Empty when nothing did.
+    """
+    delta = {}
+    for period, board in new.boards.items():
+        before = old.boards.get(period, {}) if old else {}
+        totals = {a: t for a, t in board.items() if before.get(a) != t}
+        if not totals:
+            continue
+        ranks = {}
+        for metric in scoreboard.RANK_METRICS:
+            order = [r["agent"] for r in new.ranked(metric, period)]
+            if not old or period not in old.boards or \
+                    order != [r["agent"] for r in old.ranked(metric, period)]:
+                ranks[metric] = order
+        delta[period] = {"totals": totals, "ranks": ranks}
+    return delta
+
+
+broker = ScoreboardBroker()
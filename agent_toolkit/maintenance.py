@@ -0,0 +1,86 @@
+"""LIFI Agent Toolkit – database maintenance commands.
+
+Usage (from the agent_toolkit directory):
+    python maintenance.py rebuild-rollup
+    python maintenance.py rebuild-contacts
+    python maintenance.py rebuild-activity-totals
+    python maintenance.py archive [--days N]
+    python maintenance.py outbox [--retry-dead [DESTINATION]]
+"""
+
+import argparse
+
+import outbox
+from models import archive, calls, scoreboard
+
+
+def _rebuild_rollup(args):
+    rows = calls.rebuild_daily_rollup()
+    print(f"[Maintenance] calls_daily rebuilt: {rows} rows")
+
+
+def _rebuild_contacts(args):
+    count = calls.rebuild_contacts()
+    print(f"[Maintenance] contacts rebuilt: {count} contacts")
+
+
+def _rebuild_activity_totals(args):
+    rows = scoreboard.rebuild_activity_totals()
+    print(f"[Maintenance] activity_totals rebuilt: {rows} rows")
+
+
+def _archive(args):
+    before = archive.horizon(after_days=args.days)
+    moved_calls = calls.archive_calls(before)
+    moved_activities = scoreboard.archive_activities(before)
+    print(f"[Maintenance] Archived before {before}: "
+          f"{moved_calls} calls, {moved_activities} activities")
+
+
+def _outbox(args):
+    if args.retry_dead is not None:
+        revived = outbox.retry_dead(args.retry_dead or None)
+        print(f"[Maintenance] outbox: {revived} dead jobs queued for retry")
+    for name, s in sorted(outbox.stats().items()):
+        print(f"[Maintenance] outbox {name}: {s['pending']} pending "
+              f"(oldest {s['oldest_seconds']}s), {s['dead']} dead; "
+              f"{s['sent']} sent, {s['retried']} retried, "
+              f"{s['dead_lettered']} dead-lettered, avg {s['avg_ms']} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser(
+        "rebuild-rollup", help="Recompute the calls_daily rollup from raw calls",
+    ).set_defaults(func=_rebuild_rollup)
+    sub.add_parser(
+        "rebuild-contacts", help="Re-derive contacts and name variants from raw calls",
+    ).set_defaults(func=_rebuild_contacts)
+    sub.add_parser(
+        "rebuild-activity-totals", help="Recompute scoreboard running totals from activities",
+    ).set_defaults(func=_rebuild_activity_totals)
+    archive_cmd = sub.add_parser(
+        "archive", help="Move calls and activities past the horizon into archive.db",
+    )
+    archive_cmd.add_argument(
+        "--days", type=int, default=None,
+        help="Horizon in days (default: ARCHIVE_AFTER_DAYS)",
+    )
+    archive_cmd.set_defaults(func=_archive)
+    outbox_cmd = sub.add_parser(
+        "outbox", help="Show queued notification stats; optionally retry dead jobs",
+    )
+    outbox_cmd.add_argument(
+        "--retry-dead", nargs="?", const="", default=None, metavar="DESTINATION",
+        help="Re-queue dead jobs (all destinations unless one is named)",
+    )
+    outbox_cmd.set_defaults(func=_outbox)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cold storage for calls and scoreboard activities past the archive horizon.
+
+Old raw rows move out of calls.db and scoreboard.db into archive.db, which
+the hot databases ATTACH as ``archive_db`` while they copy rows across.
+The hot side keeps aggregates instead: calls stay counted in calls_daily,
+and activities are folded into scoreboard's activities_monthly.  Moves go
+in whole months, so the archived history is always a run of complete
+months ending at horizon().
+
+See calls.archive_calls() and scoreboard.archive_activities().
+"""
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import config
+import db
+import timeutil
+
+SCHEMA = "archive_db"
+
+# Rows moved per transaction, so writers are never blocked for long.
+BATCH_SIZE = 5000
+
+# A horizon shorter than this could reach into the current week/month
+# leaderboards, which only read the hot table.
+MIN_AFTER_DAYS = 62
+
+
+def _create_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY,
+            agent_name TEXT NOT NULL DEFAULT '',
+            contact_name TEXT NOT NULL DEFAULT '',
+            phone_number TEXT NOT NULL DEFAULT '',
+            call_datetime TEXT NOT NULL,
+            call_ts INTEGER,
+            call_day TEXT,
+            direction TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            notes TEXT NOT NULL DEFAULT '',
+            follow_up_date TEXT,
+            contact_id INTEGER,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            archived_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS activities (
+            id INTEGER PRIMARY KEY,
+            agent_name TEXT NOT NULL,
+            activity_type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 1,
+            ap_amount REAL NOT NULL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            contact_phone TEXT NOT NULL DEFAULT '',
+            phone_e164 TEXT,
+            logged_at DATETIME,
+            archived_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_calls_day ON calls (call_day)")
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_archive_activities_logged
+           ON activities (logged_at, agent_name, activity_type, count, ap_amount)"""
+    )
+
+
+# Append-only: each entry is one schema version (see db.apply_migrations).
+MIGRATIONS = [
+    _create_schema,
+]
+
+
+def _migrate(conn):
+    db.apply_migrations(conn, MIGRATIONS)
+
+
+@contextmanager
+def get_db():
+    with db.connection(config.ARCHIVE_DB_PATH, init=_migrate) as conn:
+        yield conn
+
+
+def init_db():
+    with get_db():
+        pass
+
+
+@contextmanager
+def attached(conn):
+    """Attach archive.db (created if needed) to ``conn`` as ``archive_db`` for the block."""
+    init_db()
+    with db.attached(conn, config.ARCHIVE_DB_PATH, SCHEMA):
+        yield conn
+
+
+def horizon(today: date | None = None, after_days: int | None = None) -> date:
+    """First day of the oldest month kept hot; everything before it is archived.
+
+    Rounded down to a month boundary from ``today - ARCHIVE_AFTER_DAYS`` so
+    monthly aggregates only ever hold complete months.
+    """
+    today = today or timeutil.today()
+    days = config.ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    return (today - timedelta(days=max(days, MIN_AFTER_DAYS))).replace(day=1)
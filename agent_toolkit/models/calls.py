@@ -1,44 +1,574 @@
 """SQLite database models and query helpers for call logging."""
 
-import sqlite3
+import json
+import re
 from contextlib import contextmanager
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from datetime import timedelta
 
-from config import AGENT_CHOICES, CALLS_DB_PATH
+import config
+import db
+import timeutil
+from config import AGENT_CHOICES
+from models import archive
+
+
+def _base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT NOT NULL DEFAULT '',
+            contact_name TEXT NOT NULL DEFAULT '',
+            phone_number TEXT NOT NULL DEFAULT '',
+            call_datetime TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            notes TEXT NOT NULL DEFAULT '',
+            follow_up_date TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    # Databases created before multi-agent support lack agent_name.
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(calls)")}
+    if "agent_name" not in columns:
+        conn.execute("ALTER TABLE calls ADD COLUMN agent_name TEXT NOT NULL DEFAULT ''")
+
+
+# Stored form of call_datetime; call_ts/call_day are derived from it on write.
+CALL_DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def _rollup_backfill(day):
+    return f"""
+        INSERT INTO calls_daily (day, agent_name, outcome, direction, count)
+        SELECT {day.format(row="calls")}, agent_name, outcome, direction, COUNT(*)
+        FROM calls
+        GROUP BY 1, 2, 3, 4
+    """
+
+
+def _rollup_triggers(day, day_columns):
+    """calls_daily maintenance triggers, bucketing rows by the ``day`` expression."""
+    old_day, new_day = day.format(row="OLD"), day.format(row="NEW")
+    return (
+        f"""CREATE TRIGGER IF NOT EXISTS calls_daily_ai AFTER INSERT ON calls BEGIN
+               INSERT INTO calls_daily (day, agent_name, outcome, direction, count)
+               VALUES ({new_day}, NEW.agent_name, NEW.outcome, NEW.direction, 1)
+               ON CONFLICT (day, agent_name, outcome, direction)
+               DO UPDATE SET count = count + 1;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS calls_daily_ad AFTER DELETE ON calls BEGIN
+               UPDATE calls_daily SET count = count - 1
+               WHERE day = {old_day} AND agent_name = OLD.agent_name
+                 AND outcome = OLD.outcome AND direction = OLD.direction;
+               DELETE FROM calls_daily WHERE day = {old_day} AND count <= 0;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS calls_daily_au
+           AFTER UPDATE OF agent_name, {day_columns}, outcome, direction ON calls
+           WHEN {old_day} IS NOT {new_day}
+             OR OLD.agent_name IS NOT NEW.agent_name
+             OR OLD.outcome IS NOT NEW.outcome
+             OR OLD.direction IS NOT NEW.direction
+           BEGIN
+               UPDATE calls_daily SET count = count - 1
+               WHERE day = {old_day} AND agent_name = OLD.agent_name
+                 AND outcome = OLD.outcome AND direction = OLD.direction;
+               DELETE FROM calls_daily WHERE day = {old_day} AND count <= 0;
+               INSERT INTO calls_daily (day, agent_name, outcome, direction, count)
+               VALUES ({new_day}, NEW.agent_name, NEW.outcome, NEW.direction, 1)
+               ON CONFLICT (day, agent_name, outcome, direction)
+               DO UPDATE SET count = count + 1;
+           END""",
+    )
+
+
+# calls_daily is kept in sync by triggers; this rebuilds it from scratch.
+# Rows written by raw SQL without call_day still land on their text date.
+_ROLLUP_DAY = "COALESCE({row}.call_day, substr({row}.call_datetime, 1, 10))"
+_ROLLUP_BACKFILL = _rollup_backfill(_ROLLUP_DAY)
+
+
+def _call_time_fields(value):
+    """Normalized call_datetime plus its epoch and local day, or None.
+
+    Accepts the form's datetime-local value ("2026-03-02T14:05") as well as
+    the stored and dialer-export formats timeutil understands.
+    """
+    dt = timeutil.parse_datetime(value) if value else None
+    if dt is None:
+        return None
+    return {
+        "call_datetime": dt.strftime(CALL_DATETIME_FORMAT),
+        "call_ts": timeutil.to_epoch(dt),
+        "call_day": dt.strftime("%Y-%m-%d"),
+    }
+
+
+def _follow_up_date(value):
+    """ISO follow-up date, or None when empty or unparseable."""
+    day = timeutil.parse_date(value) if value else None
+    return day.isoformat() if day else None
+
+
+def _epoch_columns(conn):
+    """Add call_ts/call_day, normalize stored dates, re-key indexes and rollup."""
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(calls)")}
+    if "call_ts" not in columns:
+        conn.execute("ALTER TABLE calls ADD COLUMN call_ts INTEGER")
+    if "call_day" not in columns:
+        conn.execute("ALTER TABLE calls ADD COLUMN call_day TEXT")
+
+    # The rollup is re-keyed on call_day below; rebuilding it once is cheaper
+    # than letting the old triggers fire for every normalized row.
+    for name in ("calls_daily_ai", "calls_daily_ad", "calls_daily_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    updates, undated = [], 0
+    for r in conn.execute(
+        "SELECT id, call_datetime, follow_up_date, created_at FROM calls"
+    ).fetchall():
+        fields = (_call_time_fields(r["call_datetime"])
+                  or _call_time_fields(r["created_at"]))
+        if fields is None:
+            # Keep the row in (call_ts, id) pages, last, rather than NULL.
+            undated += 1
+            fields = {"call_datetime": r["call_datetime"], "call_ts": 0, "call_day": None}
+        updates.append({**fields, "follow_up_date": _follow_up_date(r["follow_up_date"]),
+                        "id": r["id"]})
+    _report_undated(undated)
+    conn.executemany(
+        """UPDATE calls SET call_datetime = :call_datetime, call_ts = :call_ts,
+                            call_day = :call_day, follow_up_date = :follow_up_date
+           WHERE id = :id""",
+        updates,
+    )
+
+    for name in ("idx_calls_agent_datetime", "idx_calls_outcome_datetime", "idx_calls_datetime"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_agent_ts ON calls (agent_name, call_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_outcome_ts ON calls (outcome, call_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls (call_ts)")
+
+    for sql in _rollup_triggers(_ROLLUP_DAY, "call_datetime, call_day"):
+        conn.execute(sql)
+    conn.execute("DELETE FROM calls_daily")
+    conn.execute(_ROLLUP_BACKFILL)
+
+
+def _report_undated(count):
+    if count:
+        print(f"[Calls] {count} call(s) have no readable date or created_at; "
+              f"stored with call_ts 0")
+
+
+def _undated_calls(conn):
+    """call_ts 0 for rows an earlier _epoch_columns() left NULL, so they page."""
+    _report_undated(conn.execute("UPDATE calls SET call_ts = 0 WHERE call_ts IS NULL").rowcount)
+
+
+def _phone_digits_sql(column):
+    """SQL expression that strips the usual phone punctuation from ``column``."""
+    expr = column
+    for ch in (" ", "-", "(", ")", ".", "+", "/"):
+        expr = f"replace({expr}, '{ch}', '')"
+    return expr
+
+
+def _phone_tokens_sql(column):
+    """Digits-only phone plus its last 10, 7 and 4 digits, space separated.
+
+    Indexing the suffixes lets prefix queries find "949" behind a +1 or
+    "335-1412" / "1412" the way the old LIKE '%...%' search did.
+    """
+    d = _phone_digits_sql(column)
+    return " || ' ' || ".join([d] + [f"substr({d}, -{n})" for n in (10, 7, 4)])
+
+
+_FTS_INSERT = f"""
+    INSERT INTO calls_fts (rowid, contact_name, phone_digits, notes)
+    VALUES (NEW.id, NEW.contact_name, {_phone_tokens_sql("NEW.phone_number")}, NEW.notes)
+"""
+_FTS_DELETE = f"""
+    INSERT INTO calls_fts (calls_fts, rowid, contact_name, phone_digits, notes)
+    VALUES ('delete', OLD.id, OLD.contact_name, {_phone_tokens_sql("OLD.phone_number")}, OLD.notes)
+"""
+
+def normalize_phone(phone, default_country="1"):
+    """Return ``phone`` as E.164 ("+17143351412"), or None if it isn't one.
+
+    Ten-digit numbers are assumed to be North American; anything written
+    with a leading "+" keeps its own country code.
+    """
+    phone = (phone or "").strip()
+    digits = re.sub(r"\D", "", phone)
+    if phone.startswith("+"):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f"+{default_country}{digits}"
+    if len(digits) == 11 and digits.startswith(default_country):
+        return f"+{digits}"
+    return None
+
+
+def _contact_key(name, phone):
+    """(contact_key, phone_e164) for a call, or (None, None) for an anonymous one.
+
+    Contacts are keyed by E.164 phone.  Calls without a usable number fall
+    back to the case-folded name so they still group and autocomplete.
+    """
+    e164 = normalize_phone(phone)
+    if e164:
+        return e164, e164
+    name = " ".join((name or "").split()).casefold()
+    if name:
+        return f"name:{name}", None
+    digits = re.sub(r"\D", "", phone or "")
+    return (f"raw:{digits}", None) if digits else (None, None)
+
+
+def _contacts_schema(conn):
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(calls)")}
+    if "contact_id" not in columns:
+        conn.execute("ALTER TABLE calls ADD COLUMN contact_id INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_contact_ts ON calls (contact_id, call_ts)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            contact_key TEXT NOT NULL UNIQUE,
+            phone_e164 TEXT,
+            name TEXT NOT NULL DEFAULT '',
+            phone_number TEXT NOT NULL DEFAULT '',
+            last_call_id INTEGER,
+            last_call_ts INTEGER,
+            call_count INTEGER NOT NULL DEFAULT 0,
+            ghl_contact_id TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    # Every spelling a contact has been logged under, newest use first.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contact_names (
+            contact_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            last_seen_ts INTEGER,
+            PRIMARY KEY (contact_id, name)
+        ) WITHOUT ROWID
+    """)
+    # One row per contact (rowid = contacts.id), so autocomplete never has
+    # to group the calls table.
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+            contact_name, phone_digits,
+            prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    _rebuild_contacts(conn)
+
+
+# Append-only: each entry is one schema version (see db.apply_migrations).
+MIGRATIONS = [
+    _base_schema,
+    (
+        "CREATE INDEX IF NOT EXISTS idx_calls_agent_datetime ON calls (agent_name, call_datetime)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_followup_agent ON calls (follow_up_date, agent_name)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_outcome_datetime ON calls (outcome, call_datetime)",
+        "CREATE INDEX IF NOT EXISTS idx_calls_datetime ON calls (call_datetime)",
+    ),
+    (
+        """CREATE TABLE IF NOT EXISTS calls_daily (
+               day TEXT NOT NULL,
+               agent_name TEXT NOT NULL,
+               outcome TEXT NOT NULL,
+               direction TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (day, agent_name, outcome, direction)
+           ) WITHOUT ROWID""",
+        *_rollup_triggers("substr({row}.call_datetime, 1, 10)", "call_datetime"),
+        _rollup_backfill("substr({row}.call_datetime, 1, 10)"),
+    ),
+    (
+        # Contentless: the index stores tokens only and joins back to calls
+        # by rowid, so notes aren't duplicated on disk.
+        """CREATE VIRTUAL TABLE IF NOT EXISTS calls_fts USING fts5(
+               contact_name, phone_digits, notes,
+               content='', prefix='2 3',
+               tokenize='unicode61 remove_diacritics 2'
+           )""",
+        f"CREATE TRIGGER IF NOT EXISTS calls_fts_ai AFTER INSERT ON calls BEGIN {_FTS_INSERT}; END",
+        f"CREATE TRIGGER IF NOT EXISTS calls_fts_ad AFTER DELETE ON calls BEGIN {_FTS_DELETE}; END",
+        f"""CREATE TRIGGER IF NOT EXISTS calls_fts_au
+            AFTER UPDATE OF contact_name, phone_number, notes ON calls
+            BEGIN {_FTS_DELETE}; {_FTS_INSERT}; END""",
+        f"""INSERT INTO calls_fts (rowid, contact_name, phone_digits, notes)
+            SELECT id, contact_name, {_phone_tokens_sql("phone_number")}, notes FROM calls""",
+    ),
+    _epoch_columns,
+    _contacts_schema,
+    (
+        # Covers call_total(), which scoreboard call milestones read.
+        "CREATE INDEX IF NOT EXISTS idx_calls_daily_agent ON calls_daily (agent_name, count)",
+    ),
+    _undated_calls,
+]
+
+
+def _migrate(conn):
+    db.apply_migrations(conn, MIGRATIONS)
 
 
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(str(CALLS_DB_PATH))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    try:
+    with db.connection(config.CALLS_DB_PATH, init=_migrate) as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def init_db():
+    with get_db():
+        pass
+
+
+def rebuild_contacts():
+    """Re-derive contacts from the calls table. Returns the contact count."""
     with get_db() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS calls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT NOT NULL DEFAULT '',
-                contact_name TEXT NOT NULL DEFAULT '',
-                phone_number TEXT NOT NULL DEFAULT '',
-                call_datetime TEXT NOT NULL,
-                direction TEXT NOT NULL,
-                outcome TEXT NOT NULL,
-                notes TEXT NOT NULL DEFAULT '',
-                follow_up_date TEXT,
-                created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
-                updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_contacts(conn)
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+
+_ROLLUP_ADD = """
+    INSERT INTO calls_daily (day, agent_name, outcome, direction, count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (day, agent_name, outcome, direction)
+    DO UPDATE SET count = count + excluded.count
+"""
+
+
+def _rollup_counts(conn, table, where="1", params=()):
+    """calls_daily-shaped (day, agent, outcome, direction, count) rows for ``table``."""
+    day = _ROLLUP_DAY.format(row=table)
+    return conn.execute(
+        f"""SELECT {day}, agent_name, outcome, direction, COUNT(*) FROM {table}
+            WHERE {where} GROUP BY 1, 2, 3, 4""",
+        params,
+    ).fetchall()
+
+
+def rebuild_daily_rollup():
+    """Recompute calls_daily from the calls table and archived calls.
+
+    Returns the row count.
+    """
+    with get_db() as conn, archive.attached(conn):
+        conn.execute("DELETE FROM calls_daily")
+        conn.execute(_ROLLUP_BACKFILL)
+        conn.executemany(_ROLLUP_ADD, _rollup_counts(conn, f"{archive.SCHEMA}.calls"))
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM calls_daily").fetchone()[0]
+
+
+_ARCHIVE_COLUMNS = """id, agent_name, contact_name, phone_number, call_datetime, call_ts,
+    call_day, direction, outcome, notes, follow_up_date, contact_id, created_at, updated_at"""
+
+
+def archive_calls(before=None) -> int:
+    """Move calls made before ``before`` into archive.db. Returns how many.
+
+    ``before`` defaults to archive.horizon().  Calls with a follow-up still
+    ahead stay hot.  calls_daily keeps counting the moved calls, so
+    dashboards and all-time outcome totals don't change.  Contacts whose
+    calls have all been archived are kept (call_count 0) but drop out of
+    suggestions.  Work is done in
+    batches of archive.BATCH_SIZE, each its own transaction.  Rows are
+    copied with INSERT OR IGNORE, so a batch interrupted after the copy is
+    simply moved again on the next run.
+    """
+    before = before or archive.horizon()
+    params = {
+        "before_ts": timeutil.day_start(before),
+        "today": timeutil.today().isoformat(),
+        "limit": archive.BATCH_SIZE,
+    }
+    moved = 0
+    with get_db() as conn, archive.attached(conn):
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            batch = [r[0] for r in conn.execute(
+                """SELECT id FROM calls
+                   WHERE call_ts < :before_ts
+                     AND (follow_up_date IS NULL OR follow_up_date < :today)
+                   ORDER BY call_ts LIMIT :limit""",
+                params,
+            )]
+            if not batch:
+                conn.rollback()
+                break
+            ids = json.dumps(batch)
+            selected = "id IN (SELECT value FROM json_each(?))"
+            conn.execute(
+                f"""INSERT OR IGNORE INTO {archive.SCHEMA}.calls ({_ARCHIVE_COLUMNS})
+                    SELECT {_ARCHIVE_COLUMNS} FROM calls WHERE {selected}""",
+                (ids,),
             )
-        """)
-        try:
-            conn.execute("ALTER TABLE calls ADD COLUMN agent_name TEXT NOT NULL DEFAULT ''")
-        except sqlite3.OperationalError:
-            pass
+            counts = _rollup_counts(conn, "calls", selected, (ids,))
+            contact_ids = [r[0] for r in conn.execute(
+                f"SELECT DISTINCT contact_id FROM calls WHERE {selected}", (ids,)
+            )]
+            # The delete trigger takes these calls out of calls_daily; put
+            # them back, since the rollup covers archived days too.
+            conn.execute(f"DELETE FROM calls WHERE {selected}", (ids,))
+            conn.executemany(_ROLLUP_ADD, counts)
+            _refresh_contacts(conn, contact_ids, keep_empty=True)
+            conn.commit()
+            moved += len(batch)
+    return moved
+
+
+def _call_total(conn, agent_name) -> int:
+    return conn.execute(
+        "SELECT COALESCE(SUM(count), 0) FROM calls_daily WHERE agent_name = ?",
+        (agent_name,),
+    ).fetchone()[0]
+
+
+def call_total(agent_name) -> int:
+    """All-time calls logged by ``agent_name``, archived ones included."""
+    with get_db() as conn:
+        return _call_total(conn, agent_name)
+
+
+def data_version() -> int:
+    """calls.db's PRAGMA data_version on this thread's connection.
+
+    It changes whenever another connection commits to calls.db, which lets
+    a reader that never writes (the live scoreboard) notice new calls
+    without querying the table.
+    """
+    with get_db() as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+# ---------------------------------------------------------------------------
+# Contacts
+# ---------------------------------------------------------------------------
+
+def _contact_id(conn, name, phone, cache=None):
+    """Return the contacts.id for a call's name/phone, creating it if needed."""
+    key, e164 = _contact_key(name, phone)
+    if key is None:
+        return None
+    if cache is not None and key in cache:
+        return cache[key]
+    contact_id = conn.execute(
+        """INSERT INTO contacts (contact_key, phone_e164) VALUES (?, ?)
+           ON CONFLICT (contact_key) DO UPDATE SET contact_key = excluded.contact_key
+           RETURNING id""",
+        (key, e164),
+    ).fetchone()[0]
+    if cache is not None:
+        cache[key] = contact_id
+    return contact_id
+
+
+def _refresh_contacts(conn, contact_ids, keep_empty=False):
+    """Recompute counts, last call, name variants and search rows for contacts.
+
+    Each step is an indexed lookup on calls (contact_id, call_ts), so the
+    cost scales with the contacts' own calls, not the table.  Contacts left
+    with no calls are removed, unless ``keep_empty``: archiving keeps them
+    (their id, GHL link and timeline URL stay valid) with call_count 0 and
+    their names and search row as they were.
+    """
+    ids = json.dumps(sorted({i for i in contact_ids if i is not None}))
+    selected = "SELECT value FROM json_each(?)"
+    conn.execute(
+        f"""UPDATE contacts SET
+               call_count = (SELECT COUNT(*) FROM calls WHERE contact_id = contacts.id),
+               last_call_id = (SELECT id FROM calls WHERE contact_id = contacts.id
+                               ORDER BY call_ts DESC, id DESC LIMIT 1)
+            WHERE id IN ({selected})""",
+        (ids,),
+    )
+    conn.execute(
+        f"""UPDATE contacts SET (name, phone_number, last_call_ts) = (
+               SELECT contact_name, phone_number, call_ts FROM calls
+               WHERE calls.id = contacts.last_call_id)
+            WHERE id IN ({selected}) AND last_call_id IS NOT NULL""",
+        (ids,),
+    )
+    if keep_empty:
+        ids = json.dumps([r[0] for r in conn.execute(
+            f"SELECT id FROM contacts WHERE id IN ({selected}) AND call_count > 0", (ids,)
+        )])
+    else:
+        conn.execute(
+            f"DELETE FROM contacts WHERE id IN ({selected}) AND call_count = 0", (ids,)
+        )
+
+    conn.execute(f"DELETE FROM contact_names WHERE contact_id IN ({selected})", (ids,))
+    conn.execute(
+        f"""INSERT INTO contact_names (contact_id, name, last_seen_ts)
+            SELECT contact_id, contact_name, MAX(call_ts) FROM calls
+            WHERE contact_id IN ({selected}) AND contact_name != ''
+            GROUP BY contact_id, contact_name""",
+        (ids,),
+    )
+    conn.execute(f"DELETE FROM contacts_fts WHERE rowid IN ({selected})", (ids,))
+    conn.execute(
+        f"""INSERT INTO contacts_fts (rowid, contact_name, phone_digits)
+            SELECT id,
+                   (SELECT group_concat(name, ' ') FROM contact_names
+                    WHERE contact_id = contacts.id),
+                   {_phone_tokens_sql("coalesce(phone_e164, phone_number)")}
+            FROM contacts WHERE id IN ({selected})""",
+        (ids,),
+    )
+
+
+def _rebuild_contacts(conn):
+    cache = {}
+    rows = conn.execute("SELECT id, contact_name, phone_number FROM calls").fetchall()
+    conn.executemany(
+        "UPDATE calls SET contact_id = ? WHERE id = ?",
+        [(_contact_id(conn, r["contact_name"], r["phone_number"], cache), r["id"])
+         for r in rows],
+    )
+    all_ids = [r[0] for r in conn.execute("SELECT id FROM contacts")]
+    # Contacts whose calls are all archived stay, as in archive_calls().
+    _refresh_contacts(conn, all_ids, keep_empty=True)
+
+
+def get_contact(contact_id):
+    with get_db() as conn:
+        return conn.execute("SELECT * FROM contacts WHERE id = ?", (contact_id,)).fetchone()
+
+
+def find_contact(name="", phone=""):
+    """Look up the contact a call with this name/phone belongs to, or None."""
+    key, _ = _contact_key(name, phone)
+    if key is None:
+        return None
+    with get_db() as conn:
+        return conn.execute("SELECT * FROM contacts WHERE contact_key = ?", (key,)).fetchone()
+
+
+def get_contact_names(contact_id):
+    """Every name a contact was logged under, most recently used first."""
+    with get_db() as conn:
+        rows = conn.execute(
+            """SELECT name FROM contact_names WHERE contact_id = ?
+               ORDER BY last_seen_ts DESC""",
+            (contact_id,),
+        ).fetchall()
+    return [r["name"] for r in rows]
+
+
+def set_ghl_contact_id(contact_id, ghl_contact_id):
+    """Remember the Go High Level id so later syncs can skip the upsert."""
+    with get_db() as conn:
+        conn.execute("UPDATE contacts SET ghl_contact_id = ? WHERE id = ?",
+                     (ghl_contact_id, contact_id))
         conn.commit()
 
 
@@ -46,19 +576,104 @@ def init_db():
 # CRUD
 # ---------------------------------------------------------------------------
 
+def record_call(agent_name, contact_name, phone_number, call_datetime, direction,
+                outcome, notes="", follow_up_date=None) -> tuple[int, int]:
+    """Log a call and return ``(call_id, call_total)``.
+
+    ``call_total`` is the agent's all-time call count read inside the
+    insert's write transaction, so concurrent calls each see their own
+    total and a milestone is crossed exactly once.
+    """
+    times = _call_time_fields(call_datetime) or _call_time_fields(
+        timeutil.now().strftime(CALL_DATETIME_FORMAT))
+    with get_db() as conn:
+        contact_id = _contact_id(conn, contact_name, phone_number)
+        cur = conn.execute(
+            """INSERT INTO calls
+               (agent_name, contact_name, phone_number, call_datetime, call_ts,
+                call_day, direction, outcome, notes, follow_up_date, contact_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (agent_name, contact_name, phone_number, times["call_datetime"],
+             times["call_ts"], times["call_day"], direction, outcome, notes,
+             _follow_up_date(follow_up_date), contact_id),
+        )
+        _refresh_contacts(conn, [contact_id])
+        total = _call_total(conn, agent_name)
+        conn.commit()
+        return cur.lastrowid, total
+
+
 def log_call(agent_name, contact_name, phone_number, call_datetime, direction,
              outcome, notes="", follow_up_date=None):
+    return record_call(agent_name, contact_name, phone_number, call_datetime,
+                       direction, outcome, notes, follow_up_date)[0]
+
+
+def log_calls_bulk(rows):
+    """Insert many calls in one transaction, skipping ones already logged.
+
+    ``rows`` are dicts with the log_call() fields and a parseable
+    call_datetime.  A row is a duplicate when a call with the same
+    (agent_name, phone_number, call time) exists in the database or earlier
+    in the batch.  Returns ``(inserted, duplicates)`` where ``inserted`` is
+    the list of rows actually written.
+    """
+    inserted, duplicates, _ = record_calls_bulk(rows)
+    return inserted, duplicates
+
+
+def record_calls_bulk(rows):
+    """log_calls_bulk(), also returning ``{agent: call_total}`` for inserting agents.
+
+    Totals are read in the import's write transaction, as in record_call().
+    """
+    if not rows:
+        return [], 0, {}
+
+    rows = [{**r, **_call_time_fields(r["call_datetime"]),
+             "notes": r.get("notes") or "",
+             "follow_up_date": _follow_up_date(r.get("follow_up_date"))} for r in rows]
+    by_agent = {}
+    for r in rows:
+        by_agent.setdefault(r["agent_name"], []).append(r)
+
     with get_db() as conn:
-        cur = conn.execute(
+        # Take the write lock up front so a concurrent upload can't slip the
+        # same calls in between the duplicate check and the insert.
+        conn.execute("BEGIN IMMEDIATE")
+        seen = set()
+        for agent, agent_rows in by_agent.items():
+            times = [r["call_ts"] for r in agent_rows]
+            existing = conn.execute(
+                """SELECT phone_number, call_ts FROM calls
+                   WHERE agent_name = ? AND call_ts >= ? AND call_ts <= ?""",
+                (agent, min(times), max(times)),
+            ).fetchall()
+            seen.update((agent, e["phone_number"], e["call_ts"]) for e in existing)
+
+        inserted = []
+        for r in rows:
+            key = (r["agent_name"], r["phone_number"], r["call_ts"])
+            if key not in seen:
+                seen.add(key)
+                inserted.append(r)
+
+        cache = {}
+        for r in inserted:
+            r["contact_id"] = _contact_id(conn, r["contact_name"], r["phone_number"], cache)
+        conn.executemany(
             """INSERT INTO calls
-               (agent_name, contact_name, phone_number, call_datetime,
-                direction, outcome, notes, follow_up_date)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (agent_name, contact_name, phone_number, call_datetime,
-             direction, outcome, notes, follow_up_date or None),
+               (agent_name, contact_name, phone_number, call_datetime, call_ts,
+                call_day, direction, outcome, notes, follow_up_date, contact_id)
+               VALUES (:agent_name, :contact_name, :phone_number, :call_datetime,
+                       :call_ts, :call_day, :direction, :outcome, :notes,
+                       :follow_up_date, :contact_id)""",
+            inserted,
         )
+        _refresh_contacts(conn, cache.values())
+        totals = {a: _call_total(conn, a) for a in {r["agent_name"] for r in inserted}}
         conn.commit()
-        return cur.lastrowid
+    return inserted, len(rows) - len(inserted), totals
 
 
 def update_call(call_id, **fields):
@@ -67,19 +682,40 @@ def update_call(call_id, **fields):
         "direction", "outcome", "notes", "follow_up_date",
     }
     updates = {k: v for k, v in fields.items() if k in allowed}
+    if "call_datetime" in updates:
+        # An empty or unreadable time from the edit form keeps the old one.
+        times = _call_time_fields(updates.pop("call_datetime"))
+        if times:
+            updates.update(times)
+    if "follow_up_date" in updates:
+        updates["follow_up_date"] = _follow_up_date(updates["follow_up_date"])
     if not updates:
         return
-    updates["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    set_clause = ", ".join(f"{k} = ?" for k in updates)
-    values = list(updates.values()) + [call_id]
+    updates["updated_at"] = timeutil.now().strftime("%Y-%m-%d %H:%M:%S")
     with get_db() as conn:
+        old = conn.execute(
+            "SELECT contact_name, phone_number, contact_id FROM calls WHERE id = ?", (call_id,)
+        ).fetchone()
+        if old is None:
+            return
+        updates["contact_id"] = _contact_id(
+            conn,
+            updates.get("contact_name", old["contact_name"]),
+            updates.get("phone_number", old["phone_number"]),
+        )
+        set_clause = ", ".join(f"{k} = ?" for k in updates)
+        values = list(updates.values()) + [call_id]
         conn.execute(f"UPDATE calls SET {set_clause} WHERE id = ?", values)
+        _refresh_contacts(conn, [old["contact_id"], updates["contact_id"]])
         conn.commit()
 
 
 def delete_call(call_id):
     with get_db() as conn:
+        row = conn.execute("SELECT contact_id FROM calls WHERE id = ?", (call_id,)).fetchone()
         conn.execute("DELETE FROM calls WHERE id = ?", (call_id,))
+        if row:
+            _refresh_contacts(conn, [row["contact_id"]])
         conn.commit()
 
 
@@ -88,8 +724,8 @@ def get_call(call_id):
         return conn.execute("SELECT * FROM calls WHERE id = ?", (call_id,)).fetchone()
 
 
-def get_calls(limit=200, offset=0, direction=None, outcome=None,
-              search=None, date_from=None, date_to=None, agent_name=None):
+def _call_filters(direction=None, outcome=None, search=None, date_from=None,
+                  date_to=None, agent_name=None):
     clauses = []
     params = []
 
@@ -103,29 +739,98 @@ def get_calls(limit=200, offset=0, direction=None, outcome=None,
         clauses.append("outcome = ?")
         params.append(outcome)
     if search:
-        clauses.append("(contact_name LIKE ? OR phone_number LIKE ?)")
-        params.extend([f"%{search}%", f"%{search}%"])
-    if date_from:
-        clauses.append("call_datetime >= ?")
-        params.append(date_from)
-    if date_to:
-        clauses.append("call_datetime <= ?")
-        params.append(date_to + " 23:59:59")
+        match = _fts_query(search, columns=("contact_name", "phone_digits", "notes"))
+        clauses.append("id IN (SELECT rowid FROM calls_fts WHERE calls_fts MATCH ?)")
+        # Nothing searchable (e.g. only punctuation) matches nothing.
+        params.append(match or '""')
+    # Dates are local calendar days; compare as a half-open epoch range.
+    day_from = timeutil.parse_date(date_from) if date_from else None
+    day_to = timeutil.parse_date(date_to) if date_to else None
+    if day_from:
+        clauses.append("call_ts >= ?")
+        params.append(timeutil.day_start(day_from))
+    if day_to:
+        clauses.append("call_ts < ?")
+        params.append(timeutil.day_end(day_to))
+    return clauses, params
+
 
+def get_calls(limit=200, offset=0, **filters):
+    clauses, params = _call_filters(**filters)
     where = "WHERE " + " AND ".join(clauses) if clauses else ""
-    query = f"SELECT * FROM calls {where} ORDER BY call_datetime DESC LIMIT ? OFFSET ?"
+    query = f"SELECT * FROM calls {where} ORDER BY call_ts DESC, id DESC LIMIT ? OFFSET ?"
     params.extend([limit, offset])
 
     with get_db() as conn:
         return conn.execute(query, params).fetchall()
 
 
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past ``row``."""
+    return f"{row['call_ts']}|{row['id']}"
+
+
+def _decode_cursor(cursor):
+    try:
+        call_ts, call_id = cursor.split("|", 1)
+        return int(call_ts), int(call_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_calls_page(cursor=None, limit=50, **filters):
+    """Return ``(rows, next_cursor)`` for one page of calls, newest first.
+
+    Pages are keyed on (call_ts, id) rather than OFFSET, so page 100
+    costs the same as page 1 and rows logged meanwhile don't shift pages.
+    ``next_cursor`` is None on the last page.
+    """
+    clauses, params = _call_filters(**filters)
+    after = _decode_cursor(cursor) if cursor else None
+    if after:
+        clauses.append("(call_ts, id) < (?, ?)")
+        params.extend(after)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    params.append(limit + 1)
+
+    with get_db() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM calls {where} ORDER BY call_ts DESC, id DESC LIMIT ?",
+            params,
+        ).fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def iter_calls(batch_size=500, **filters):
+    """Yield every matching call, newest first, without building a list.
+
+    Rows are pulled from one cursor ``batch_size`` at a time, so memory use
+    stays flat however many calls match.
+    """
+    clauses, params = _call_filters(**filters)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    with get_db() as conn:
+        cur = conn.execute(
+            f"SELECT * FROM calls {where} ORDER BY call_ts DESC, id DESC", params
+        )
+        try:
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cur.close()
+
+
 # ---------------------------------------------------------------------------
 # Stats & reporting
 # ---------------------------------------------------------------------------
 
 def _week_bounds():
-    today = datetime.now()
+    today = timeutil.today()
     monday = today - timedelta(days=today.weekday())
     friday = monday + timedelta(days=4)
     return monday.strftime("%Y-%m-%d"), friday.strftime("%Y-%m-%d")
@@ -133,104 +838,136 @@ def _week_bounds():
 
 def get_week_calls():
     mon, fri = _week_bounds()
-    return get_calls(limit=9999, date_from=mon, date_to=fri)
+    return list(iter_calls(date_from=mon, date_to=fri))
 
 
 def get_today_calls():
-    today = datetime.now().strftime("%Y-%m-%d")
-    return get_calls(limit=9999, date_from=today, date_to=today)
+    today = timeutil.today().isoformat()
+    return list(iter_calls(date_from=today, date_to=today))
+
+
+@dataclass
+class CallStats:
+    """Dashboard counters for one agent (or the whole team).
+
+    ``outcomes`` and ``agent_stats`` are always team-wide for the current
+    week; the other fields are scoped to the agent the stats were built for.
+    """
+    today_count: int = 0
+    week_count: int = 0
+    outcomes: list = field(default_factory=list)
+    follow_ups: list = field(default_factory=list)
+    agent_stats: list = field(default_factory=list)
+    due_today: list = field(default_factory=list)
 
 
-def get_stats(agent_name=None):
-    today = datetime.now().strftime("%Y-%m-%d")
+def _collect_stats(agent_names):
+    """Build team stats plus stats for each of ``agent_names`` in two queries.
+
+    Counters come from the trigger-maintained calls_daily rollup, so their
+    cost depends on agents x days rather than on how many calls are stored.
+    Returns a dict keyed by agent name, with the team-wide stats under None.
+    """
+    today = timeutil.today().isoformat()
     mon, fri = _week_bounds()
+    params = {
+        "today": today,
+        "mon": mon,
+        "fri": fri,
+        # Weekend days fall after Friday but still count towards "today".
+        "range_end": max(fri, today),
+    }
 
     with get_db() as conn:
-        if agent_name:
-            today_count = conn.execute(
-                "SELECT COUNT(*) FROM calls WHERE agent_name = ? AND call_datetime >= ? AND call_datetime <= ?",
-                (agent_name, today, today + " 23:59:59"),
-            ).fetchone()[0]
-
-            week_count = conn.execute(
-                "SELECT COUNT(*) FROM calls WHERE agent_name = ? AND call_datetime >= ? AND call_datetime <= ?",
-                (agent_name, mon, fri + " 23:59:59"),
-            ).fetchone()[0]
-        else:
-            today_count = conn.execute(
-                "SELECT COUNT(*) FROM calls WHERE call_datetime >= ? AND call_datetime <= ?",
-                (today, today + " 23:59:59"),
-            ).fetchone()[0]
-
-            week_count = conn.execute(
-                "SELECT COUNT(*) FROM calls WHERE call_datetime >= ? AND call_datetime <= ?",
-                (mon, fri + " 23:59:59"),
-            ).fetchone()[0]
-
-        # Team-wide outcome breakdown (no agent filter)
-        outcomes = conn.execute(
-            """SELECT outcome, COUNT(*) as cnt FROM calls
-               WHERE call_datetime >= ? AND call_datetime <= ?
-               GROUP BY outcome ORDER BY cnt DESC""",
-            (mon, fri + " 23:59:59"),
+        counts = conn.execute(
+            """SELECT agent_name, outcome,
+                      SUM(CASE WHEN day = :today THEN count ELSE 0 END) AS today_cnt,
+                      SUM(CASE WHEN day <= :fri THEN count ELSE 0 END) AS week_cnt
+               FROM calls_daily
+               WHERE day >= :mon AND day <= :range_end
+               GROUP BY agent_name, outcome""",
+            params,
         ).fetchall()
 
-        if agent_name:
-            follow_ups = conn.execute(
-                """SELECT * FROM calls
-                   WHERE agent_name = ? AND follow_up_date IS NOT NULL AND follow_up_date >= ?
-                   ORDER BY follow_up_date ASC LIMIT 10""",
-                (agent_name, today),
-            ).fetchall()
-        else:
-            follow_ups = conn.execute(
-                """SELECT * FROM calls
-                   WHERE follow_up_date IS NOT NULL AND follow_up_date >= ?
-                   ORDER BY follow_up_date ASC LIMIT 10""",
-                (today,),
-            ).fetchall()
+        # Next 10 follow-ups team-wide and per agent, plus everything due today.
+        # "+agent_name" stops the planner from walking the whole agent index
+        # to satisfy PARTITION BY instead of range-searching follow_up_date.
+        follow_ups = conn.execute(
+            """SELECT * FROM (
+                   SELECT *,
+                          ROW_NUMBER() OVER (ORDER BY follow_up_date, id) AS team_rank,
+                          ROW_NUMBER() OVER (PARTITION BY +agent_name
+                                             ORDER BY follow_up_date, id) AS agent_rank
+                   FROM calls
+                   WHERE follow_up_date >= :today
+               )
+               WHERE team_rank <= 10 OR agent_rank <= 10 OR follow_up_date = :today
+               ORDER BY follow_up_date, id""",
+            params,
+        ).fetchall()
 
-        # Team-wide per-agent stats for configured agents only.
-        if AGENT_CHOICES:
-            placeholders = ",".join("?" for _ in AGENT_CHOICES)
-            agent_stats = conn.execute(
-                f"""SELECT agent_name, COUNT(*) as cnt FROM calls
-                   WHERE call_datetime >= ? AND call_datetime <= ?
-                   AND agent_name IN ({placeholders})
-                   GROUP BY agent_name ORDER BY cnt DESC""",
-                (mon, fri + " 23:59:59", *AGENT_CHOICES),
-            ).fetchall()
-        else:
-            agent_stats = []
+    stats = {name: CallStats() for name in agent_names}
+    team = stats[None] = CallStats()
+    outcome_totals = {}
+    agent_totals = {}
+    for r in counts:
+        agent, outcome = r["agent_name"], r["outcome"]
+        today_cnt, week_cnt = r["today_cnt"], r["week_cnt"]
+        team.today_count += today_cnt
+        team.week_count += week_cnt
+        if week_cnt:
+            outcome_totals[outcome] = outcome_totals.get(outcome, 0) + week_cnt
+            agent_totals[agent] = agent_totals.get(agent, 0) + week_cnt
+        if agent in stats:
+            stats[agent].today_count += today_cnt
+            stats[agent].week_count += week_cnt
 
-        if agent_name:
-            due_today = conn.execute(
-                """SELECT * FROM calls
-                   WHERE agent_name = ? AND follow_up_date = ?
-                   ORDER BY contact_name ASC""",
-                (agent_name, today),
-            ).fetchall()
-        else:
-            due_today = conn.execute(
-                """SELECT * FROM calls
-                   WHERE follow_up_date = ?
-                   ORDER BY contact_name ASC""",
-                (today,),
-            ).fetchall()
+    outcomes = [
+        {"outcome": o, "count": c}
+        for o, c in sorted(outcome_totals.items(), key=lambda x: -x[1])
+    ]
+    # Team-wide per-agent stats for configured agents only.
+    agent_stats = [
+        {"agent": a, "count": c}
+        for a, c in sorted(agent_totals.items(), key=lambda x: -x[1])
+        if a in AGENT_CHOICES
+    ]
+
+    for r in follow_ups:
+        row = {k: r[k] for k in r.keys() if k not in ("team_rank", "agent_rank")}
+        targets = [(team, r["team_rank"])]
+        if r["agent_name"] in stats:
+            targets.append((stats[r["agent_name"]], r["agent_rank"]))
+        for target, rank in targets:
+            if rank <= 10:
+                target.follow_ups.append(row)
+            if row["follow_up_date"] == today:
+                target.due_today.append(row)
+
+    for s in stats.values():
+        s.outcomes = outcomes
+        s.agent_stats = agent_stats
+        s.due_today.sort(key=lambda d: d["contact_name"])
+    return stats
 
-    return {
-        "today_count": today_count,
-        "week_count": week_count,
-        "outcomes": [{"outcome": r["outcome"], "count": r["cnt"]} for r in outcomes],
-        "follow_ups": [dict(r) for r in follow_ups],
-        "agent_stats": [{"agent": r["agent_name"], "count": r["cnt"]} for r in agent_stats],
-        "due_today": [dict(r) for r in due_today],
-    }
+
+def get_stats(agent_name=None) -> CallStats:
+    """Dashboard stats for one agent, or team-wide when no agent is given."""
+    if agent_name:
+        return _collect_stats([agent_name])[agent_name]
+    return _collect_stats([])[None]
+
+
+def get_stats_for_agents(agent_names=None) -> dict[str, CallStats]:
+    """Dashboard stats for many agents at once (all configured by default)."""
+    names = list(AGENT_CHOICES if agent_names is None else agent_names)
+    stats = _collect_stats(names)
+    return {name: stats[name] for name in names}
 
 
 def get_follow_up_dates(agent_name=None):
     """Return a dict mapping date strings to follow-up counts for the current month."""
-    now = datetime.now()
+    now = timeutil.today()
     month_start = now.strftime("%Y-%m-01")
     if now.month == 12:
         month_end = f"{now.year + 1}-01-01"
@@ -258,39 +995,125 @@ def get_follow_up_dates(agent_name=None):
     return {r["follow_up_date"]: r["cnt"] for r in rows}
 
 
-def get_pipeline_data():
-    """Return calls grouped by outcome for the Kanban board (max 50 per outcome)."""
+# Kanban cards only show the first 60 characters of notes; one extra
+# character tells the template whether to draw an ellipsis.
+_PIPELINE_COLUMNS = """id, contact_name, phone_number, substr(notes, 1, 61) AS notes,
+                      call_datetime, call_ts, agent_name, outcome"""
+
+
+def _pipeline_card(r):
+    return {
+        "id": r["id"],
+        "contact_name": r["contact_name"],
+        "phone_number": r["phone_number"],
+        "notes": r["notes"],
+        "call_datetime": r["call_datetime"],
+        "call_ts": r["call_ts"],
+        "agent_name": r["agent_name"],
+    }
+
+
+def _pipeline_column(rows, per_column):
+    return {
+        "cards": [_pipeline_card(r) for r in rows[:per_column]],
+        "more": len(rows) > per_column,
+    }
+
+
+def get_pipeline_data(per_column=50):
+    """Return the newest ``per_column`` calls per outcome for the Kanban board.
+
+    Ranking runs over the covering (outcome, call_ts) index, so only
+    the rows that end up on the board are read from the table.  Each column
+    is ``{"cards": [...], "more": bool}``; fetch further cards with
+    get_pipeline_column().
+    """
     with get_db() as conn:
         rows = conn.execute(
-            "SELECT * FROM calls ORDER BY call_datetime DESC"
+            f"""WITH ranked AS (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY outcome ORDER BY call_ts DESC, id DESC
+                    ) AS rn
+                    FROM calls
+                )
+                SELECT {_PIPELINE_COLUMNS}
+                FROM ranked JOIN calls USING (id)
+                WHERE ranked.rn <= ?
+                ORDER BY outcome, call_ts DESC, id DESC""",
+            (per_column + 1,),
         ).fetchall()
 
-    pipeline = {}
+    grouped = {}
     for r in rows:
-        outcome = r["outcome"]
-        if outcome not in pipeline:
-            pipeline[outcome] = []
-        if len(pipeline[outcome]) < 50:
-            pipeline[outcome].append({
-                "id": r["id"],
-                "contact_name": r["contact_name"],
-                "phone_number": r["phone_number"],
-                "notes": r["notes"],
-                "call_datetime": r["call_datetime"],
-                "agent_name": r["agent_name"],
-            })
-
-    return pipeline
+        grouped.setdefault(r["outcome"], []).append(r)
+    return {outcome: _pipeline_column(rs, per_column) for outcome, rs in grouped.items()}
+
+
+def get_pipeline_column(outcome, before=None, before_id=None, per_column=50):
+    """Return the next page of one Kanban column, older than (before, before_id).
+
+    ``before`` is the call_ts of the last card already shown.
+    """
+    clauses = ["outcome = ?"]
+    params = [outcome]
+    if before is not None and before_id is not None:
+        clauses.append("(call_ts, id) < (?, ?)")
+        params.extend([before, before_id])
+    params.append(per_column + 1)
+
+    with get_db() as conn:
+        rows = conn.execute(
+            f"""SELECT {_PIPELINE_COLUMNS} FROM calls
+                WHERE {" AND ".join(clauses)}
+                ORDER BY call_ts DESC, id DESC LIMIT ?""",
+            params,
+        ).fetchall()
+    return _pipeline_column(rows, per_column)
+
+
+def get_outcome_totals():
+    """Return all-time call counts per outcome from the daily rollup."""
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT outcome, SUM(count) AS cnt FROM calls_daily GROUP BY outcome"
+        ).fetchall()
+    return {r["outcome"]: r["cnt"] for r in rows}
+
+
+def _fts_query(text, columns=("contact_name", "phone_digits")):
+    """Turn free text into an FTS5 prefix query over ``columns``.
+
+    Phone-looking tokens ("(714) 335", "1412") match the digits column;
+    anything else is a quoted prefix term, so user input can't inject FTS
+    syntax.  Returns None when nothing searchable is left.
+    """
+    terms = []
+    for token in text.split():
+        digits = re.sub(r"\D", "", token)
+        if digits and "phone_digits" in columns and not re.search(r"[^\d\s\-().+/]", token):
+            terms.append(f'phone_digits : "{digits}"*')
+        elif re.search(r"\w", token):
+            text_cols = " ".join(c for c in columns if c != "phone_digits") or "phone_digits"
+            quoted = token.replace('"', '""')
+            terms.append(f'{{{text_cols}}} : "{quoted}"*')
+    return " AND ".join(terms) or None
 
 
 def get_contact_suggestions(query, limit=8):
+    """Autocomplete contacts by any name they were logged under or by phone.
+
+    Matches come from contacts_fts (one row per person), ranked by their
+    most recent call, and show the name and number from that call.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
     with get_db() as conn:
         rows = conn.execute(
-            """SELECT contact_name, phone_number, MAX(call_datetime) AS last_call
-               FROM calls
-               WHERE contact_name LIKE ? OR phone_number LIKE ?
-               GROUP BY contact_name, phone_number
-               ORDER BY last_call DESC LIMIT ?""",
-            (f"%{query}%", f"%{query}%", limit),
+            """SELECT c.name, c.phone_number
+               FROM contacts_fts JOIN contacts c ON c.id = contacts_fts.rowid
+               WHERE contacts_fts MATCH ? AND c.call_count > 0
+               ORDER BY c.last_call_ts DESC LIMIT ?""",
+            (match, limit),
         ).fetchall()
-    return [{"name": r["contact_name"], "phone": r["phone_number"]} for r in rows]
+    return [{"name": r["name"], "phone": r["phone_number"]} for r in rows]
@@ -1,16 +1,20 @@
 """SQLite-backed referral management."""
 
-import sqlite3
-from datetime import date, datetime
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
-from config import REFERRALS_DB_PATH
+import config
+import db
+import timeutil
+from models.calls import normalize_phone
 
 STATUSES = ["New", "Contacted", "Quoted", "Applied", "Sold", "Lost"]
 
 
-def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(REFERRALS_DB_PATH))
-    conn.row_factory = sqlite3.Row
+def _create_schema(conn):
     conn.execute("""
         CREATE TABLE IF NOT EXISTS referrals (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,83 +29,360 @@ def _get_conn() -> sqlite3.Connection:
             updated_at TEXT NOT NULL
         )
     """)
-    conn.commit()
-    return conn
 
 
-def add_referral(referrer_name, referred_name, phone="", email="", notes=""):
-    conn = _get_conn()
-    now = datetime.now().isoformat()
-    today = date.today().isoformat()
-    cur = conn.execute(
-        "INSERT INTO referrals (referrer_name, referred_name, referred_phone, "
-        "referred_email, date_added, status, notes, updated_at) "
-        "VALUES (?, ?, ?, ?, ?, 'New', ?, ?)",
-        (referrer_name, referred_name, phone, email, today, notes, now),
+def _phone_key(conn):
+    """Add referred_phone_e164 so contact timelines can find referrals by index."""
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(referrals)")}
+    if "referred_phone_e164" not in columns:
+        conn.execute("ALTER TABLE referrals ADD COLUMN referred_phone_e164 TEXT")
+    rows = conn.execute("SELECT id, referred_phone FROM referrals").fetchall()
+    conn.executemany(
+        "UPDATE referrals SET referred_phone_e164 = ? WHERE id = ?",
+        [(normalize_phone(r["referred_phone"]), r["id"]) for r in rows],
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_referrals_phone ON referrals (referred_phone_e164)"
+    )
+
+
+# Fields exchanged with the desktop referral tracker (see apply_changes()).
+SYNC_FIELDS = (
+    "referrer_name", "referred_name", "referred_phone", "referred_email",
+    "date_added", "status", "notes", "premium_sold", "updated_at",
+)
+
+
+def _sync_triggers():
+    """Stamp every insert and synced-field update with the next sync_clock value."""
+    bump = """UPDATE sync_clock SET seq = seq + 1;
+              UPDATE referrals SET sync_seq = (SELECT seq FROM sync_clock),
+                                   uuid = COALESCE(uuid, lower(hex(randomblob(16))))
+              WHERE id = NEW.id;"""
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS referrals_sync_ai AFTER INSERT ON referrals "
+        f"BEGIN {bump} DELETE FROM referral_tombstones WHERE uuid = NEW.uuid; END",
+        f"""CREATE TRIGGER IF NOT EXISTS referrals_sync_au
+            AFTER UPDATE OF {", ".join(SYNC_FIELDS)} ON referrals BEGIN {bump} END""",
+    )
+
+
+def _sync_schema(conn):
+    """Stable uuids, a change sequence and delete tombstones for desktop sync.
+
+    sync_seq comes from a single-row counter rather than updated_at so a
+    pull never misses rows whose (client-supplied) updated_at is older than
+    the puller's watermark.
+    """
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(referrals)")}
+    if "uuid" not in columns:
+        conn.execute("ALTER TABLE referrals ADD COLUMN uuid TEXT")
+    if "sync_seq" not in columns:
+        conn.execute("ALTER TABLE referrals ADD COLUMN sync_seq INTEGER NOT NULL DEFAULT 0")
+    rows = conn.execute("SELECT id FROM referrals WHERE uuid IS NULL").fetchall()
+    conn.executemany("UPDATE referrals SET uuid = ? WHERE id = ?",
+                     [(uuid.uuid4().hex, r["id"]) for r in rows])
+    conn.execute("UPDATE referrals SET sync_seq = id")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_referrals_uuid ON referrals (uuid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_referrals_sync_seq ON referrals (sync_seq)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS referral_tombstones (
+            uuid TEXT PRIMARY KEY,
+            deleted_at TEXT NOT NULL,
+            sync_seq INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_referral_tombstones_seq ON referral_tombstones (sync_seq)"
     )
-    conn.commit()
-    row_id = cur.lastrowid
-    conn.close()
-    return row_id
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_clock (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        "INSERT OR IGNORE INTO sync_clock (id, seq) "
+        "SELECT 1, COALESCE(MAX(id), 0) FROM referrals"
+    )
+    for sql in _sync_triggers():
+        conn.execute(sql)
+
+
+def _utc_stamps(conn):
+    """Rewrite updated_at/deleted_at stamps written in host local time as UTC.
+
+    Stamps used to be naive ``datetime.now()`` values; mixed with UTC ones
+    they sorted (and won sync conflicts) by the host's offset.  The sync
+    trigger is dropped meanwhile so the rewrite doesn't re-send every row.
+    """
+    def utc(stamp):
+        try:
+            dt = datetime.fromisoformat(stamp)
+        except (TypeError, ValueError):
+            return stamp
+        # astimezone() reads a naive value as host local time.
+        return _format_stamp(dt.astimezone(timezone.utc))
+
+    conn.execute("DROP TRIGGER IF EXISTS referrals_sync_au")
+    rows = conn.execute("SELECT id, updated_at FROM referrals").fetchall()
+    conn.executemany("UPDATE referrals SET updated_at = ? WHERE id = ?",
+                     [(utc(r["updated_at"]), r["id"]) for r in rows])
+    rows = conn.execute("SELECT uuid, deleted_at FROM referral_tombstones").fetchall()
+    conn.executemany("UPDATE referral_tombstones SET deleted_at = ? WHERE uuid = ?",
+                     [(utc(r["deleted_at"]), r["uuid"]) for r in rows])
+    for sql in _sync_triggers():
+        conn.execute(sql)
+
+
+# Append-only: each entry is one schema version (see db.apply_migrations).
+MIGRATIONS = [
+    _create_schema,
+    _phone_key,
+    (
+        # Covers get_stats()'s per-referrer/status grouping.
+        """CREATE INDEX IF NOT EXISTS idx_referrals_referrer_status
+           ON referrals (referrer_name, status)""",
+        # Thank-you list: newest sales first.
+        "CREATE INDEX IF NOT EXISTS idx_referrals_status_updated ON referrals (status, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_referrals_updated ON referrals (updated_at)",
+    ),
+    (
+        # Board pages are keyed on (date_added, id), optionally narrowed by
+        # status or referrer.
+        "CREATE INDEX IF NOT EXISTS idx_referrals_added ON referrals (date_added)",
+        """CREATE INDEX IF NOT EXISTS idx_referrals_status_added
+           ON referrals (status, date_added)""",
+        """CREATE INDEX IF NOT EXISTS idx_referrals_referrer_added
+           ON referrals (referrer_name, date_added)""",
+    ),
+    _sync_schema,
+    _utc_stamps,
+]
+
+
+def _migrate(conn):
+    db.apply_migrations(conn, MIGRATIONS)
+
+
+@contextmanager
+def _get_conn():
+    with db.connection(config.REFERRALS_DB_PATH, init=_migrate) as conn:
+        yield conn
+
+
+def init_db():
+    with _get_conn():
+        pass
+
+
+# get_stats() and get_referrer_names() are cached briefly per database;
+# writes in this process clear them at once, writes from other workers show
+# up within the TTL.
+STATS_TTL_SECONDS = 30
+_stats_cache: dict = {}
+_stats_lock = threading.Lock()
+_stats_generation = 0
+
+
+def _invalidate_stats():
+    global _stats_generation
+    with _stats_lock:
+        _stats_cache.clear()
+        _stats_generation += 1
+
+
+def _format_stamp(dt):
+    return dt.isoformat(timespec="microseconds")
+
+
+def _utc_now():
+    """updated_at stamp. Desktop sync compares these with the tracker's, so both use UTC."""
+    return _format_stamp(datetime.now(timezone.utc))
+
+
+def _parse_stamp(stamp):
+    """An updated_at stamp as an aware UTC datetime, or None if unreadable.
+
+    Naive stamps are taken as UTC (stored ones were converted by _utc_stamps).
+    """
+    try:
+        dt = datetime.fromisoformat(stamp)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def add_referral(referrer_name, referred_name, phone="", email="", notes=""):
+    now = _utc_now()
+    today = timeutil.today().isoformat()
+    with _get_conn() as conn:
+        cur = conn.execute(
+            "INSERT INTO referrals (uuid, referrer_name, referred_name, referred_phone, "
+            "referred_phone_e164, referred_email, date_added, status, notes, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'New', ?, ?)",
+            (uuid.uuid4().hex, referrer_name, referred_name, phone, normalize_phone(phone),
+             email, today, notes, now),
+        )
+        conn.commit()
+    _invalidate_stats()
+    return cur.lastrowid
 
 
 def get_all_referrals():
-    conn = _get_conn()
-    rows = conn.execute(
-        "SELECT * FROM referrals ORDER BY date_added DESC, id DESC"
-    ).fetchall()
-    conn.close()
+    with _get_conn() as conn:
+        rows = conn.execute(
+            "SELECT * FROM referrals ORDER BY date_added DESC, id DESC"
+        ).fetchall()
     return [dict(r) for r in rows]
 
 
+def _referral_filters(status=None, referrer=None, date_from=None, date_to=None):
+    """WHERE clauses for the referrals board; dates are inclusive ISO days."""
+    clauses, params = [], []
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if referrer:
+        clauses.append("referrer_name = ?")
+        params.append(referrer)
+    if date_from:
+        clauses.append("date_added >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date_added <= ?")
+        params.append(date_to)
+    return clauses, params
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past ``row``."""
+    return f"{row['date_added']}|{row['id']}"
+
+
+def _decode_cursor(cursor):
+    try:
+        date_added, row_id = cursor.split("|", 1)
+        return date_added, int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_referrals_page(cursor=None, limit=50, **filters):
+    """Return ``(rows, next_cursor)`` for one page of referrals, newest first.
+
+    Pages are keyed on (date_added, id) like the call history, so deep
+    pages cost the same as the first.  ``next_cursor`` is None on the last
+    page.
+    """
+    clauses, params = _referral_filters(**filters)
+    after = _decode_cursor(cursor) if cursor else None
+    if after:
+        clauses.append("(date_added, id) < (?, ?)")
+        params.extend(after)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    params.append(limit + 1)
+
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM referrals {where} ORDER BY date_added DESC, id DESC LIMIT ?",
+            params,
+        ).fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [dict(r) for r in rows[:limit]], next_cursor
+
+
+def get_status_counts(**filters):
+    """Per-status counts for the board's facets, from one grouped query.
+
+    The status filter itself is ignored so every facet shows how many rows
+    picking it would give.  Statuses with no rows are reported as 0.
+    """
+    filters.pop("status", None)
+    clauses, params = _referral_filters(**filters)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT status, COUNT(*) AS cnt FROM referrals {where} GROUP BY status",
+            params,
+        ).fetchall()
+    counts = {s: 0 for s in STATUSES}
+    counts.update({r["status"]: r["cnt"] for r in rows})
+    return counts
+
+
+def _collect_referrer_names():
+    """Distinct referrer names, read from the referrer index."""
+    with _get_conn() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT referrer_name FROM referrals ORDER BY referrer_name"
+        ).fetchall()
+    return [r["referrer_name"] for r in rows]
+
+
+def get_referrer_names():
+    return _cached("referrer_names", _collect_referrer_names)
+
+
 def get_referral(row_id):
-    conn = _get_conn()
-    row = conn.execute("SELECT * FROM referrals WHERE id = ?", (row_id,)).fetchone()
-    conn.close()
+    with _get_conn() as conn:
+        row = conn.execute("SELECT * FROM referrals WHERE id = ?", (row_id,)).fetchone()
     return dict(row) if row else None
 
 
 def update_status(row_id, new_status, premium=""):
-    conn = _get_conn()
-    now = datetime.now().isoformat()
-    if premium:
-        conn.execute(
-            "UPDATE referrals SET status=?, premium_sold=?, updated_at=? WHERE id=?",
-            (new_status, premium, now, row_id),
-        )
-    else:
-        conn.execute(
-            "UPDATE referrals SET status=?, updated_at=? WHERE id=?",
-            (new_status, now, row_id),
-        )
-    conn.commit()
-    conn.close()
+    now = _utc_now()
+    with _get_conn() as conn:
+        if premium:
+            conn.execute(
+                "UPDATE referrals SET status=?, premium_sold=?, updated_at=? WHERE id=?",
+                (new_status, premium, now, row_id),
+            )
+        else:
+            conn.execute(
+                "UPDATE referrals SET status=?, updated_at=? WHERE id=?",
+                (new_status, now, row_id),
+            )
+        conn.commit()
+    _invalidate_stats()
 
 
 def delete_referral(row_id):
-    conn = _get_conn()
-    conn.execute("DELETE FROM referrals WHERE id=?", (row_id,))
-    conn.commit()
-    conn.close()
-
-
-def get_stats():
-    conn = _get_conn()
-    total = conn.execute("SELECT COUNT(*) FROM referrals").fetchone()[0]
-    sold = conn.execute("SELECT COUNT(*) FROM referrals WHERE status='Sold'").fetchone()[0]
-    lost = conn.execute("SELECT COUNT(*) FROM referrals WHERE status='Lost'").fetchone()[0]
+    with _get_conn() as conn:
+        row = conn.execute("SELECT uuid FROM referrals WHERE id=?", (row_id,)).fetchone()
+        conn.execute("DELETE FROM referrals WHERE id=?", (row_id,))
+        if row:
+            _tombstone(conn, row["uuid"], _utc_now())
+        conn.commit()
+    _invalidate_stats()
 
-    top = conn.execute(
-        "SELECT referrer_name, COUNT(*) as cnt FROM referrals "
-        "GROUP BY referrer_name ORDER BY cnt DESC LIMIT 5"
-    ).fetchall()
 
-    thankyou = conn.execute(
-        "SELECT referrer_name, referred_name FROM referrals WHERE status='Sold' "
-        "ORDER BY updated_at DESC LIMIT 10"
-    ).fetchall()
+def _collect_stats():
+    """Totals and top referrers from one grouped pass over the covering
+    (referrer_name, status) index, plus an indexed read of recent sales."""
+    with _get_conn() as conn:
+        groups = conn.execute(
+            "SELECT referrer_name, status, COUNT(*) AS cnt FROM referrals "
+            "GROUP BY referrer_name, status"
+        ).fetchall()
+        thankyou = conn.execute(
+            "SELECT referrer_name, referred_name FROM referrals WHERE status='Sold' "
+            "ORDER BY updated_at DESC LIMIT 10"
+        ).fetchall()
 
-    conn.close()
+    total = sold = lost = 0
+    by_referrer = {}
+    for r in groups:
+        total += r["cnt"]
+        if r["status"] == "Sold":
+            sold += r["cnt"]
+        elif r["status"] == "Lost":
+            lost += r["cnt"]
+        by_referrer[r["referrer_name"]] = by_referrer.get(r["referrer_name"], 0) + r["cnt"]
+    top = sorted(by_referrer.items(), key=lambda x: (-x[1], x[0]))[:5]
 
     conversion = (sold / total * 100) if total > 0 else 0
     closed_total = sold + lost
@@ -113,6 +394,136 @@ def get_stats():
         "lost": lost,
         "conversion_pct": conversion,
         "close_rate_pct": close_rate,
-        "top_referrers": [(r["referrer_name"], r["cnt"]) for r in top],
+        "top_referrers": top,
         "thankyou_list": [(r["referrer_name"], r["referred_name"]) for r in thankyou],
     }
+
+
+def _cached(name, collect):
+    key = (str(config.REFERRALS_DB_PATH), name)
+    now = time.monotonic()
+    with _stats_lock:
+        cached = _stats_cache.get(key)
+        generation = _stats_generation
+    if cached and now - cached[0] < STATS_TTL_SECONDS:
+        return cached[1]
+    value = collect()
+    with _stats_lock:
+        # Don't store a result a concurrent write has already made stale.
+        if generation == _stats_generation:
+            _stats_cache[key] = (now, value)
+    return value
+
+
+def get_stats():
+    return _cached("stats", _collect_stats)
+
+
+# ---------------------------------------------------------------------------
+# Sync with the desktop referral tracker (pdf_generator/referral_sync.py)
+# ---------------------------------------------------------------------------
+
+def _tombstone(conn, row_uuid, deleted_at):
+    conn.execute("UPDATE sync_clock SET seq = seq + 1")
+    conn.execute(
+        """INSERT INTO referral_tombstones (uuid, deleted_at, sync_seq)
+           VALUES (?, ?, (SELECT seq FROM sync_clock))
+           ON CONFLICT (uuid) DO UPDATE SET
+               deleted_at = excluded.deleted_at, sync_seq = excluded.sync_seq""",
+        (row_uuid, deleted_at),
+    )
+
+
+def get_changes(since=0, limit=500):
+    """Rows and deletions after sync position ``since``, oldest first.
+
+    Returns ``(changes, watermark, more)``: change dicts carry ``uuid``,
+    ``deleted`` and SYNC_FIELDS (deletions only ``updated_at``, the time of
+    the delete); ``watermark`` is the position to pass next time.  Both
+    branches are range reads of a sync_seq index.
+    """
+    fields = ", ".join(SYNC_FIELDS)
+    nulls = ", ".join("NULL" for _ in SYNC_FIELDS[:-1])
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"""SELECT sync_seq, uuid, 0 AS deleted, {fields}
+                FROM referrals WHERE sync_seq > :since
+                UNION ALL
+                SELECT sync_seq, uuid, 1, {nulls}, deleted_at
+                FROM referral_tombstones WHERE sync_seq > :since
+                ORDER BY sync_seq LIMIT :limit""",
+            {"since": since, "limit": limit},
+        ).fetchall()
+    changes = []
+    for r in rows:
+        change = {"uuid": r["uuid"], "deleted": bool(r["deleted"]),
+                  "updated_at": r["updated_at"]}
+        if not r["deleted"]:
+            change.update({f: r[f] for f in SYNC_FIELDS})
+        changes.append(change)
+    watermark = rows[-1]["sync_seq"] if rows else since
+    return changes, watermark, len(rows) == limit
+
+
+def apply_changes(changes):
+    """Merge changes pushed by a client, last writer (by UTC updated_at) wins.
+
+    Stamps are compared as datetimes, whatever offset they were written
+    with, and stored normalised to UTC.  A change older than, or as old as,
+    what is stored (row or tombstone) is skipped, so replays and echoes are
+    harmless.  Returns ``(applied, skipped)``.
+    """
+    applied = skipped = 0
+    with _get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for change in changes:
+            row_uuid, stamp = change.get("uuid"), _parse_stamp(change.get("updated_at"))
+            if not row_uuid or stamp is None:
+                skipped += 1
+                continue
+            updated_at = _format_stamp(stamp)
+            current = conn.execute(
+                """SELECT id, updated_at FROM referrals WHERE uuid = :uuid
+                   UNION ALL
+                   SELECT NULL, deleted_at FROM referral_tombstones WHERE uuid = :uuid""",
+                {"uuid": row_uuid},
+            ).fetchone()
+            current_stamp = _parse_stamp(current["updated_at"]) if current else None
+            if current_stamp is not None and current_stamp >= stamp:
+                skipped += 1
+                continue
+
+            if change.get("deleted"):
+                conn.execute("DELETE FROM referrals WHERE uuid = ?", (row_uuid,))
+                _tombstone(conn, row_uuid, updated_at)
+                applied += 1
+                continue
+
+            values = {f: change.get(f) or "" for f in SYNC_FIELDS}
+            values["updated_at"] = updated_at
+            if not (values["referrer_name"] and values["referred_name"]
+                    and values["date_added"]):
+                skipped += 1
+                continue
+            if values["status"] not in STATUSES:
+                values["status"] = "New"
+            values["uuid"] = row_uuid
+            values["referred_phone_e164"] = normalize_phone(values["referred_phone"])
+            columns = [*SYNC_FIELDS, "referred_phone_e164"]
+            if current and current["id"] is not None:
+                conn.execute(
+                    f"UPDATE referrals SET {', '.join(f'{c} = :{c}' for c in columns)} "
+                    "WHERE uuid = :uuid",
+                    values,
+                )
+            else:
+                conn.execute(
+                    f"INSERT INTO referrals (uuid, {', '.join(columns)}) "
+                    f"VALUES (:uuid, {', '.join(f':{c}' for c in columns)})",
+                    values,
+                )
+            applied += 1
+        conn.commit()
+    if applied:
+        _invalidate_stats()
+    return applied, skipped
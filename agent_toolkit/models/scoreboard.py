@@ -1,15 +1,25 @@
 """Scoreboard database model — tracks agent activity across key metrics."""
 
-import sqlite3
-from datetime import datetime, date, timedelta
-from pathlib import Path
+import json
+import threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
 
 import config
-
-DB_PATH = config.BASE_DIR / "scoreboard.db"
+import db
+import timeutil
+from models import archive, calls
+from models.calls import normalize_phone
 
 ACTIVITY_TYPES = ["policy", "application", "call", "appointment", "presentation"]
 
+# Entered on the scoreboard form.  Calls aren't: the "calls" metric and call
+# milestones come from the call log's calls_daily rollup, so a call is
+# counted once however it was logged.  Manual calls entered before that
+# cutover were folded into legacy_calls, which is read alongside the rollup.
+MANUAL_TYPES = [t for t in ACTIVITY_TYPES if t != "call"]
+
 ACTIVITY_LABELS = {
     "policy": "Policy",
     "application": "Application",
@@ -35,138 +45,562 @@ MILESTONES = {
 }
 
 
+def _create_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS activities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT NOT NULL,
+            activity_type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 1,
+            ap_amount REAL NOT NULL DEFAULT 0,
+            notes TEXT DEFAULT '',
+            logged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _contact_phone(conn):
+    """Optional client phone per activity, keyed for contact timeline lookups."""
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(activities)")}
+    if "contact_phone" not in columns:
+        conn.execute("ALTER TABLE activities ADD COLUMN contact_phone TEXT NOT NULL DEFAULT ''")
+    if "phone_e164" not in columns:
+        conn.execute("ALTER TABLE activities ADD COLUMN phone_e164 TEXT")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_activities_phone ON activities (phone_e164, logged_at)"
+    )
+
+
+def _fold_legacy_calls(conn):
+    """Per-day totals of the manual "call" activities logged before the cutover.
+
+    Hot rows keep their day; archived months (only in activities_monthly)
+    land on the first of the month.  The "call" rows themselves stay put
+    and are ignored from here on.
+    """
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS legacy_calls (
+               day TEXT NOT NULL,
+               agent_name TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (day, agent_name)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_legacy_calls_agent ON legacy_calls (agent_name, count)"
+    )
+    conn.execute(
+        """INSERT INTO legacy_calls (day, agent_name, count)
+           SELECT day, agent_name, SUM(count) FROM (
+               SELECT substr(logged_at, 1, 10) AS day, agent_name, count
+               FROM activities WHERE activity_type = 'call'
+               UNION ALL
+               SELECT month || '-01', agent_name, count
+               FROM activities_monthly WHERE activity_type = 'call'
+           )
+           GROUP BY day, agent_name"""
+    )
+
+
+# Append-only: each entry is one schema version (see db.apply_migrations).
+MIGRATIONS = [
+    _create_schema,
+    _contact_phone,
+    (
+        # Covers the leaderboard's range scan so it never touches the table.
+        """CREATE INDEX IF NOT EXISTS idx_activities_logged
+           ON activities (logged_at, agent_name, activity_type, count, ap_amount)""",
+    ),
+    (
+        # All-time running totals, upserted alongside each activity so
+        # milestone checks are a point read instead of a SUM over history.
+        """CREATE TABLE IF NOT EXISTS activity_totals (
+               agent_name TEXT NOT NULL,
+               activity_type TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               ap_total REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (agent_name, activity_type)
+           ) WITHOUT ROWID""",
+        """INSERT INTO activity_totals (agent_name, activity_type, total, ap_total)
+           SELECT agent_name, activity_type, SUM(count), SUM(ap_amount)
+           FROM activities GROUP BY agent_name, activity_type""",
+    ),
+    (
+        # Per-month totals for activities moved to archive.db; all-time
+        # boards add these to the hot table (see archive_activities()).
+        """CREATE TABLE IF NOT EXISTS activities_monthly (
+               month TEXT NOT NULL,
+               agent_name TEXT NOT NULL,
+               activity_type TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               ap_amount REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (month, agent_name, activity_type)
+           ) WITHOUT ROWID""",
+    ),
+    _fold_legacy_calls,
+]
+
+# Every call the "calls" metric counts, per (day, agent_name).
+_CALL_DAYS = """(SELECT day, agent_name, count FROM calls_db.calls_daily
+                 UNION ALL
+                 SELECT day, agent_name, count FROM legacy_calls)"""
+
+
+def _migrate(conn):
+    db.apply_migrations(conn, MIGRATIONS)
+
+
+@contextmanager
+def _get_db():
+    with db.connection(config.SCOREBOARD_DB_PATH, init=_migrate) as conn:
+        yield conn
+
+
+@contextmanager
+def _calls_attached(conn):
+    """Attach calls.db as ``calls_db`` for the block so "calls" can read its rollup.
+
+    Detached afterwards so archive_activities()' BEGIN IMMEDIATE doesn't
+    write-lock calls.db as well.
+    """
+    calls.init_db()
+    with db.attached(conn, config.CALLS_DB_PATH, "calls_db"):
+        yield conn
+
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS activities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT NOT NULL,
-                activity_type TEXT NOT NULL,
-                count INTEGER NOT NULL DEFAULT 1,
-                ap_amount REAL NOT NULL DEFAULT 0,
-                notes TEXT DEFAULT '',
-                logged_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+    with _get_db():
+        pass
 
 
-def log_activity(agent_name: str, activity_type: str, count: int = 1,
-                 ap_amount: float = 0.0, notes: str = "") -> int:
-    with sqlite3.connect(DB_PATH) as conn:
+def record_activity(agent_name: str, activity_type: str, count: int = 1,
+                    ap_amount: float = 0.0, notes: str = "",
+                    contact_phone: str = "") -> tuple[int, int | None]:
+    """Log an activity and return ``(activity_id, milestone)``.
+
+    The running total is bumped in the same transaction as the insert.
+    ``milestone`` is the highest one the old -> new total crossed (so a
+    ``count=5`` entry can't jump over one), or None.  Calls are rejected
+    with ValueError; they belong in the call log (see MANUAL_TYPES).
+    """
+    if activity_type not in MANUAL_TYPES:
+        raise ValueError(f"{activity_type!r} can't be logged on the scoreboard")
+    with _get_db() as conn:
         cur = conn.execute(
-            """INSERT INTO activities (agent_name, activity_type, count, ap_amount, notes, logged_at)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (agent_name, activity_type, count, ap_amount, notes,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            """INSERT INTO activities (agent_name, activity_type, count, ap_amount, notes,
+                                       contact_phone, phone_e164, logged_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (agent_name, activity_type, count, ap_amount, notes, contact_phone,
+             normalize_phone(contact_phone), timeutil.now().strftime("%Y-%m-%d %H:%M:%S")),
         )
+        new_total = conn.execute(
+            """INSERT INTO activity_totals (agent_name, activity_type, total, ap_total)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT (agent_name, activity_type) DO UPDATE SET
+                   total = total + excluded.total,
+                   ap_total = ap_total + excluded.ap_total
+               RETURNING total""",
+            (agent_name, activity_type, count, ap_amount),
+        ).fetchone()[0]
         conn.commit()
-        return cur.lastrowid
+    return cur.lastrowid, _milestone_crossed(activity_type, new_total - count, new_total)
+
+
+def log_activity(agent_name: str, activity_type: str, count: int = 1,
+                 ap_amount: float = 0.0, notes: str = "", contact_phone: str = "") -> int:
+    return record_activity(agent_name, activity_type, count, ap_amount, notes,
+                           contact_phone)[0]
 
 
 def _date_filter(period: str):
-    today = date.today()
+    """Half-open ``[start, end)`` logged_at bounds for ``period``.
+
+    Comparing the raw column against timestamp strings keeps the predicate
+    sargable; wrapping logged_at in date() would force a full table scan.
+    Days are agency-local (timeutil), the same clock that stamps logged_at
+    and calls_daily.day, so both sources agree on what "today" is.
+    """
+    today = timeutil.today()
+    end = (today + timedelta(days=1)).isoformat()
     if period == "today":
-        return today.isoformat(), today.isoformat()
+        return today.isoformat(), end
     if period == "week":
         monday = today - timedelta(days=today.weekday())
-        return monday.isoformat(), today.isoformat()
+        return monday.isoformat(), end
     if period == "month":
-        return today.replace(day=1).isoformat(), today.isoformat()
-    return "2000-01-01", today.isoformat()
+        return today.replace(day=1).isoformat(), end
+    return "2000-01-01", end
 
 
-def get_leaderboard(period: str = "week") -> dict:
-    """Return leaderboard data for all agents across all metrics."""
-    start, end = _date_filter(period)
-    agents = config.AGENT_CHOICES
+PERIODS = ("today", "week", "month", "alltime")
+
+# activity_type -> leaderboard count key.
+_METRIC_KEYS = {
+    "policy": "policies",
+    "call": "calls",
+    "appointment": "appointments",
+    "presentation": "presentations",
+    "application": "applications",
+}
+
+
+def _empty_totals() -> dict:
+    return {"policies": 0, "ap": 0.0, "calls": 0,
+            "appointments": 0, "presentations": 0, "applications": 0}
+
+
+# Keys agents can be ranked by.
+RANK_METRICS = tuple(_empty_totals())
+
+
+def _accumulate(totals: dict, activity_type: str, count, ap_amount):
+    """Add one activity_type's summed count (and AP, for policies) to ``totals``."""
+    key = _METRIC_KEYS.get(activity_type)
+    if key is None:
+        return
+    totals[key] += count
+    if key == "policies":
+        totals["ap"] += ap_amount or 0
+
+
+@dataclass
+class LeaderboardSnapshot:
+    """Per-agent totals for several periods, read in one grouped query.
+
+    ``boards`` maps period -> agent -> totals (the get_leaderboard() shape).
+    Build one per request with get_snapshot() and derive rankings,
+    recognition and commission progress from it.
+    """
+    boards: dict = field(default_factory=dict)
+
+    def board(self, period: str = "week") -> dict:
+        return self.boards[period]
+
+    def agent_totals(self, agent_name: str, period: str = "week") -> dict:
+        return self.boards[period].get(agent_name, {})
+
+    def ranked(self, metric: str, period: str = "week") -> list[dict]:
+        key = metric if metric in RANK_METRICS else "policies"
+        ranked = sorted(
+            [{"agent": a, **stats} for a, stats in self.boards[period].items()],
+            key=lambda x: x[key],
+            reverse=True,
+        )
+        for i, r in enumerate(ranked):
+            r["rank"] = i + 1
+        return ranked
 
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
 
+def get_snapshot(periods=PERIODS) -> LeaderboardSnapshot:
+    """Aggregate every agent's totals for ``periods`` in a single query.
+
+    Each period is a conditional SUM over one range scan of the covering
+    logged_at index, starting at the earliest period's lower bound.  The
+    "calls" metric comes from calls.db's trigger-maintained calls_daily
+    rollup plus legacy_calls, read in the same statement, so it costs
+    agents x days rather than a scan of the calls table; "call" rows in
+    activities are ignored (the ones from before the cutover are in
+    legacy_calls).  "alltime"
+    also adds the archived months from activities_monthly.
+    """
+    bounds = {p: _date_filter(p) for p in periods}
+    end = next(iter(bounds.values()))[1]
+    sums, call_sums = [], []
+    for i, p in enumerate(periods):
+        sums.append(f"SUM(CASE WHEN logged_at >= :start{i} THEN count ELSE 0 END)")
+        sums.append(f"SUM(CASE WHEN logged_at >= :start{i} THEN ap_amount ELSE 0 END)")
+        call_sums.append(f"SUM(CASE WHEN day >= :start{i} THEN count ELSE 0 END)")
+        call_sums.append("0")
+    params = {f"start{i}": bounds[p][0] for i, p in enumerate(periods)}
+    params.update(start=min(b[0] for b in bounds.values()), end=end)
+
+    with _get_db() as conn, _calls_attached(conn):
         rows = conn.execute(
-            """SELECT agent_name, activity_type,
-                      SUM(count) as total_count,
-                      SUM(ap_amount) as total_ap
-               FROM activities
-               WHERE date(logged_at) BETWEEN ? AND ?
-               GROUP BY agent_name, activity_type""",
-            (start, end),
+            f"""SELECT agent_name, activity_type, {", ".join(sums)}
+                FROM activities
+                WHERE logged_at >= :start AND logged_at < :end
+                  AND activity_type <> 'call'
+                GROUP BY agent_name, activity_type
+                UNION ALL
+                SELECT agent_name, 'call', {", ".join(call_sums)}
+                FROM {_CALL_DAYS}
+                WHERE day >= :start AND day < :end
+                GROUP BY agent_name""",
+            params,
         ).fetchall()
+        archived = conn.execute(
+            """SELECT agent_name, activity_type, SUM(count), SUM(ap_amount)
+               FROM activities_monthly WHERE activity_type <> 'call'
+               GROUP BY agent_name, activity_type"""
+        ).fetchall() if "alltime" in periods else []
 
-    data: dict[str, dict] = {
-        a: {"policies": 0, "ap": 0.0, "calls": 0,
-            "appointments": 0, "presentations": 0, "applications": 0}
-        for a in agents
-    }
+    boards = {p: {a: _empty_totals() for a in config.AGENT_CHOICES} for p in periods}
     for row in rows:
         agent = row["agent_name"]
-        if agent not in data:
+        if agent not in boards[periods[0]]:
             continue
-        atype = row["activity_type"]
-        if atype == "policy":
-            data[agent]["policies"] += row["total_count"]
-            data[agent]["ap"] += row["total_ap"] or 0
-        elif atype == "call":
-            data[agent]["calls"] += row["total_count"]
-        elif atype == "appointment":
-            data[agent]["appointments"] += row["total_count"]
-        elif atype == "presentation":
-            data[agent]["presentations"] += row["total_count"]
-        elif atype == "application":
-            data[agent]["applications"] += row["total_count"]
-
-    return data
+        for i, p in enumerate(periods):
+            _accumulate(boards[p][agent], row["activity_type"], row[2 + 2 * i], row[3 + 2 * i])
+    for row in archived:
+        if row["agent_name"] in boards["alltime"]:
+            _accumulate(boards["alltime"][row["agent_name"]], row["activity_type"], row[2], row[3])
+    return LeaderboardSnapshot(boards)
+
+
+def get_leaderboard(period: str = "week") -> dict:
+    """Return leaderboard data for all agents across all metrics."""
+    return get_snapshot((period,)).board(period)
 
 
 def get_agent_totals(agent_name: str, period: str = "week") -> dict:
     """Get totals for a single agent."""
-    lb = get_leaderboard(period)
-    return lb.get(agent_name, {})
+    return get_snapshot((period,)).agent_totals(agent_name, period)
 
 
 def get_ranked(metric: str, period: str = "week") -> list[dict]:
     """Return agents ranked by a given metric."""
-    data = get_leaderboard(period)
-    key_map = {
-        "policies": "policies", "ap": "ap", "calls": "calls",
-        "appointments": "appointments", "presentations": "presentations",
-        "applications": "applications",
+    return get_snapshot((period,)).ranked(metric, period)
+
+
+# Manual activities are only ever stamped with the current time, so past
+# days' activity totals are cached until the date rolls over.  Calls are not:
+# calls_daily moves with bulk imports, edits and deletes, so the rollup is
+# re-read on every call (it is one indexed row per agent per day).
+SERIES_MAX_DAYS = 366
+_series_cache: dict = {}
+_series_lock = threading.Lock()
+
+
+def _daily_totals(activities: tuple | None, calls_range: tuple | None) -> dict:
+    """``{(day, agent): totals}`` for configured agents, in one grouped query.
+
+    ``activities`` and ``calls_range`` are inclusive ``(start, end)`` date
+    ranges (or None to skip that source).  Calls come from calls.db's
+    calls_daily rollup and legacy_calls, as in get_snapshot().  Activity ranges reaching back
+    into archived months also read archive.db.
+    """
+    source = "activities"
+    parts, params = [], {}
+    with _get_db() as conn, ExitStack() as attachments:
+        if activities:
+            archived_through = conn.execute(
+                "SELECT MAX(month) FROM activities_monthly"
+            ).fetchone()[0]
+            if archived_through and activities[0].isoformat()[:7] <= archived_through:
+                attachments.enter_context(archive.attached(conn))
+                source = f"""(SELECT logged_at, agent_name, activity_type, count, ap_amount
+                              FROM activities
+                              UNION ALL
+                              SELECT logged_at, agent_name, activity_type, count, ap_amount
+                              FROM {archive.SCHEMA}.activities)"""
+            parts.append(
+                f"""SELECT substr(logged_at, 1, 10) AS day, agent_name, activity_type,
+                           SUM(count) AS total_count, SUM(ap_amount) AS total_ap
+                    FROM {source}
+                    WHERE logged_at >= :a_start AND logged_at < :a_end
+                      AND activity_type <> 'call'
+                    GROUP BY day, agent_name, activity_type"""
+            )
+            params["a_start"] = activities[0].isoformat()
+            params["a_end"] = (activities[1] + timedelta(days=1)).isoformat()
+        if calls_range:
+            attachments.enter_context(_calls_attached(conn))
+            parts.append(
+                f"""SELECT day, agent_name, 'call' AS activity_type,
+                           SUM(count) AS total_count, 0 AS total_ap
+                    FROM {_CALL_DAYS}
+                    WHERE day >= :c_start AND day <= :c_end
+                    GROUP BY day, agent_name"""
+            )
+            params["c_start"] = calls_range[0].isoformat()
+            params["c_end"] = calls_range[1].isoformat()
+        rows = conn.execute(" UNION ALL ".join(parts), params).fetchall() if parts else []
+    buckets: dict = {}
+    for row in rows:
+        if row["agent_name"] not in config.AGENT_CHOICES:
+            continue
+        totals = buckets.setdefault((row["day"], row["agent_name"]), _empty_totals())
+        _accumulate(totals, row["activity_type"], row["total_count"], row["total_ap"])
+    return buckets
+
+
+def _past_activity_totals(start: date, end: date, today: date) -> dict:
+    key = (str(config.SCOREBOARD_DB_PATH), start, end)
+    with _series_lock:
+        if _series_cache.get("day") != today:
+            _series_cache.clear()
+            _series_cache["day"] = today
+        cached = _series_cache.get(key)
+    if cached is None:
+        cached = _daily_totals((start, end), None)
+        with _series_lock:
+            if _series_cache.get("day") == today and len(_series_cache) < 64:
+                _series_cache[key] = cached
+    return cached
+
+
+def get_daily_series(start: date, end: date, agents=None, metrics=RANK_METRICS) -> dict:
+    """Dense per-day totals for ``[start, end]``, zero-filled.
+
+    Returns ``{"days": [iso, ...], "agents": {agent: {metric: [value per day]}}}``
+    for ``agents`` (all configured agents by default).  Past days' activities
+    come from one grouped query cached until the date rolls over; a second
+    query reads today's activities plus the calls rollup for the whole range.
+    """
+    today = timeutil.today()
+    agents = list(config.AGENT_CHOICES if agents is None else agents)
+    buckets = {}
+    past_end = min(end, today - timedelta(days=1))
+    if start <= past_end:
+        # Copy: the live rows below are merged into these buckets.
+        buckets = {k: dict(v) for k, v in _past_activity_totals(start, past_end, today).items()}
+    live = _daily_totals((today, today) if start <= today <= end else None, (start, end))
+    for key, totals in live.items():
+        merged = buckets.setdefault(key, _empty_totals())
+        for metric, value in totals.items():
+            merged[metric] += value
+
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    empty = _empty_totals()
+    series = {
+        agent: {
+            m: [buckets.get((day, agent), empty)[m] for day in days] for m in metrics
+        }
+        for agent in agents
     }
-    key = key_map.get(metric, "policies")
-    ranked = sorted(
-        [{"agent": a, **stats} for a, stats in data.items()],
-        key=lambda x: x[key],
-        reverse=True,
-    )
-    for i, r in enumerate(ranked):
-        r["rank"] = i + 1
-    return ranked
+    return {"days": days, "agents": series}
+
+
+def _legacy_call_total(conn, agent_name: str) -> int:
+    return conn.execute(
+        "SELECT COALESCE(SUM(count), 0) FROM legacy_calls WHERE agent_name = ?", (agent_name,)
+    ).fetchone()[0]
 
 
 def get_all_time_totals(agent_name: str, activity_type: str) -> int:
-    """Get all-time count for milestone checking."""
-    with sqlite3.connect(DB_PATH) as conn:
+    """Get all-time count for milestone checking (calls: call log plus legacy_calls)."""
+    with _get_db() as conn:
+        if activity_type == "call":
+            return calls.call_total(agent_name) + _legacy_call_total(conn, agent_name)
         row = conn.execute(
-            "SELECT SUM(count) FROM activities WHERE agent_name=? AND activity_type=?",
+            "SELECT total FROM activity_totals WHERE agent_name=? AND activity_type=?",
             (agent_name, activity_type),
         ).fetchone()
-    return int(row[0] or 0)
+    return row["total"] if row else 0
+
+
+def _milestone_crossed(activity_type: str, old_total: int, new_total: int) -> int | None:
+    """Highest milestone in ``(old_total, new_total]``, or None."""
+    crossed = [m for m in MILESTONES.get(activity_type, []) if old_total < m <= new_total]
+    return max(crossed, default=None)
+
 
+def call_milestone(agent_name: str, call_total: int, count: int = 1) -> int | None:
+    """Milestone the agent's last ``count`` logged calls crossed, else None.
 
-def check_milestone(agent_name: str, activity_type: str) -> int | None:
-    """Return milestone value if agent just hit one, else None."""
+    ``call_total`` comes from the logging transaction (calls.record_call()),
+    not a later read, so two concurrent calls can't both claim a milestone
+    or both miss it.  legacy_calls no longer changes, so adding it is safe.
+    """
+    with _get_db() as conn:
+        total = call_total + _legacy_call_total(conn, agent_name)
+    return _milestone_crossed("call", total - count, total)
+
+
+def check_milestone(agent_name: str, activity_type: str, count: int = 1) -> int | None:
+    """Return the milestone the agent's last ``count`` activities crossed, else None."""
     total = get_all_time_totals(agent_name, activity_type)
-    for m in MILESTONES.get(activity_type, []):
-        if total == m:
-            return m
-    return None
+    return _milestone_crossed(activity_type, total - count, total)
+
+
+def rebuild_activity_totals() -> int:
+    """Recompute activity_totals from activities plus archived months.
+
+    Returns the row count.
+    """
+    with _get_db() as conn:
+        conn.execute("DELETE FROM activity_totals")
+        conn.execute(
+            """INSERT INTO activity_totals (agent_name, activity_type, total, ap_total)
+               SELECT agent_name, activity_type, SUM(count), SUM(ap_amount)
+               FROM (SELECT agent_name, activity_type, count, ap_amount FROM activities
+                     UNION ALL
+                     SELECT agent_name, activity_type, count, ap_amount
+                     FROM activities_monthly)
+               GROUP BY agent_name, activity_type"""
+        )
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM activity_totals").fetchone()[0]
+
+
+_ARCHIVE_COLUMNS = ("id, agent_name, activity_type, count, ap_amount, notes, "
+                    "contact_phone, phone_e164, logged_at")
+
+
+def archive_activities(before: date | None = None) -> int:
+    """Move activities logged before ``before`` into archive.db. Returns how many.
+
+    ``before`` defaults to archive.horizon().  Each moved row is folded into
+    activities_monthly in the same transaction, so all-time boards and
+    activity_totals (and with them milestones) are unchanged.  Batches are
+    copied with INSERT OR IGNORE, so an interrupted run just repeats.
+    """
+    before = (before or archive.horizon()).isoformat()
+    moved = 0
+    with _get_db() as conn, archive.attached(conn):
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            batch = [r[0] for r in conn.execute(
+                "SELECT id FROM activities WHERE logged_at < ? ORDER BY logged_at LIMIT ?",
+                (before, archive.BATCH_SIZE),
+            )]
+            if not batch:
+                conn.rollback()
+                break
+            ids = json.dumps(batch)
+            selected = "id IN (SELECT value FROM json_each(?))"
+            conn.execute(
+                f"""INSERT OR IGNORE INTO {archive.SCHEMA}.activities ({_ARCHIVE_COLUMNS})
+                    SELECT {_ARCHIVE_COLUMNS} FROM activities WHERE {selected}""",
+                (ids,),
+            )
+            conn.execute(
+                f"""INSERT INTO activities_monthly
+                        (month, agent_name, activity_type, count, ap_amount)
+                    SELECT substr(logged_at, 1, 7), agent_name, activity_type,
+                           SUM(count), SUM(ap_amount)
+                    FROM activities WHERE {selected}
+                    GROUP BY 1, 2, 3
+                    ON CONFLICT (month, agent_name, activity_type) DO UPDATE SET
+                        count = count + excluded.count,
+                        ap_amount = ap_amount + excluded.ap_amount""",
+                (ids,),
+            )
+            conn.execute(f"DELETE FROM activities WHERE {selected}", (ids,))
+            conn.commit()
+            moved += len(batch)
+    return moved
+
+
+def latest_activity_id() -> int:
+    """Highest activity id so far (ids are AUTOINCREMENT, never reused)."""
+    with _get_db() as conn:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM activities").fetchone()[0]
+
+
+def get_activities_since(after_id: int, limit: int = 100) -> list[dict]:
+    """Activities logged after ``after_id``, oldest first (a primary-key range)."""
+    with _get_db() as conn:
+        rows = conn.execute(
+            "SELECT * FROM activities WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        ).fetchall()
+    return [dict(r) for r in rows]
 
 
 def get_recent_activity(limit: int = 20) -> list[dict]:
     """Recent activity feed across all agents."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+    with _get_db() as conn:
         rows = conn.execute(
             """SELECT * FROM activities ORDER BY logged_at DESC LIMIT ?""",
             (limit,),
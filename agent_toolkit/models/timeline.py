@@ -0,0 +1,59 @@
+"""Per-contact timeline across calls.db, referrals.db and scoreboard.db.
+
+The referrals and scoreboard databases are ATTACHed to the pooled calls
+connection so one statement can merge all three.  Every branch is an
+indexed lookup on the contact (calls by contact_id, the others by E.164
+phone), so the cost follows the contact's own history, not table size.
+"""
+
+import config
+import db
+from models import calls, referrals, scoreboard
+
+_QUERY = """
+    SELECT 'call' AS kind, id, call_datetime AS at, agent_name,
+           outcome AS label, direction AS detail, notes
+    FROM main.calls
+    WHERE contact_id = :contact_id
+    UNION ALL
+    SELECT 'referral', id, date_added, '',
+           status, 'Referred by ' || referrer_name, notes
+    FROM referrals_db.referrals
+    WHERE referred_phone_e164 = :phone
+    UNION ALL
+    SELECT 'activity', id, substr(logged_at, 1, 16), agent_name,
+           activity_type, CASE WHEN ap_amount > 0 THEN ap_amount END, notes
+    FROM scoreboard_db.activities
+    WHERE phone_e164 = :phone
+    ORDER BY at DESC, kind, id DESC
+    LIMIT :limit
+"""
+
+
+def get_contact_timeline(contact_id, limit=200):
+    """Return ``(contact, entries)`` for one contact, newest first.
+
+    Entries are dicts with ``kind`` ("call", "referral" or "activity"),
+    ``id``, ``at`` (local "YYYY-MM-DD[ HH:MM]"), ``agent_name``, ``label``,
+    ``detail`` and ``notes``.  Referrals and activities are matched by the
+    contact's normalized phone, so name-only contacts list calls alone.
+    Returns ``(None, [])`` for an unknown contact.
+    """
+    # Make sure the attached databases exist and are migrated.
+    referrals.init_db()
+    scoreboard.init_db()
+    with calls.get_db() as conn:
+        contact = conn.execute(
+            "SELECT * FROM contacts WHERE id = ?", (contact_id,)
+        ).fetchone()
+        if contact is None:
+            return None, []
+        # Attached only for this read: left on the pooled connection, a
+        # later BEGIN IMMEDIATE on calls.db would write-lock these files too.
+        with db.attached(conn, config.REFERRALS_DB_PATH, "referrals_db"), \
+                db.attached(conn, config.SCOREBOARD_DB_PATH, "scoreboard_db"):
+            rows = conn.execute(
+                _QUERY,
+                {"contact_id": contact_id, "phone": contact["phone_e164"], "limit": limit},
+            ).fetchall()
+    return dict(contact), [dict(r) for r in rows]
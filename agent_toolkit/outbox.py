@@ -0,0 +1,563 @@
+"""Durable outbox for outbound notifications (Slack, GHL, Web Push, email).
+
+Request handlers and scheduler jobs call enqueue(), which is a single INSERT
+into outbox.db, and return straight away.  Each process runs one dispatcher
+thread that claims due jobs and hands them to a bounded thread pool, with a
+concurrency limit per destination so one slow service can't take every
+worker.
+
+Claimed jobs are leased, not locked: claiming pushes ``available_at`` past
+LEASE_SECONDS and tags the rows with a lease token, so a job whose process
+died mid-send simply comes due again.  A destination's ``concurrency`` counts
+the live leases in outbox.db, and a RetryLater pause is stored there too, so
+both hold across every worker process rather than per process.
+Failures are retried with exponential backoff.  After ``max_attempts``, or
+when a handler raises PermanentError, the row is kept as 'dead' for
+inspection and retry_dead().  Delivered jobs are deleted; per-destination
+counters live in outbox_stats so every worker's sends show up in stats().
+
+Destinations registered with a ``window`` coalesce: a job queued while an
+earlier one is still waiting out its window gets the same due time, and the
+handler receives every payload in the batch at once (see slack_notify).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+import config
+import db
+
+# How long a claimed job is reserved before another worker may retry it.
+LEASE_SECONDS = 300
+
+# Longest the dispatcher sleeps when nothing is due.
+IDLE_SECONDS = 30.0
+
+# How often to re-check due jobs held back by a limit another worker holds.
+BUSY_POLL_SECONDS = 2.0
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying can't help; the job is dead-lettered."""
+    pass
+
+
+class RetryLater(Exception):
+    """Raised by a handler when the service says when to come back (e.g. HTTP 429).
+
+    The job is retried after ``seconds`` without using up an attempt, and the
+    whole destination pauses until then in every worker.
+    """
+
+    def __init__(self, seconds, message=""):
+        super().__init__(message or f"retry after {seconds}s")
+        self.seconds = max(0.0, float(seconds))
+
+
+@dataclass
+class Destination:
+    name: str
+    handler: Callable
+    concurrency: int = 2
+    max_attempts: int = 8
+    batch_size: int = 1
+    window: float = 0.0
+
+
+_destinations: dict[str, Destination] = {}
+
+
+def _create_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY,
+            destination TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            last_error TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due "
+        "ON outbox (status, destination, available_at)"
+    )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox_stats (
+            destination TEXT PRIMARY KEY,
+            sent INTEGER NOT NULL DEFAULT 0,
+            retried INTEGER NOT NULL DEFAULT 0,
+            dead INTEGER NOT NULL DEFAULT 0,
+            send_ms REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+
+# Append-only: each entry is one schema version (see db.apply_migrations).
+MIGRATIONS = [
+    _create_schema,
+    (
+        # One token per handler call, so live leases count in-flight sends.
+        "ALTER TABLE outbox ADD COLUMN lease TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_lease "
+        "ON outbox (destination, available_at) WHERE lease IS NOT NULL",
+        "ALTER TABLE outbox_stats ADD COLUMN paused_until REAL NOT NULL DEFAULT 0",
+    ),
+]
+
+
+def _migrate(conn):
+    db.apply_migrations(conn, MIGRATIONS)
+
+
+@contextmanager
+def get_db():
+    with db.connection(config.OUTBOX_DB_PATH, init=_migrate) as conn:
+        yield conn
+
+
+def init_db():
+    with get_db():
+        pass
+
+
+def register(name, handler, concurrency=2, max_attempts=None, batch_size=1, window=0.0):
+    """Route jobs for ``name`` to ``handler(payload)``.
+
+    The handler returns normally on delivery and raises to have the job
+    retried (or PermanentError to give up, RetryLater to back off for a
+    set time).  With ``batch_size`` > 1 the handler gets a list of up to
+    that many payloads instead, and ``window`` seconds hold new jobs back
+    so they can be batched.  ``concurrency`` caps handler calls in flight
+    across all workers.  Only destinations registered in this process are
+    claimed by its dispatcher.
+    """
+    _destinations[name] = Destination(
+        name, handler, max(1, concurrency),
+        max_attempts or config.OUTBOX_MAX_ATTEMPTS,
+        max(1, batch_size), max(0.0, window),
+    )
+
+
+def _available_at(conn, destination, now) -> float:
+    """When a job queued now comes due: now, or the end of the open window."""
+    dest = _destinations.get(destination)
+    if dest is None or not dest.window:
+        return now
+    # Join a batch that is still waiting out its window (attempts = 0 skips
+    # leased and backed-off jobs, whose available_at means something else).
+    row = conn.execute(
+        """SELECT MIN(available_at) FROM outbox
+           WHERE status = 'pending' AND destination = ? AND attempts = 0
+             AND available_at > ?""",
+        (destination, now),
+    ).fetchone()
+    return row[0] if row[0] is not None else now + dest.window
+
+
+def enqueue(destination, payload) -> int:
+    """Queue one JSON-serialisable ``payload`` for ``destination``."""
+    with get_db() as conn:
+        cur = conn.execute(
+            "INSERT INTO outbox (destination, payload, available_at) VALUES (?, ?, ?)",
+            (destination, json.dumps(payload), _available_at(conn, destination, time.time())),
+        )
+        conn.commit()
+    worker.notify()
+    return cur.lastrowid
+
+
+def enqueue_many(destination, payloads) -> int:
+    """Queue several payloads in one transaction. Returns how many."""
+    payloads = list(payloads)
+    if not payloads:
+        return 0
+    with get_db() as conn:
+        due = _available_at(conn, destination, time.time())
+        conn.executemany(
+            "INSERT INTO outbox (destination, payload, available_at) VALUES (?, ?, ?)",
+            [(destination, json.dumps(p), due) for p in payloads],
+        )
+        conn.commit()
+    worker.notify()
+    return len(payloads)
+
+
+def backoff(attempts) -> float:
+    """Seconds to wait before retrying a job that has failed ``attempts`` times."""
+    delay = config.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return min(delay, config.OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def _lease(conn, destination, limit, now, token, per_job=True):
+    """Lease up to ``limit`` due jobs for ``destination``, oldest first.
+
+    ``per_job`` gives each job its own lease (one handler call each);
+    otherwise the jobs share ``token`` as one batch.
+    """
+    rows = conn.execute(
+        """UPDATE outbox SET attempts = attempts + 1, available_at = :until,
+                  lease = CASE WHEN :per_job THEN :token || '-' || id ELSE :token END
+           WHERE id IN (
+               SELECT id FROM outbox
+               WHERE status = 'pending' AND destination = :destination
+                 AND available_at <= :now
+               ORDER BY available_at, id
+               LIMIT :limit
+           )
+           RETURNING id, destination, payload, attempts""",
+        {"destination": destination, "now": now, "limit": limit,
+         "until": now + LEASE_SECONDS, "token": token, "per_job": per_job},
+    ).fetchall()
+    return sorted(rows, key=lambda r: r["id"])
+
+
+def _claim(destination, limit, now=None):
+    """Lease up to ``limit`` due jobs for ``destination``, ignoring its limits."""
+    now = time.time() if now is None else now
+    with get_db() as conn:
+        rows = _lease(conn, destination, limit, now, uuid.uuid4().hex)
+        conn.commit()
+    return rows
+
+
+def _in_flight(conn, destination, now) -> int:
+    """Handler calls for ``destination`` holding a live lease, in any worker."""
+    return conn.execute(
+        """SELECT COUNT(DISTINCT lease) FROM outbox
+           WHERE destination = ? AND lease IS NOT NULL AND status = 'pending'
+             AND available_at > ?""",
+        (destination, now),
+    ).fetchone()[0]
+
+
+def _paused_until(conn, destination) -> float:
+    row = conn.execute(
+        "SELECT paused_until FROM outbox_stats WHERE destination = ?", (destination,)
+    ).fetchone()
+    return row[0] if row else 0.0
+
+
+def paused_until(destination) -> float:
+    """When a RetryLater pause on ``destination`` ends (0 if never paused)."""
+    with get_db() as conn:
+        return _paused_until(conn, destination)
+
+
+def _record(conn, destination, column, jobs=1, elapsed_ms=0.0):
+    conn.execute(
+        f"""INSERT INTO outbox_stats (destination, {column}, send_ms) VALUES (?, ?, ?)
+            ON CONFLICT (destination) DO UPDATE SET
+                {column} = {column} + excluded.{column},
+                send_ms = send_ms + excluded.send_ms""",
+        (destination, jobs, elapsed_ms * jobs),
+    )
+
+
+def _run_job(dest: Destination, jobs):
+    """Run claimed jobs (one, or one batch) and record the outcome.
+
+    Returns True if delivered.
+    """
+    ids = [job["id"] for job in jobs]
+    attempts = max(job["attempts"] for job in jobs)
+    payloads = [json.loads(job["payload"]) for job in jobs]
+    started = time.monotonic()
+    error, permanent, retry_after = None, False, None
+    try:
+        dest.handler(payloads if dest.batch_size > 1 else payloads[0])
+    except PermanentError as e:
+        error, permanent = e, True
+    except RetryLater as e:
+        error, retry_after = e, e.seconds
+    except Exception as e:
+        error = e
+    elapsed_ms = (time.monotonic() - started) * 1000
+
+    id_list = json.dumps(ids)
+    in_ids = "id IN (SELECT value FROM json_each(?))"
+    with get_db() as conn:
+        if error is None:
+            conn.execute(f"DELETE FROM outbox WHERE {in_ids}", (id_list,))
+            _record(conn, dest.name, "sent", len(ids), elapsed_ms)
+        elif retry_after is not None:
+            # Being told to wait isn't a failed attempt.
+            resume = time.time() + retry_after
+            conn.execute(
+                f"UPDATE outbox SET available_at = ?, attempts = attempts - 1, "
+                f"last_error = ?, lease = NULL WHERE {in_ids}",
+                (resume, str(error)[:500], id_list),
+            )
+            conn.execute(
+                """INSERT INTO outbox_stats (destination, paused_until) VALUES (?, ?)
+                   ON CONFLICT (destination) DO UPDATE SET
+                       paused_until = MAX(paused_until, excluded.paused_until)""",
+                (dest.name, resume),
+            )
+            _record(conn, dest.name, "retried", len(ids), elapsed_ms)
+        elif permanent or attempts >= dest.max_attempts:
+            conn.execute(
+                f"UPDATE outbox SET status = 'dead', last_error = ?, lease = NULL "
+                f"WHERE {in_ids}",
+                (str(error)[:500], id_list),
+            )
+            _record(conn, dest.name, "dead", len(ids), elapsed_ms)
+            print(f"[Outbox] {dest.name} job(s) {ids} dead after "
+                  f"{attempts} attempt(s): {error}")
+        else:
+            conn.execute(
+                f"UPDATE outbox SET available_at = ?, last_error = ?, lease = NULL "
+                f"WHERE {in_ids}",
+                (time.time() + backoff(attempts), str(error)[:500], id_list),
+            )
+            _record(conn, dest.name, "retried", len(ids), elapsed_ms)
+        conn.commit()
+    return error is None
+
+
+def _claim_tasks(dest: Destination, slots, now=None):
+    """Claim work for up to ``slots`` handler calls; each task is a list of jobs.
+
+    Counting the destination's live leases and claiming happen in one write
+    transaction, so workers racing each other can't exceed ``concurrency``.
+    """
+    now = time.time() if now is None else now
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if _paused_until(conn, dest.name) > now:
+            return []
+        slots = min(slots, dest.concurrency - _in_flight(conn, dest.name, now))
+        token = uuid.uuid4().hex
+        if dest.batch_size > 1:
+            tasks = [batch for batch in (
+                _lease(conn, dest.name, dest.batch_size, now, f"{token}-{n}", per_job=False)
+                for n in range(slots)
+            ) if batch]
+        else:
+            tasks = [[job] for job in _lease(conn, dest.name, max(0, slots), now, token)]
+        conn.commit()
+    return tasks
+
+
+def drain(destinations=None, now=None) -> int:
+    """Run every due job inline until none are left. Returns how many ran.
+
+    For tests and one-off scripts; the app relies on the dispatcher thread.
+    ``now`` pretends it is later, e.g. to flush batches still in their window.
+    """
+    names = destinations or list(_destinations)
+    ran = 0
+    while True:
+        batch = 0
+        for name in names:
+            dest = _destinations[name]
+            for jobs in _claim_tasks(dest, dest.concurrency, now):
+                _run_job(dest, jobs)
+                batch += len(jobs)
+        if not batch:
+            return ran
+        ran += batch
+
+
+def job_counts(destination, **fields) -> dict[str, int]:
+    """Pending and dead jobs for ``destination`` whose payload has ``fields``.
+
+    Delivered jobs are deleted, so this is what is left of e.g. one run.
+    """
+    where, params = ["destination = ?"], [destination]
+    for key, value in fields.items():
+        where.append("json_extract(payload, ?) = ?")
+        params += [f"$.{key}", value]
+    with get_db() as conn:
+        row = conn.execute(
+            f"""SELECT COALESCE(SUM(status = 'pending'), 0) AS pending,
+                       COALESCE(SUM(status = 'dead'), 0) AS dead
+                FROM outbox WHERE {' AND '.join(where)}""",
+            params,
+        ).fetchone()
+    return {"pending": row["pending"], "dead": row["dead"]}
+
+
+def retry_dead(destination=None) -> int:
+    """Give dead jobs a fresh set of attempts. Returns how many were revived."""
+    where, params = "status = 'dead'", []
+    if destination:
+        where += " AND destination = ?"
+        params.append(destination)
+    with get_db() as conn:
+        cur = conn.execute(
+            f"UPDATE outbox SET status = 'pending', attempts = 0, available_at = ? "
+            f"WHERE {where}",
+            [time.time(), *params],
+        )
+        conn.commit()
+    worker.notify()
+    return cur.rowcount
+
+
+def stats() -> dict[str, dict]:
+    """Queue depth and delivery counters per destination.
+
+    ``pending``/``dead``/``oldest_seconds``/``in_flight`` describe what is
+    in the table now; ``sent``/``retried``/``dead_lettered``/``avg_ms`` are
+    running totals.  Both cover every worker.
+    """
+    now = time.time()
+    with get_db() as conn:
+        queued = conn.execute(
+            """SELECT destination,
+                      SUM(status = 'pending') AS pending,
+                      SUM(status = 'dead') AS dead,
+                      MIN(CASE WHEN status = 'pending' THEN
+                          CAST(strftime('%s', created_at, 'utc') AS REAL) END) AS oldest,
+                      COUNT(DISTINCT CASE WHEN status = 'pending' AND lease IS NOT NULL
+                          AND available_at > :now THEN lease END) AS in_flight
+               FROM outbox GROUP BY destination""",
+            {"now": now},
+        ).fetchall()
+        totals = conn.execute("SELECT * FROM outbox_stats").fetchall()
+
+    result = {}
+
+    def entry(name):
+        return result.setdefault(name, {
+            "pending": 0, "dead": 0, "oldest_seconds": 0.0, "in_flight": 0,
+            "sent": 0, "retried": 0, "dead_lettered": 0, "avg_ms": 0.0,
+        })
+
+    for r in queued:
+        e = entry(r["destination"])
+        e["pending"], e["dead"], e["in_flight"] = r["pending"], r["dead"], r["in_flight"]
+        if r["oldest"] is not None:
+            e["oldest_seconds"] = round(max(0.0, now - r["oldest"]), 1)
+    for r in totals:
+        e = entry(r["destination"])
+        e["sent"], e["retried"], e["dead_lettered"] = r["sent"], r["retried"], r["dead"]
+        attempts = r["sent"] + r["retried"] + r["dead"]
+        if attempts:
+            e["avg_ms"] = round(r["send_ms"] / attempts, 1)
+    return result
+
+
+class Dispatcher:
+    """Per-process thread that feeds due jobs to a bounded worker pool."""
+
+    def __init__(self):
+        self.autostart = True
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._in_flight: dict[str, int] = {}
+        self._pool = None
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Make sure this process has a dispatcher running (cheap if it does)."""
+        if self.autostart:
+            self._ensure_thread()
+
+    def notify(self):
+        """Wake the dispatcher (starting it in this process if needed)."""
+        self.start()
+        self._wake.set()
+
+    def in_flight(self) -> dict[str, int]:
+        with self._lock:
+            return {k: v for k, v in self._in_flight.items() if v}
+
+    def dispatch(self) -> int:
+        """Claim what each destination has room for and submit it.
+
+        Destination limits are enforced by _claim_tasks() across workers;
+        here claims are also capped at this process's free pool threads,
+        so leased jobs never sit queued behind other sends.
+        """
+        submitted = 0
+        for name, dest in list(_destinations.items()):
+            with self._lock:
+                free = config.OUTBOX_MAX_WORKERS - sum(self._in_flight.values())
+            if free <= 0:
+                break
+            for jobs in _claim_tasks(dest, min(free, dest.concurrency)):
+                with self._lock:
+                    self._in_flight[name] = self._in_flight.get(name, 0) + 1
+                self._pool.submit(self._run, dest, jobs)
+                submitted += 1
+        return submitted
+
+    def _run(self, dest, jobs):
+        try:
+            _run_job(dest, jobs)
+        except Exception as e:
+            # The lease runs out and the jobs are retried later.
+            ids = [job["id"] for job in jobs]
+            print(f"[Outbox] {dest.name} job(s) {ids} could not be recorded: {e}")
+        finally:
+            with self._lock:
+                self._in_flight[dest.name] -= 1
+            self._wake.set()
+
+    def _next_due(self) -> float:
+        """Seconds until the next pending job comes due (capped at IDLE_SECONDS)."""
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT MIN(available_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return IDLE_SECONDS
+        return min(IDLE_SECONDS, max(0.0, row[0] - time.time()))
+
+    def _next_resume(self) -> float:
+        """Seconds until the first paused destination may send again."""
+        now = time.time()
+        with get_db() as conn:
+            row = conn.execute(
+                """SELECT MIN(paused_until) FROM outbox_stats
+                   WHERE paused_until > ?
+                     AND destination IN (SELECT value FROM json_each(?))""",
+                (now, json.dumps(list(_destinations))),
+            ).fetchone()
+        return IDLE_SECONDS if row[0] is None else row[0] - now
+
+    def _ensure_thread(self):
+        # Threads don't survive fork(); a worker starts its own on first use.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._in_flight = {}
+            self._pool = ThreadPoolExecutor(max_workers=config.OUTBOX_MAX_WORKERS,
+                                            thread_name_prefix="outbox")
+            self._thread = threading.Thread(target=self._loop, daemon=True,
+                                            name="outbox-dispatcher")
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                if self.dispatch():
+                    continue
+                # Zero means jobs are due but their destinations are paused or
+                # at their limit.  A job finishing here sets _wake; one
+                # finishing in another worker is picked up by polling.
+                wait = min(self._next_due() or BUSY_POLL_SECONDS, self._next_resume())
+            except Exception as e:
+                print(f"[Outbox] Dispatch failed: {e}")
+                wait = IDLE_SECONDS
+            self._wake.wait(wait)
+
+
+worker = Dispatcher()
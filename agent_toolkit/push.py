@@ -1,17 +1,18 @@
 """Web Push notification helpers.
 
 Uses pywebpush to send push notifications via VAPID.
-Subscriptions are stored in a simple SQLite table.
+Subscriptions are stored in a simple SQLite table; reminders are delivered
+through the outbox.
 """
 
 import json
-import sqlite3
+import time
+import uuid
 from contextlib import contextmanager
-from pathlib import Path
 
 import config
-
-DB_PATH = config.BASE_DIR / "push_subscriptions.db"
+import db
+import outbox
 
 try:
     from pywebpush import webpush, WebPushException
@@ -19,11 +20,16 @@ try:
 except ImportError:
     PUSH_AVAILABLE = False
 
+# Endpoints the push service reports gone are deleted together: up to
+# PRUNE_BATCH per statement, gathered over PRUNE_WINDOW_SECONDS.
+PRUNE_BATCH = 500
+PRUNE_WINDOW_SECONDS = 5.0
 
-@contextmanager
-def _get_db():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
+# How long after a reminder run the scheduler reports its outcome.
+REPORT_AFTER_SECONDS = 120.0
+
+
+def _create_schema(conn):
     conn.execute("""
         CREATE TABLE IF NOT EXISTS subscriptions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -33,11 +39,23 @@ def _get_db():
             created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
         )
     """)
-    conn.commit()
-    try:
+    # Per-run delivery counts, bumped by the outbox handler (see run_report).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_runs (
+            run_id TEXT PRIMARY KEY,
+            queued INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            pruned INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+
+
+@contextmanager
+def _get_db():
+    with db.connection(config.PUSH_DB_PATH, init=_create_schema) as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def save_subscription(agent_name, subscription_info):
@@ -59,68 +77,174 @@ def get_all_subscriptions():
 
 
 def remove_subscription(endpoint):
+    remove_subscriptions([endpoint])
+
+
+def remove_subscriptions(endpoints):
+    """Delete many subscriptions in one statement."""
+    if not endpoints:
+        return
     with _get_db() as conn:
-        conn.execute("DELETE FROM subscriptions WHERE endpoint = ?", (endpoint,))
+        conn.execute(
+            "DELETE FROM subscriptions WHERE endpoint IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(endpoints)),),
+        )
         conn.commit()
 
 
-def send_push(subscription_info, title, body, url="/dashboard", tag="follow-up"):
-    """Send a push notification to a single subscription."""
-    if not PUSH_AVAILABLE:
-        return False
-    if not config.VAPID_PRIVATE_KEY:
-        return False
-
-    payload = json.dumps({
+def _payload(title, body, url="/dashboard", tag="follow-up"):
+    return json.dumps({
         "title": title,
         "body": body,
         "url": url,
         "tag": tag,
     })
 
+
+def _deliver(subscription_info, payload) -> bool:
+    """Send one payload. False means the endpoint is gone (404/410); other failures raise."""
     try:
         webpush(
             subscription_info=subscription_info,
             data=payload,
             vapid_private_key=config.VAPID_PRIVATE_KEY,
             vapid_claims={"sub": f"mailto:{config.VAPID_CLAIMS_EMAIL}"},
+            timeout=config.PUSH_TIMEOUT_SECONDS,
         )
-        return True
     except WebPushException as e:
-        if e.response and e.response.status_code in (404, 410):
-            endpoint = subscription_info.get("endpoint", "")
-            remove_subscription(endpoint)
+        if e.response is not None and e.response.status_code in (404, 410):
+            return False
+        raise
+    return True
+
+
+def send_push(subscription_info, title, body, url="/dashboard", tag="follow-up"):
+    """Send a push notification to a single subscription."""
+    if not PUSH_AVAILABLE:
         return False
-    except Exception:
+    if not config.VAPID_PRIVATE_KEY:
         return False
 
+    try:
+        if _deliver(subscription_info, _payload(title, body, url, tag)):
+            return True
+        remove_subscription(subscription_info.get("endpoint", ""))
+    except Exception:
+        pass
+    return False
 
-def send_follow_up_reminders():
-    """Send push notifications for follow-ups due today. Called by scheduler."""
-    from models.calls import get_stats
-    stats = get_stats()
-    due_today = stats.get("due_today", [])
 
-    if not due_today:
+def _count_delivery(run_id, column):
+    if not run_id:
         return
+    with _get_db() as conn:
+        conn.execute(
+            f"UPDATE reminder_runs SET {column} = {column} + 1 WHERE run_id = ?", (run_id,)
+        )
+        conn.commit()
+
+
+def _send_queued(job):
+    """Outbox handler: deliver one queued notification.
+
+    A gone endpoint is handed to "push_prune" rather than deleted here, so
+    a run's gone endpoints go in one batched DELETE.
+    """
+    if not PUSH_AVAILABLE or not config.VAPID_PRIVATE_KEY:
+        raise outbox.PermanentError("Web Push is not configured")
+    if _deliver(job["subscription"], job["payload"]):
+        _count_delivery(job.get("run"), "sent")
+    else:
+        outbox.enqueue("push_prune", job["subscription"].get("endpoint", ""))
+        _count_delivery(job.get("run"), "pruned")
+
+
+def _prune_queued(endpoints):
+    """Outbox batch handler: delete every gone endpoint in the window at once."""
+    remove_subscriptions(endpoints)
+
+
+outbox.register("push", _send_queued, concurrency=config.PUSH_MAX_WORKERS)
+outbox.register("push_prune", _prune_queued, concurrency=1,
+                batch_size=PRUNE_BATCH, window=PRUNE_WINDOW_SECONDS)
 
-    subs = get_all_subscriptions()
-    if not subs:
-        return
 
+def _reminder_message(due_today):
+    """Title and body for a list of follow-ups due today, or None if empty."""
+    if not due_today:
+        return None
     count = len(due_today)
     names = ", ".join(d["contact_name"] for d in due_today[:3])
     if count > 3:
         names += f" +{count - 3} more"
+    return f"{count} Follow-up{'s' if count > 1 else ''} Due Today", names
+
+
+def send_follow_up_reminders():
+    """Queue each subscriber the follow-ups due today. Called by scheduler.
+
+    Subscriptions saved with an agent name get that agent's own follow-ups;
+    unnamed ones get the team-wide list.  Delivery goes through the outbox,
+    which sends up to PUSH_MAX_WORKERS at once, retries failures and prunes
+    endpoints the push service reports gone.
 
+    Returns as soon as the jobs are queued, with the ``run`` id their
+    payloads carry, how many were ``queued`` and how many subscriptions
+    were ``skipped`` as unreadable.  run_report() says how they went.
+    """
+    from models import calls
+
+    started = time.monotonic()
+    stats = {"run": "", "queued": 0, "skipped": 0, "seconds": 0.0}
+    if not PUSH_AVAILABLE or not config.VAPID_PRIVATE_KEY:
+        return stats
+
+    subs = get_all_subscriptions()
+    agents = sorted({s["agent_name"] for s in subs if s["agent_name"]})
+    due = {name: st.due_today for name, st in calls.get_stats_for_agents(agents).items()}
+    if any(not s["agent_name"] for s in subs):
+        due[""] = calls.get_stats().due_today
+
+    messages = {name: _reminder_message(items) for name, items in due.items()}
+    run_id = uuid.uuid4().hex
+    jobs = []
     for sub in subs:
+        message = messages.get(sub["agent_name"])
+        if not message:
+            continue
         try:
             sub_info = json.loads(sub["subscription_json"])
-            send_push(
-                sub_info,
-                title=f"{count} Follow-up{'s' if count > 1 else ''} Due Today",
-                body=names,
-                url="/dashboard",
-            )
-        except Exception:
-            pass
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        jobs.append({"subscription": sub_info, "payload": _payload(*message), "run": run_id})
+
+    # The run row goes in first so the handler always has one to count into.
+    with _get_db() as conn:
+        conn.execute(
+            "INSERT INTO reminder_runs (run_id, queued, skipped) VALUES (?, ?, ?)",
+            (run_id, len(jobs), stats["skipped"]),
+        )
+        conn.commit()
+    stats["run"] = run_id
+    stats["queued"] = outbox.enqueue_many("push", jobs)
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def run_report(run_id):
+    """How one reminder run's notifications went so far, or None if unknown.
+
+    ``sent`` and ``pruned`` (endpoint gone) are counted by the handler;
+    ``failed`` (dead-lettered) and ``pending`` (queued or retrying) are the
+    run's jobs still in the outbox.
+    """
+    with _get_db() as conn:
+        row = conn.execute(
+            "SELECT queued, skipped, sent, pruned FROM reminder_runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    left = outbox.job_counts("push", run=run_id)
+    return {**dict(row), "failed": left["dead"], "pending": left["pending"]}
@@ -1,10 +1,13 @@
 """Background scheduler for weekly export and daily push reminders."""
 
+from datetime import datetime, timedelta, timezone
+
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import config
 from sheets import export_week_to_sheets
-from push import send_follow_up_reminders
+from email_utils import queue_html_email
+from push import REPORT_AFTER_SECONDS, run_report, send_follow_up_reminders
 
 
 def _weekly_export_job():
@@ -17,10 +20,46 @@ def _weekly_export_job():
 
 def _daily_push_reminders():
     try:
-        send_follow_up_reminders()
-        print("[Scheduler] Follow-up push reminders sent.")
+        stats = send_follow_up_reminders()
+        print(f"[Scheduler] Follow-up push reminders: {stats['queued']} queued, "
+              f"{stats['skipped']} skipped in {stats['seconds']}s")
     except Exception as e:
         print(f"[Scheduler] Push reminders failed: {e}")
+        return
+    if stats["queued"]:
+        # Report once the outbox has had time to deliver, without holding
+        # this thread while it does.
+        scheduler.add_job(
+            _push_reminder_report,
+            trigger="date",
+            run_date=datetime.now(timezone.utc) + timedelta(seconds=REPORT_AFTER_SECONDS),
+            args=[stats["run"]],
+            id=f"push_reminder_report_{stats['run']}",
+        )
+
+
+def _push_reminder_report(run_id):
+    try:
+        report = run_report(run_id)
+        if report is None:
+            return
+        print(f"[Scheduler] Follow-up push run {run_id[:8]}: {report['sent']} sent, "
+              f"{report['failed']} failed, {report['pruned']} pruned, "
+              f"{report['pending']} pending of {report['queued']} queued")
+    except Exception as e:
+        print(f"[Scheduler] Push reminder report failed: {e}")
+
+
+def _monthly_archive_job():
+    from models import archive, calls, scoreboard
+    try:
+        before = archive.horizon()
+        moved_calls = calls.archive_calls(before)
+        moved_activities = scoreboard.archive_activities(before)
+        print(f"[Scheduler] Archived before {before}: "
+              f"{moved_calls} calls, {moved_activities} activities")
+    except Exception as e:
+        print(f"[Scheduler] Archive failed: {e}")
 
 
 def _daily_email_reminders():
@@ -31,19 +70,17 @@ def _daily_email_reminders():
         print("[Scheduler] Email reminders skipped: SMTP not configured")
         return
 
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    from models.calls import get_stats
+    from models.calls import get_stats_for_agents
 
-    for agent in config.AGENTS:
-        name = agent["name"]
-        email = agent.get("email", "")
-        if not email:
-            continue
+    recipients = [a for a in config.AGENTS if a.get("email")]
+    if not recipients:
+        return
+    all_stats = get_stats_for_agents([a["name"] for a in recipients])
 
-        stats = get_stats(agent_name=name)
-        due = stats.get("due_today", [])
+    for agent in recipients:
+        name = agent["name"]
+        email = agent["email"]
+        due = all_stats[name].due_today
         if not due:
             continue
 
@@ -70,20 +107,9 @@ def _daily_email_reminders():
         </div>
         """
 
-        try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = f"\U0001f4de {len(due)} follow-up{'s' if len(due) != 1 else ''} today \u2014 LIFI"
-            msg["From"] = config.SMTP_EMAIL
-            msg["To"] = email
-            msg.attach(MIMEText(body, "html"))
-
-            with smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT) as server:
-                server.starttls()
-                server.login(config.SMTP_EMAIL, config.SMTP_PASSWORD)
-                server.send_message(msg)
-            print(f"[Scheduler] Reminder email sent to {name} ({email})")
-        except Exception as e:
-            print(f"[Scheduler] Reminder email to {name} failed: {e}")
+        subject = f"\U0001f4de {len(due)} follow-up{'s' if len(due) != 1 else ''} today \u2014 LIFI"
+        queue_html_email(email, subject, body)
+        print(f"[Scheduler] Reminder email queued for {name} ({email})")
 
 
 scheduler = BackgroundScheduler(daemon=True)
@@ -107,6 +133,16 @@ scheduler.add_job(
     replace_existing=True,
 )
 
+scheduler.add_job(
+    _monthly_archive_job,
+    trigger="cron",
+    day=1,
+    hour=2,
+    minute=30,
+    id="monthly_archive",
+    replace_existing=True,
+)
+
 if config.REMINDER_ENABLED:
     scheduler.add_job(
         _daily_email_reminders,
@@ -121,3 +157,4 @@ if config.REMINDER_ENABLED:
 scheduler.start()
 print(f"[Scheduler] Weekly export: {config.REPORT_DAY.upper()} at {config.REPORT_HOUR}:{config.REPORT_MINUTE:02d}")
 print("[Scheduler] Daily push reminders: 8:30 AM")
+print(f"[Scheduler] Monthly archive: 1st at 2:30 AM (after {config.ARCHIVE_AFTER_DAYS} days)")
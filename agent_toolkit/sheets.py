@@ -1,8 +1,9 @@
 """Google Sheets export for weekly call reports."""
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 import config
+import timeutil
 
 try:
     import gspread
@@ -43,7 +44,7 @@ def _get_client():
 
 
 def _week_label():
-    today = datetime.now()
+    today = timeutil.today()
     monday = today - timedelta(days=today.weekday())
     friday = monday + timedelta(days=4)
     return f"{monday.strftime('%b %d')}-{friday.strftime('%d, %Y')}"
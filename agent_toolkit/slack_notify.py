@@ -1,9 +1,18 @@
-"""Slack webhook notifications for scoreboard events."""
+"""Slack webhook notifications for scoreboard events.
+
+Messages go through the outbox, so a Slack outage delays them instead of
+losing them.  Activity logs are coalesced: everything logged within
+SLACK_DIGEST_SECONDS of the first entry goes out as one digest message,
+which keeps a busy night under Slack's webhook rate limit.
+"""
 
 import json
 import os
 import threading
 
+import config
+import outbox
+
 try:
     import requests as _requests
     _REQUESTS_OK = True
@@ -11,32 +20,70 @@ except ImportError:
     _REQUESTS_OK = False
 
 
+# Most activity entries folded into one digest message.
+DIGEST_MAX_EVENTS = 50
+
+# Wait used when a 429 comes without a usable Retry-After header.
+DEFAULT_RETRY_AFTER = 30
+
+_local = threading.local()
+
+
 def _webhook_url() -> str:
     return os.getenv("SLACK_WEBHOOK_URL", "")
 
 
+def _session():
+    """This thread's keep-alive session, so webhook posts reuse connections."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = _requests.Session()
+        session.headers["Content-Type"] = "application/json"
+    return session
+
+
+def _retry_after(resp) -> float:
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
 def _post(payload: dict):
+    """Outbox handler: deliver one message to the webhook."""
     url = _webhook_url()
     if not url or not _REQUESTS_OK:
         return
-    try:
-        _requests.post(url, data=json.dumps(payload), timeout=5,
-                       headers={"Content-Type": "application/json"})
-    except Exception:
-        pass
+    resp = _session().post(url, data=json.dumps(payload), timeout=5)
+    if resp.status_code == 429:
+        raise outbox.RetryLater(_retry_after(resp), "Slack webhook rate limited")
+    if resp.status_code >= 500:
+        raise RuntimeError(f"Slack webhook HTTP {resp.status_code}")
+    if resp.status_code >= 400:
+        raise outbox.PermanentError(f"Slack webhook HTTP {resp.status_code}: {resp.text[:200]}")
+
+
+def _post_activity_digest(events: list[dict]):
+    """Outbox batch handler: one message for every activity in the window."""
+    _post({"text": _digest_text(events)})
+
+
+outbox.register("slack", _post, concurrency=2)
+outbox.register("slack_activity", _post_activity_digest, concurrency=1,
+                batch_size=DIGEST_MAX_EVENTS, window=config.SLACK_DIGEST_SECONDS)
 
 
 def _bg(payload: dict):
-    threading.Thread(target=_post, args=(payload,), daemon=True).start()
+    if _webhook_url():
+        outbox.enqueue("slack", payload)
 
 
 # ---------------------------------------------------------------------------
 # Public notification functions
 # ---------------------------------------------------------------------------
 
-def notify_activity(agent: str, activity_type: str, count: int,
-                    ap_amount: float = 0, notes: str = ""):
-    """Post activity log to Slack."""
+def _activity_text(agent: str, activity_type: str, count: int,
+                   ap_amount: float = 0, notes: str = "") -> str:
     emojis = {
         "policy": "💰", "application": "📋", "call": "📞",
         "appointment": "📅", "presentation": "🎯",
@@ -56,8 +103,44 @@ def notify_activity(agent: str, activity_type: str, count: int,
         text = f"{emoji} *{agent}* logged {qty}{label}"
         if notes:
             text += f"\n>_{notes}_"
+    return text
 
-    _bg({"text": text})
+
+def _digest_text(events: list[dict]) -> str:
+    """Format a window of activity events, merging repeats by agent and type.
+
+    A lone event reads exactly like it always has; policies with AP keep
+    their own line so every sale gets called out.
+    """
+    if len(events) == 1:
+        return _activity_text(**events[0])
+
+    entries, index = [], {}
+    for event in events:
+        solo = event["activity_type"] == "policy" and event.get("ap_amount")
+        key = (event["agent"], event["activity_type"])
+        if not solo and key in index:
+            entry = entries[index[key]]
+            entry["count"] += event["count"]
+            entry["notes"] = "; ".join(n for n in (entry["notes"], event.get("notes")) if n)
+            continue
+        if not solo:
+            index[key] = len(entries)
+        entries.append({**event, "notes": event.get("notes") or ""})
+
+    lines = [f"📣 *Scoreboard update* — {len(events)} entries"]
+    lines += [_activity_text(**entry) for entry in entries]
+    return "\n".join(lines)
+
+
+def notify_activity(agent: str, activity_type: str, count: int,
+                    ap_amount: float = 0, notes: str = ""):
+    """Queue an activity for the next Slack digest."""
+    if _webhook_url():
+        outbox.enqueue("slack_activity", {
+            "agent": agent, "activity_type": activity_type, "count": count,
+            "ap_amount": ap_amount, "notes": notes,
+        })
 
 
 def notify_milestone(agent: str, activity_type: str, milestone: int):
@@ -77,8 +160,11 @@ def notify_milestone(agent: str, activity_type: str, milestone: int):
     _bg({"text": text})
 
 
-def notify_daily_summary(summary: list[dict], period: str = "today"):
-    """Post a daily/weekly leaderboard summary to Slack."""
+def notify_daily_summary(summary: list[dict], period: str = "today", forecasts=None):
+    """Post a daily/weekly leaderboard summary to Slack.
+
+    ``forecasts`` (agent -> forecast.AgentForecast) adds month-end pacing.
+    """
     if not summary:
         return
 
@@ -102,4 +188,16 @@ def notify_daily_summary(summary: list[dict], period: str = "today"):
         stat_str = " · ".join(parts) if parts else "No activity yet"
         lines.append(f"{medal} *{name}* — {stat_str}")
 
+    if forecasts:
+        paced = sorted((f for f in forecasts.values() if f.projected_ap),
+                       key=lambda f: -f.projected_ap)
+        if paced:
+            lines.append("\n📈 *Month-end pace*")
+        for f in paced[:5]:
+            flag = " ✅" if f.on_pace else ""
+            lines.append(
+                f"*{f.agent}* — ${f.projected_ap:,.0f} AP · "
+                f"${f.projected_commission:,.0f} commission ({f.goal_pct:.0f}% of goal){flag}"
+            )
+
     _bg({"text": "\n".join(lines)})
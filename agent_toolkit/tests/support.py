@@ -0,0 +1,39 @@
+"""Shared fixtures for agent_toolkit tests."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import config
+import db
+import outbox
+
+DB_SETTINGS = (
+    "CALLS_DB_PATH",
+    "REFERRALS_DB_PATH",
+    "SCOREBOARD_DB_PATH",
+    "PUSH_DB_PATH",
+    "ARCHIVE_DB_PATH",
+    "OUTBOX_DB_PATH",
+)
+
+
+class TempDbTestCase(unittest.TestCase):
+    """Point every database path at a fresh temporary directory."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_path = Path(tmp.name)
+        for name in DB_SETTINGS:
+            filename = getattr(config, name).name
+            patcher = mock.patch.object(config, name, self.tmp_path / filename)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Tests run queued jobs themselves with outbox.drain().
+        patcher = mock.patch.object(outbox.worker, "autostart", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db.close_all()
+        self.addCleanup(db.close_all)
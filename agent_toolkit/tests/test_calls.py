@@ -0,0 +1,658 @@
+"""Tests for models.calls schema migrations and query plans."""
+
+import sqlite3
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import config
+import db
+import timeutil
+from models import archive, calls
+from tests.support import TempDbTestCase
+
+
+def _capture_selects(conn, fn, *args, **kwargs):
+    """Run ``fn`` and return the SELECT statements it sent to ``conn``."""
+    statements = []
+
+    def trace(sql):
+        if sql.lstrip().upper().startswith("SELECT"):
+            statements.append(sql)
+
+    conn.set_trace_callback(trace)
+    try:
+        fn(*args, **kwargs)
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+class TestMigrations(TempDbTestCase):
+
+    def test_fresh_database_reaches_latest_version(self):
+        with calls.get_db() as conn:
+            self.assertEqual(db.schema_version(conn), len(calls.MIGRATIONS))
+            indexes = {r["name"] for r in conn.execute("PRAGMA index_list(calls)")}
+        self.assertTrue({
+            "idx_calls_agent_ts",
+            "idx_calls_followup_agent",
+            "idx_calls_outcome_ts",
+            "idx_calls_ts",
+        } <= indexes)
+        self.assertNotIn("idx_calls_agent_datetime", indexes)
+
+    def test_legacy_database_without_agent_column_is_upgraded(self):
+        legacy = sqlite3.connect(str(config.CALLS_DB_PATH))
+        legacy.execute("""
+            CREATE TABLE calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contact_name TEXT NOT NULL DEFAULT '',
+                phone_number TEXT NOT NULL DEFAULT '',
+                call_datetime TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                notes TEXT NOT NULL DEFAULT '',
+                follow_up_date TEXT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+            )
+        """)
+        legacy.execute(
+            "INSERT INTO calls (call_datetime, direction, outcome) "
+            "VALUES ('2025-06-01 09:00', 'Inbound', 'Sale')"
+        )
+        legacy.execute(
+            "INSERT INTO calls (call_datetime, direction, outcome, follow_up_date) "
+            "VALUES ('2025-06-02T14:30', 'Inbound', 'Sale', '06/09/2025')"
+        )
+        legacy.commit()
+        legacy.close()
+
+        rows = calls.get_calls()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["agent_name"], "")
+        # Backfill normalizes the datetime-local value the form used to store.
+        self.assertEqual(rows[0]["call_datetime"], "2025-06-02 14:30")
+        self.assertEqual(rows[0]["call_day"], "2025-06-02")
+        self.assertEqual(rows[0]["follow_up_date"], "2025-06-09")
+        self.assertEqual(rows[0]["call_ts"],
+                         timeutil.to_epoch(datetime(2025, 6, 2, 14, 30)))
+        self.assertEqual(len(calls.get_calls(date_from="2025-06-02", date_to="2025-06-02")), 1)
+        with calls.get_db() as conn:
+            days = conn.execute("SELECT day FROM calls_daily ORDER BY day").fetchall()
+        self.assertEqual([d["day"] for d in days], ["2025-06-01", "2025-06-02"])
+
+    def test_unreadable_legacy_dates_stay_listed(self):
+        legacy = sqlite3.connect(str(config.CALLS_DB_PATH))
+        legacy.execute("""
+            CREATE TABLE calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contact_name TEXT NOT NULL DEFAULT '',
+                phone_number TEXT NOT NULL DEFAULT '',
+                call_datetime TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                notes TEXT NOT NULL DEFAULT '',
+                follow_up_date TEXT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+            )
+        """)
+        legacy.executemany(
+            "INSERT INTO calls (contact_name, call_datetime, created_at, direction, outcome) "
+            "VALUES (?, ?, ?, 'Inbound', 'Sale')",
+            [("Amy", "2025-06-01 09:00", "2025-06-01 09:05:00"),
+             ("Ben", "Tuesday am", "2025-06-03 08:15:00"),
+             ("Cy", "Tuesday pm", "unknown")],
+        )
+        legacy.commit()
+        legacy.close()
+
+        with mock.patch("builtins.print") as printed:
+            calls.init_db()
+        self.assertIn("1 call(s)", printed.call_args.args[0])
+        rows = {r["contact_name"]: r for r in calls.get_calls()}
+        # Falls back to when the row was entered...
+        self.assertEqual(rows["Ben"]["call_ts"],
+                         timeutil.to_epoch(datetime(2025, 6, 3, 8, 15)))
+        self.assertEqual(len(calls.get_calls(date_from="2025-06-03", date_to="2025-06-03")), 1)
+        # ...or sorts last instead of dropping out of keyset pages.
+        self.assertEqual((rows["Cy"]["call_ts"], rows["Cy"]["call_datetime"]), (0, "Tuesday pm"))
+        seen, cursor = [], None
+        while True:
+            page, cursor = calls.get_calls_page(cursor=cursor, limit=1)
+            seen += [r["contact_name"] for r in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["Ben", "Amy", "Cy"])
+
+        # Databases migrated before the fallback get the same treatment.
+        with calls.get_db() as conn:
+            conn.execute("UPDATE calls SET call_ts = NULL WHERE contact_name = 'Cy'")
+            calls._undated_calls(conn)
+            self.assertEqual(conn.execute(
+                "SELECT call_ts FROM calls WHERE contact_name = 'Cy'").fetchone()[0], 0)
+
+    def test_migrations_are_idempotent(self):
+        calls.init_db()
+        with calls.get_db() as conn:
+            db.apply_migrations(conn, calls.MIGRATIONS)
+            versions = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+        self.assertEqual(versions, len(calls.MIGRATIONS))
+
+
+class TestHotQueriesUseIndexes(TempDbTestCase):
+
+    def assertUsesIndexes(self, fn, *args, **kwargs):
+        with calls.get_db() as conn:
+            statements = _capture_selects(conn, fn, *args, **kwargs)
+            self.assertTrue(statements)
+            for sql in statements:
+                plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                for detail in plan:
+                    words = detail.split()
+                    if words[0] in ("SCAN", "SEARCH") and words[1] in ("calls", "calls_daily"):
+                        # A SCAN, even of an index, still walks the whole table.
+                        self.assertEqual(words[0], "SEARCH", f"{sql}\n{plan}")
+                        self.assertRegex(detail, "INDEX|PRIMARY KEY", f"{sql}\n{plan}")
+
+    def test_get_stats_for_agent(self):
+        self.assertUsesIndexes(calls.get_stats, agent_name="Easton")
+
+    def test_get_stats_team(self):
+        self.assertUsesIndexes(calls.get_stats)
+
+    def test_get_calls_for_agent(self):
+        self.assertUsesIndexes(calls.get_calls, agent_name="Easton",
+                               date_from="2026-01-01", date_to="2026-01-31")
+
+    def test_get_follow_up_dates(self):
+        self.assertUsesIndexes(calls.get_follow_up_dates, "Easton")
+        self.assertUsesIndexes(calls.get_follow_up_dates)
+
+
+class TestEpochColumns(TempDbTestCase):
+
+    def test_form_value_is_normalized_on_write(self):
+        call_id = calls.log_call("Easton", "Zed", "555-0001", "2026-03-02T23:30",
+                                 "Outbound", "Sale", follow_up_date="03/09/2026")
+        row = calls.get_call(call_id)
+        self.assertEqual(row["call_datetime"], "2026-03-02 23:30")
+        self.assertEqual(row["call_day"], "2026-03-02")
+        self.assertEqual(row["follow_up_date"], "2026-03-09")
+        self.assertEqual(row["call_ts"], timeutil.to_epoch(datetime(2026, 3, 2, 23, 30)))
+
+    def test_update_moves_epoch_and_rollup(self):
+        call_id = calls.log_call("Easton", "Zed", "", "2026-03-02 09:00", "Outbound", "Sale")
+        calls.update_call(call_id, call_datetime="2026-03-04T10:15")
+        row = calls.get_call(call_id)
+        self.assertEqual(row["call_day"], "2026-03-04")
+        self.assertEqual(row["call_ts"], timeutil.to_epoch(datetime(2026, 3, 4, 10, 15)))
+        with calls.get_db() as conn:
+            days = [r["day"] for r in conn.execute("SELECT day FROM calls_daily")]
+        self.assertEqual(days, ["2026-03-04"])
+
+    def test_unreadable_edit_keeps_old_time(self):
+        call_id = calls.log_call("Easton", "Zed", "", "2026-03-02 09:00", "Outbound", "Sale")
+        calls.update_call(call_id, call_datetime="", outcome="Callback")
+        row = calls.get_call(call_id)
+        self.assertEqual(row["call_datetime"], "2026-03-02 09:00")
+        self.assertEqual(row["outcome"], "Callback")
+
+    def test_date_range_is_whole_local_days(self):
+        for at in ("2026-03-01 23:59", "2026-03-02 00:00", "2026-03-02 23:59",
+                   "2026-03-03 00:00"):
+            calls.log_call("Easton", at, "", at, "Outbound", "Sale")
+        rows = calls.get_calls(date_from="2026-03-02", date_to="2026-03-02")
+        self.assertEqual([r["contact_name"] for r in rows],
+                         ["2026-03-02 23:59", "2026-03-02 00:00"])
+        # Garbage dates from the query string are ignored rather than compared.
+        self.assertEqual(len(calls.get_calls(date_from="03-02", date_to="soon")), 4)
+
+    def test_day_bounds_follow_agency_timezone(self):
+        # 2026-03-08 is the US spring-forward day: 23 hours long in Los Angeles.
+        original = timeutil.TZ
+        timeutil.TZ = timeutil.ZoneInfo("America/Los_Angeles")
+        try:
+            length = timeutil.day_end("2026-03-08") - timeutil.day_start("2026-03-08")
+        finally:
+            timeutil.TZ = original
+        self.assertEqual(length, 23 * 3600)
+
+
+class TestStats(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timeutil.now()
+        self.today = now.strftime("%Y-%m-%d")
+        # The dashboard week is Mon-Fri, so weekend calls count only today.
+        self.in_week = 1 if now.weekday() < 5 else 0
+        tomorrow = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+        last_month = (now - timedelta(days=40)).strftime("%Y-%m-%d %H:%M")
+        at = now.strftime("%Y-%m-%d %H:%M")
+        calls.log_call("Easton", "Zed", "555-0001", at, "Outbound", "Sale",
+                       follow_up_date=self.today)
+        calls.log_call("Easton", "Amy", "555-0002", at, "Outbound", "No Answer",
+                       follow_up_date=self.today)
+        calls.log_call("Blake", "Bo", "555-0003", at, "Inbound", "Sale",
+                       follow_up_date=tomorrow)
+        calls.log_call("Blake", "Old", "555-0004", last_month, "Inbound", "Sale")
+
+    def test_agent_stats(self):
+        stats = calls.get_stats(agent_name="Easton")
+        self.assertIsInstance(stats, calls.CallStats)
+        self.assertEqual(stats.today_count, 2)
+        self.assertEqual(stats.week_count, 2 * self.in_week)
+        self.assertEqual([d["contact_name"] for d in stats.due_today], ["Amy", "Zed"])
+        self.assertEqual(len(stats.follow_ups), 2)
+        if self.in_week:
+            # Outcome breakdown and per-agent counts stay team-wide.
+            self.assertEqual(stats.outcomes[0], {"outcome": "Sale", "count": 2})
+            self.assertEqual(stats.agent_stats, [{"agent": "Easton", "count": 2},
+                                                 {"agent": "Blake", "count": 1}])
+
+    def test_team_stats(self):
+        stats = calls.get_stats()
+        self.assertEqual(stats.today_count, 3)
+        self.assertEqual(stats.week_count, 3 * self.in_week)
+        self.assertEqual(len(stats.follow_ups), 3)
+        self.assertEqual(len(stats.due_today), 2)
+
+    def test_bulk_stats_use_two_queries(self):
+        calls.init_db()
+        with calls.get_db() as conn:
+            statements = _capture_selects(conn, calls.get_stats_for_agents, ["Easton", "Blake"])
+        self.assertEqual(len(statements), 2)
+
+        stats = calls.get_stats_for_agents(["Easton", "Blake", "Nobody"])
+        self.assertEqual(stats["Blake"].today_count, 1)
+        self.assertEqual(stats["Blake"].due_today, [])
+        self.assertEqual(stats["Blake"].follow_ups[0]["contact_name"], "Bo")
+        self.assertEqual(stats["Nobody"].week_count, 0)
+
+
+class TestDailyRollup(TempDbTestCase):
+
+    def _rollup(self):
+        with calls.get_db() as conn:
+            return {
+                (r["day"], r["agent_name"], r["outcome"], r["direction"]): r["count"]
+                for r in conn.execute("SELECT * FROM calls_daily")
+            }
+
+    def test_triggers_track_insert_update_delete(self):
+        a = calls.log_call("Easton", "A", "1", "2026-03-02T09:00", "Outbound", "Sale")
+        calls.log_call("Easton", "B", "2", "2026-03-02 10:00", "Outbound", "Sale")
+        self.assertEqual(self._rollup(), {("2026-03-02", "Easton", "Sale", "Outbound"): 2})
+
+        calls.update_call(a, outcome="Callback", call_datetime="2026-03-03 09:00")
+        self.assertEqual(self._rollup(), {
+            ("2026-03-02", "Easton", "Sale", "Outbound"): 1,
+            ("2026-03-03", "Easton", "Callback", "Outbound"): 1,
+        })
+
+        calls.update_call(a, notes="no rollup change")
+        calls.delete_call(a)
+        self.assertEqual(self._rollup(), {("2026-03-02", "Easton", "Sale", "Outbound"): 1})
+
+    def test_rebuild_matches_triggers(self):
+        for i in range(5):
+            calls.log_call("Blake", f"C{i}", str(i), f"2026-03-0{i + 1} 09:00",
+                           "Inbound", "Voicemail")
+        before = self._rollup()
+        with calls.get_db() as conn:
+            conn.execute("DELETE FROM calls_daily")
+            conn.commit()
+        self.assertEqual(calls.rebuild_daily_rollup(), 5)
+        self.assertEqual(self._rollup(), before)
+
+
+class TestArchive(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.before = archive.horizon(timeutil.today(), after_days=90)
+        old = (self.before - timedelta(days=30)).isoformat()
+        self.old = calls.log_call("Easton", "Ann", "714-335-1412", f"{old} 09:00",
+                                  "Outbound", "Sale")
+        calls.log_call("Easton", "Bo", "714-555-0000", f"{old} 10:00", "Outbound",
+                       "Callback", follow_up_date=(timeutil.today() + timedelta(days=3)).isoformat())
+        self.hot = calls.log_call("Blake", "Ann", "714-335-1412",
+                                  f"{self.before.isoformat()} 09:00", "Inbound", "Sale")
+
+    def _rollup(self):
+        with calls.get_db() as conn:
+            return [tuple(r) for r in conn.execute("SELECT * FROM calls_daily ORDER BY day")]
+
+    def test_moves_old_calls_and_keeps_rollup(self):
+        rollup = self._rollup()
+        totals = calls.get_outcome_totals()
+        self.assertEqual(calls.archive_calls(self.before), 1)
+        self.assertEqual(calls.archive_calls(self.before), 0)
+
+        self.assertIsNone(calls.get_call(self.old))
+        self.assertIsNotNone(calls.get_call(self.hot))
+        with archive.get_db() as conn:
+            row = conn.execute("SELECT * FROM calls WHERE id = ?", (self.old,)).fetchone()
+        self.assertEqual(row["contact_name"], "Ann")
+        self.assertEqual(self._rollup(), rollup)
+        self.assertEqual(calls.get_outcome_totals(), totals)
+        calls.rebuild_daily_rollup()
+        self.assertEqual(self._rollup(), rollup)
+
+        contact = calls.get_contact(calls.get_call(self.hot)["contact_id"])
+        self.assertEqual(contact["call_count"], 1)
+
+    def test_contacts_survive_archiving(self):
+        old = (self.before - timedelta(days=20)).isoformat()
+        cold = calls.get_call(calls.log_call("Easton", "Cy Cold", "949-555-0101",
+                                             f"{old} 09:00", "Outbound", "Sale"))
+        calls.set_ghl_contact_id(cold["contact_id"], "ghl-1")
+        calls.archive_calls(self.before)
+        calls.rebuild_contacts()
+
+        contact = calls.get_contact(cold["contact_id"])
+        self.assertEqual((contact["call_count"], contact["ghl_contact_id"]), (0, "ghl-1"))
+        self.assertEqual(calls.get_contact_suggestions("Cy"), [])
+        again = calls.get_call(calls.log_call("Blake", "Cy Cold", "949-555-0101",
+                                              f"{timeutil.today()} 09:00", "Inbound", "Sale"))
+        self.assertEqual(again["contact_id"], cold["contact_id"])
+        self.assertEqual(calls.get_contact_suggestions("Cy")[0]["name"], "Cy Cold")
+
+    def test_pending_follow_ups_stay_hot(self):
+        calls.archive_calls(self.before)
+        self.assertEqual(calls.get_calls(search="Bo")[0]["outcome"], "Callback")
+
+
+class TestPipeline(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            calls.log_call("Easton", f"Sale {i}", "", f"2026-02-0{i + 1} 09:00",
+                           "Outbound", "Sale", notes="x" * 100)
+        calls.log_call("Blake", "Cb", "", "2026-02-01 09:00", "Outbound", "Callback")
+
+    def test_board_limits_each_column(self):
+        board = calls.get_pipeline_data(per_column=2)
+        self.assertEqual([c["contact_name"] for c in board["Sale"]["cards"]],
+                         ["Sale 4", "Sale 3"])
+        self.assertTrue(board["Sale"]["more"])
+        self.assertFalse(board["Callback"]["more"])
+        self.assertEqual(len(board["Sale"]["cards"][0]["notes"]), 61)
+
+    def test_load_more_walks_the_column(self):
+        seen = []
+        column = calls.get_pipeline_column("Sale", per_column=2)
+        while True:
+            seen.extend(c["contact_name"] for c in column["cards"])
+            if not column["more"]:
+                break
+            last = column["cards"][-1]
+            column = calls.get_pipeline_column(
+                "Sale", before=last["call_ts"], before_id=last["id"], per_column=2)
+        self.assertEqual(seen, [f"Sale {i}" for i in range(4, -1, -1)])
+
+    def test_outcome_totals(self):
+        self.assertEqual(calls.get_outcome_totals(), {"Sale": 5, "Callback": 1})
+
+
+class TestSearch(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.john = calls.log_call("Easton", "John O'Brien", "(714) 335-1412",
+                                   "2026-01-01 10:00", "Outbound", "Sale",
+                                   notes="Wants term life")
+        calls.log_call("Easton", "Jane Smith", "+1 949.555.0000",
+                       "2026-01-02 10:00", "Outbound", "Callback")
+
+    def _names(self, q):
+        return [s["name"] for s in calls.get_contact_suggestions(q)]
+
+    def test_prefix_name_and_phone_suggestions(self):
+        self.assertEqual(self._names("jo"), ["John O'Brien"])
+        self.assertEqual(self._names("smi ja"), ["Jane Smith"])
+        self.assertEqual(self._names("714"), ["John O'Brien"])
+        self.assertEqual(self._names("1412"), ["John O'Brien"])
+        self.assertEqual(self._names("(949) 555"), ["Jane Smith"])
+        self.assertEqual(self._names("\"*"), [])
+
+    def test_history_search_includes_notes(self):
+        self.assertEqual([c["id"] for c in calls.get_calls(search="term")], [self.john])
+        self.assertEqual(calls.get_calls(search="zzz"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        calls.update_call(self.john, contact_name="Jonathan Obi", phone_number="555-867-5309")
+        self.assertEqual(self._names("714"), [])
+        self.assertEqual(self._names("obi"), ["Jonathan Obi"])
+        self.assertEqual(self._names("5309"), ["Jonathan Obi"])
+        calls.delete_call(self.john)
+        self.assertEqual(self._names("obi"), [])
+
+
+class TestContacts(TempDbTestCase):
+
+    def test_normalize_phone(self):
+        self.assertEqual(calls.normalize_phone("(714) 335-1412"), "+17143351412")
+        self.assertEqual(calls.normalize_phone("1-714-335-1412"), "+17143351412")
+        self.assertEqual(calls.normalize_phone("+44 20 7946 0958"), "+442079460958")
+        self.assertIsNone(calls.normalize_phone("335-1412"))
+        self.assertIsNone(calls.normalize_phone(""))
+
+    def test_calls_to_one_number_share_a_contact(self):
+        first = calls.log_call("Easton", "Jon Smith", "714.335.1412", "2026-01-01 10:00",
+                               "Outbound", "No Answer")
+        second = calls.log_call("Blake", "Jonathan Smith", "+1 (714) 335-1412",
+                                "2026-01-03 10:00", "Outbound", "Sale")
+        contact = calls.find_contact(phone="7143351412")
+        self.assertEqual(contact["phone_e164"], "+17143351412")
+        self.assertEqual(calls.get_call(first)["contact_id"], contact["id"])
+        self.assertEqual(contact["call_count"], 2)
+        self.assertEqual(contact["last_call_id"], second)
+        self.assertEqual(contact["name"], "Jonathan Smith")
+        self.assertEqual(calls.get_contact_names(contact["id"]), ["Jonathan Smith", "Jon Smith"])
+        # Either spelling finds the one person.
+        self.assertEqual(calls.get_contact_suggestions("jon"),
+                         [{"name": "Jonathan Smith", "phone": "+1 (714) 335-1412"}])
+
+    def test_edits_and_deletes_move_the_last_call_pointer(self):
+        first = calls.log_call("Easton", "Amy", "714-335-1412", "2026-01-01 10:00",
+                               "Outbound", "Sale")
+        second = calls.log_call("Easton", "Amy", "714-335-1412", "2026-01-02 10:00",
+                                "Outbound", "Sale")
+        calls.update_call(second, phone_number="949-555-0000")
+        amy = calls.find_contact(phone="714-335-1412")
+        self.assertEqual((amy["call_count"], amy["last_call_id"]), (1, first))
+        self.assertEqual(calls.find_contact(phone="9495550000")["call_count"], 1)
+        calls.delete_call(first)
+        self.assertIsNone(calls.find_contact(phone="714-335-1412"))
+
+    def test_name_only_calls_group_by_name(self):
+        calls.log_call("Easton", "Bo  Diddley", "", "2026-01-01 10:00", "Outbound", "Sale")
+        calls.log_call("Easton", "bo diddley", "", "2026-01-02 10:00", "Outbound", "Sale")
+        self.assertEqual(calls.find_contact(name="Bo Diddley")["call_count"], 2)
+
+    def test_backfill_and_rebuild(self):
+        with calls.get_db() as conn:
+            conn.execute(
+                "INSERT INTO calls (contact_name, phone_number, call_datetime, call_ts, "
+                "direction, outcome) VALUES ('Raw', '714 335 1412', '2026-01-01 10:00', 1, "
+                "'Outbound', 'Sale')"
+            )
+            conn.commit()
+        self.assertIsNone(calls.find_contact(phone="7143351412"))
+        self.assertEqual(calls.rebuild_contacts(), 1)
+        self.assertEqual(calls.find_contact(phone="7143351412")["name"], "Raw")
+
+    def test_ghl_id_is_kept_on_the_contact(self):
+        call_id = calls.log_call("Easton", "Amy", "714-335-1412", "2026-01-01 10:00",
+                                 "Outbound", "Sale")
+        calls.set_ghl_contact_id(calls.get_call(call_id)["contact_id"], "ghl-123")
+        calls.log_call("Easton", "Amy", "714-335-1412", "2026-01-02 10:00",
+                       "Outbound", "Sale")
+        self.assertEqual(calls.find_contact(phone="714-335-1412")["ghl_contact_id"], "ghl-123")
+
+
+class TestPagination(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Two calls share a timestamp so the id tie-breaker matters.
+        for i in range(7):
+            calls.log_call("Easton", f"C{i}", "", f"2026-04-0{1 + i // 2} 09:00",
+                           "Outbound", "Sale")
+        calls.log_call("Blake", "Other agent", "", "2026-04-09 09:00", "Outbound", "Sale")
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = calls.get_calls_page(cursor=cursor, limit=3, agent_name="Easton")
+            seen.extend(r["contact_name"] for r in rows)
+            if not cursor:
+                break
+        self.assertEqual(seen, [f"C{i}" for i in range(6, -1, -1)])
+
+    def test_iter_calls_streams_all_matches(self):
+        rows = list(calls.iter_calls(batch_size=2, agent_name="Easton"))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(len(calls.get_week_calls()), 0)
+
+    def test_csv_export_route(self):
+        from app import app
+        client = app.test_client()
+        client.set_cookie("agent_pref", "Easton")
+        resp = client.get("/history/export.csv")
+        lines = resp.get_data(as_text=True).splitlines()
+        self.assertEqual(resp.mimetype, "text/csv")
+        self.assertTrue(lines[0].startswith("id,agent_name"))
+        self.assertEqual(len(lines), 8)
+
+        page = client.get("/api/calls?limit=5").get_json()
+        self.assertEqual(len(page["calls"]), 5)
+        rest = client.get("/api/calls", query_string={"cursor": page["next_cursor"]}).get_json()
+        self.assertEqual(len(rest["calls"]), 2)
+        self.assertIsNone(rest["next_cursor"])
+
+
+class TestBulkImport(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from app import app
+        self.client = app.test_client()
+        self.client.set_cookie("agent_pref", "Easton")
+
+    def test_json_import_dedupes_and_reports(self):
+        calls.log_call("Easton", "Existing", "555-0001", "2026-05-01 09:00", "Outbound", "Sale")
+        payload = [
+            {"contact_name": "Existing", "phone_number": "555-0001",
+             "call_datetime": "2026-05-01T09:00", "outcome": "Sale"},
+            {"contact_name": "New", "phone_number": "555-0002",
+             "call_datetime": "05/01/2026 9:05 AM", "outcome": "Voicemail"},
+            {"contact_name": "New", "phone_number": "555-0002",
+             "call_datetime": "2026-05-01 09:05", "outcome": "Voicemail"},
+            {"contact_name": "Bad", "call_datetime": "yesterday"},
+            {"contact_name": "Bad", "call_datetime": "2026-05-01 10:00", "outcome": "Maybe"},
+        ]
+        resp = self.client.post("/log/bulk", json=payload)
+        self.assertEqual(resp.status_code, 200)
+        result = resp.get_json()
+        self.assertEqual((result["inserted"], result["duplicates"], result["rejected"]), (1, 2, 2))
+        self.assertEqual([e["row"] for e in result["errors"]], [4, 5])
+        self.assertEqual(len(calls.get_calls()), 2)
+
+    def test_csv_body_import(self):
+        body = (
+            "contact_name,phone_number,call_datetime,direction,outcome,notes\n"
+            "A,555-1000,2026-05-02 10:00,Inbound,Callback,hi\n"
+            "B,555-1001,2026-05-02 10:05,,,\n"
+        )
+        resp = self.client.post("/log/bulk", data=body, content_type="text/csv")
+        self.assertEqual(resp.get_json()["inserted"], 2)
+        rows = {r["contact_name"]: r for r in calls.get_calls()}
+        self.assertEqual(rows["B"]["outcome"], "Other")
+        self.assertEqual(rows["A"]["agent_name"], "Easton")
+
+    def test_rejects_unknown_payload(self):
+        resp = self.client.post("/log/bulk", data="x", content_type="text/plain")
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestContactTimeline(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from models import referrals, scoreboard
+        self.first = calls.log_call("Easton", "Amy Lee", "714-335-1412", "2026-02-01 09:00",
+                                    "Outbound", "Callback", notes="wants quote")
+        calls.log_call("Blake", "Amy", "(714) 335 1412", "2026-02-03 10:30",
+                       "Inbound", "Sale")
+        calls.log_call("Easton", "Someone Else", "949-555-0000", "2026-02-02 09:00",
+                       "Outbound", "Sale")
+        referrals.add_referral("Bob", "Amy Lee", phone="+1 714 335 1412")
+        referrals.add_referral("Bob", "Not Amy", phone="949-555-0000")
+        scoreboard.log_activity("Blake", "policy", ap_amount=1200, contact_phone="7143351412")
+        scoreboard.log_activity("Blake", "appointment")
+        self.contact_id = calls.get_call(self.first)["contact_id"]
+
+    def test_merges_all_three_databases(self):
+        from models.timeline import get_contact_timeline
+        contact, entries = get_contact_timeline(self.contact_id)
+        self.assertEqual(contact["phone_e164"], "+17143351412")
+        self.assertEqual(sorted(e["kind"] for e in entries),
+                         ["activity", "call", "call", "referral"])
+        call_entries = [e for e in entries if e["kind"] == "call"]
+        self.assertEqual([e["at"] for e in call_entries],
+                         ["2026-02-03 10:30", "2026-02-01 09:00"])
+        self.assertEqual(get_contact_timeline(999999), (None, []))
+
+    def test_lookups_use_indexes(self):
+        from models.timeline import _QUERY, get_contact_timeline
+        get_contact_timeline(self.contact_id)
+        with calls.get_db() as conn, \
+                db.attached(conn, config.REFERRALS_DB_PATH, "referrals_db"), \
+                db.attached(conn, config.SCOREBOARD_DB_PATH, "scoreboard_db"):
+            plan = [r["detail"] for r in conn.execute(
+                "EXPLAIN QUERY PLAN " + _QUERY,
+                {"contact_id": self.contact_id, "phone": "+17143351412", "limit": 10},
+            )]
+        for detail in plan:
+            self.assertNotRegex(detail, r"^SCAN (calls|referrals|activities)\b", plan)
+        self.assertTrue(any("idx_calls_contact_ts" in d for d in plan), plan)
+        self.assertTrue(any("idx_referrals_phone" in d for d in plan), plan)
+        self.assertTrue(any("idx_activities_phone" in d for d in plan), plan)
+
+    def test_read_leaves_other_databases_unlocked(self):
+        from models.timeline import get_contact_timeline
+        get_contact_timeline(self.contact_id)
+        with calls.get_db() as conn:
+            schemas = {r["name"] for r in conn.execute("PRAGMA database_list")}
+            self.assertEqual(schemas, {"main"})
+            # A calls.db write must not also write-lock referrals/scoreboard.
+            conn.execute("BEGIN IMMEDIATE")
+            for path in (config.REFERRALS_DB_PATH, config.SCOREBOARD_DB_PATH):
+                other = sqlite3.connect(path, timeout=0)
+                try:
+                    other.execute("BEGIN IMMEDIATE")
+                    other.rollback()
+                finally:
+                    other.close()
+            conn.rollback()
+
+    def test_routes(self):
+        from app import app
+        client = app.test_client()
+        data = client.get(f"/contacts/{self.contact_id}/timeline.json").get_json()
+        self.assertEqual(data["names"], ["Amy", "Amy Lee"])
+        self.assertEqual(len(data["entries"]), 4)
+        self.assertEqual(client.get("/contacts/999999/timeline.json").status_code, 404)
+        page = client.get(f"/contacts/{self.contact_id}/timeline")
+        self.assertEqual(page.status_code, 200)
+        self.assertIn("Referred by Bob", page.get_data(as_text=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for the pooled SQLite connection layer."""
+
+import threading
+import unittest
+
+import config
+import db
+import push
+from models import calls, referrals, scoreboard
+from tests.support import TempDbTestCase
+
+
+class TestConnectionPool(TempDbTestCase):
+
+    def test_one_connection_per_database_per_thread(self):
+        for _ in range(5):
+            calls.log_call("Easton", "Jane Doe", "555-0100", "2026-01-05 10:00",
+                           "Outbound", "Sale")
+            calls.get_stats(agent_name="Easton")
+            referrals.add_referral("Bob", "Alice")
+            referrals.get_stats()
+            scoreboard.log_activity("Easton", "appointment")
+            scoreboard.get_leaderboard("week")
+            push.get_all_subscriptions()
+
+        counts = db.open_counts()
+        self.assertEqual(counts[str(config.CALLS_DB_PATH)], 1)
+        self.assertEqual(counts[str(config.REFERRALS_DB_PATH)], 1)
+        self.assertEqual(counts[str(config.SCOREBOARD_DB_PATH)], 1)
+        self.assertEqual(counts[str(config.PUSH_DB_PATH)], 1)
+
+    def test_threads_get_their_own_connection(self):
+        calls.init_db()
+        seen = []
+
+        def worker():
+            with calls.get_db() as conn:
+                seen.append(id(conn))
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        with calls.get_db() as conn:
+            seen.append(id(conn))
+
+        self.assertEqual(db.open_counts()[str(config.CALLS_DB_PATH)], 2)
+        self.assertNotEqual(seen[0], seen[1])
+
+    def test_pragmas_applied(self):
+        with calls.get_db() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+
+    def test_schema_init_runs_once(self):
+        runs = []
+
+        def init(conn):
+            runs.append(1)
+            conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+
+        path = self.tmp_path / "once.db"
+        for _ in range(3):
+            with db.connection(path, init=init):
+                pass
+        self.assertEqual(len(runs), 1)
+
+    def test_uncommitted_work_rolled_back_on_error(self):
+        calls.init_db()
+        with self.assertRaises(RuntimeError):
+            with calls.get_db() as conn:
+                conn.execute(
+                    "INSERT INTO calls (call_datetime, direction, outcome) "
+                    "VALUES ('2026-01-05 10:00', 'Outbound', 'Sale')"
+                )
+                raise RuntimeError("boom")
+        with calls.get_db() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
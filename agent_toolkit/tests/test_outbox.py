@@ -0,0 +1,247 @@
+"""Tests for the durable notification outbox."""
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import config
+import outbox
+import slack_notify
+from tests.support import TempDbTestCase
+
+
+class TestOutbox(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.received = []
+        self.failures = []
+        patcher = mock.patch.dict(outbox._destinations, clear=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        outbox.register("test", self._handler, concurrency=2, max_attempts=3)
+
+    def _handler(self, payload):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.received.append(payload)
+
+    def _rows(self):
+        with outbox.get_db() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM outbox ORDER BY id")]
+
+    def test_delivered_jobs_are_removed(self):
+        outbox.enqueue("test", {"n": 1})
+        outbox.enqueue_many("test", [{"n": 2}, {"n": 3}])
+
+        self.assertEqual(outbox.drain(["test"]), 3)
+        self.assertEqual(self.received, [{"n": 1}, {"n": 2}, {"n": 3}])
+        self.assertEqual(self._rows(), [])
+        self.assertEqual(outbox.stats()["test"]["sent"], 3)
+
+    def test_failure_backs_off_exponentially(self):
+        outbox.enqueue("test", {"n": 1})
+        self.failures = [RuntimeError("HTTP 503")]
+
+        before = time.time()
+        outbox.drain(["test"])
+        row = self._rows()[0]
+        self.assertEqual((row["status"], row["attempts"]), ("pending", 1))
+        self.assertEqual(row["last_error"], "HTTP 503")
+        self.assertGreaterEqual(row["available_at"], before + config.OUTBOX_BACKOFF_SECONDS)
+        self.assertEqual(self.received, [])
+
+        self.assertEqual(outbox.backoff(3), config.OUTBOX_BACKOFF_SECONDS * 4)
+        self.assertEqual(outbox.backoff(50), config.OUTBOX_BACKOFF_MAX_SECONDS)
+
+    def test_dead_lettered_after_max_attempts(self):
+        outbox.enqueue("test", {"n": 1})
+        self.failures = [RuntimeError("down")] * 3
+        for _ in range(3):
+            # Make the retry due now instead of waiting out the backoff.
+            with outbox.get_db() as conn:
+                conn.execute("UPDATE outbox SET available_at = 0")
+                conn.commit()
+            outbox.drain(["test"])
+
+        row = self._rows()[0]
+        self.assertEqual((row["status"], row["attempts"]), ("dead", 3))
+        stats = outbox.stats()["test"]
+        self.assertEqual((stats["dead"], stats["retried"], stats["dead_lettered"]), (1, 2, 1))
+
+        self.assertEqual(outbox.retry_dead("test"), 1)
+        outbox.drain(["test"])
+        self.assertEqual(self.received, [{"n": 1}])
+        self.assertEqual(self._rows(), [])
+
+    def test_permanent_error_is_not_retried(self):
+        outbox.enqueue("test", {"n": 1})
+        self.failures = [outbox.PermanentError("HTTP 400")]
+        outbox.drain(["test"])
+        row = self._rows()[0]
+        self.assertEqual((row["status"], row["attempts"]), ("dead", 1))
+
+    def test_expired_lease_is_reclaimed(self):
+        outbox.enqueue("test", {"n": 1})
+        self.assertEqual(len(outbox._claim("test", 10)), 1)
+        # Leased: nobody else gets it...
+        self.assertEqual(outbox._claim("test", 10), [])
+        # ...until the lease runs out, e.g. after the worker died mid-send.
+        later = time.time() + outbox.LEASE_SECONDS + 1
+        self.assertEqual(len(outbox._claim("test", 10, now=later)), 1)
+
+    def test_dispatcher_respects_destination_concurrency(self):
+        release = threading.Event()
+        running, peak = [], []
+        lock = threading.Lock()
+
+        def slow(payload):
+            with lock:
+                running.append(payload)
+                peak.append(len(running))
+            release.wait(5)
+            with lock:
+                running.remove(payload)
+
+        outbox.register("slow", slow, concurrency=2)
+        outbox.enqueue_many("slow", [{"n": i} for i in range(5)])
+
+        dispatcher = outbox.Dispatcher()
+        dispatcher.autostart = False
+        dispatcher._pool = outbox.ThreadPoolExecutor(max_workers=8)
+        self.addCleanup(dispatcher._pool.shutdown)
+        self.assertEqual(dispatcher.dispatch(), 2)
+        self.assertEqual(dispatcher.dispatch(), 0)  # both slots busy
+        release.set()
+        dispatcher._pool.shutdown(wait=True)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(dispatcher.in_flight(), {})
+        self.assertEqual(outbox.stats()["slow"]["pending"], 3)
+
+    def test_concurrency_is_shared_between_workers(self):
+        release = threading.Event()
+        outbox.register("slow", lambda payload: release.wait(5), concurrency=2)
+        outbox.enqueue_many("slow", [{"n": i} for i in range(5)])
+
+        # Two dispatchers stand in for two gunicorn workers on one outbox.db.
+        workers = []
+        for _ in range(2):
+            dispatcher = outbox.Dispatcher()
+            dispatcher.autostart = False
+            dispatcher._pool = outbox.ThreadPoolExecutor(max_workers=8)
+            self.addCleanup(dispatcher._pool.shutdown)
+            workers.append(dispatcher)
+        self.assertEqual(workers[0].dispatch(), 2)
+        self.assertEqual(workers[1].dispatch(), 0)
+        self.assertEqual(outbox.stats()["slow"]["in_flight"], 2)
+        release.set()
+        workers[0]._pool.shutdown(wait=True)
+        self.assertEqual(outbox.stats()["slow"]["in_flight"], 0)
+        self.assertEqual(workers[1].dispatch(), 2)
+
+    def test_failed_jobs_give_their_slot_back(self):
+        outbox.enqueue_many("test", [{"n": i} for i in range(3)])
+        self.failures = [RuntimeError("down")] * 2
+        outbox.drain(["test"])
+        # Backed off, not in flight: the third job still gets a slot.
+        self.assertEqual(self.received, [{"n": 2}])
+        self.assertEqual(outbox.stats()["test"]["in_flight"], 0)
+
+    def test_retry_later_pauses_every_worker(self):
+        self.failures = [outbox.RetryLater(60)]
+        outbox.enqueue("test", {"n": 1})
+        outbox.drain(["test"])
+        outbox.enqueue("test", {"n": 2})
+
+        # A fresh process (nothing cached in memory) still honours the pause.
+        with mock.patch.dict(outbox._destinations, clear=True):
+            outbox.register("test", self._handler, concurrency=2, max_attempts=3)
+            self.assertEqual(outbox.drain(["test"]), 0)
+            dispatcher = outbox.Dispatcher()
+            self.assertGreater(dispatcher._next_resume(), 50)
+        self.assertEqual(outbox.drain(["test"], now=time.time() + 61), 2)
+        self.assertEqual(self.received, [{"n": 1}, {"n": 2}])
+
+
+class TestSlackDigest(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict("os.environ", {"SLACK_WEBHOOK_URL": "https://hooks.example/x"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = mock.Mock()
+        self.session.post.return_value = mock.Mock(status_code=200, headers={})
+        patcher = mock.patch.object(slack_notify, "_session", return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _flush(self):
+        later = time.time() + config.SLACK_DIGEST_SECONDS + 1
+        return outbox.drain(["slack_activity"], now=later)
+
+    def test_activities_in_one_window_make_one_message(self):
+        with mock.patch("threading.Thread") as thread:
+            slack_notify.notify_activity("Easton", "call", 2)
+            slack_notify.notify_activity("Marc", "policy", 1, ap_amount=2400, notes="IUL")
+            slack_notify.notify_activity("Easton", "call", 1, notes="voicemail")
+        thread.assert_not_called()
+
+        # Nothing goes out until the window closes.
+        self.assertEqual(outbox.drain(["slack_activity"]), 0)
+        self.assertEqual(self._flush(), 3)
+
+        self.session.post.assert_called_once()
+        text = json.loads(self.session.post.call_args.kwargs["data"])["text"]
+        lines = text.splitlines()
+        self.assertIn("3 entries", lines[0])
+        self.assertIn("*Easton* logged 3x Call", lines[1])
+        self.assertEqual(lines[2], ">_voicemail_")
+        self.assertIn("*Marc* just wrote a policy!", text)
+        self.assertIn("$2,400", text)
+
+    def test_single_activity_reads_as_before(self):
+        slack_notify.notify_activity("Easton", "appointment", 1)
+        self._flush()
+        text = json.loads(self.session.post.call_args.kwargs["data"])["text"]
+        self.assertEqual(text, "📅 *Easton* logged Appointment")
+
+    def test_rate_limit_honors_retry_after(self):
+        self.session.post.return_value = mock.Mock(
+            status_code=429, headers={"Retry-After": "120"})
+        slack_notify.notify_activity("Easton", "call", 1)
+        before = time.time()
+        self._flush()
+
+        with outbox.get_db() as conn:
+            row = conn.execute("SELECT * FROM outbox").fetchone()
+        self.assertEqual((row["status"], row["attempts"]), ("pending", 0))
+        self.assertGreaterEqual(row["available_at"], before + 120)
+        self.assertGreaterEqual(outbox.paused_until("slack_activity"), before + 120)
+
+        self.session.post.reset_mock()
+        self.assertEqual(self._flush(), 0)
+        self.session.post.assert_not_called()
+
+    def test_nothing_queued_without_webhook(self):
+        with mock.patch.dict("os.environ", {"SLACK_WEBHOOK_URL": ""}):
+            slack_notify.notify_activity("Easton", "call", 1)
+        self.assertEqual(outbox.stats(), {})
+
+
+class TestSlackSession(unittest.TestCase):
+
+    def test_session_is_reused_per_thread(self):
+        first = slack_notify._session()
+        self.assertIs(slack_notify._session(), first)
+        other = []
+        t = threading.Thread(target=lambda: other.append(slack_notify._session()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests for push reminder targeting and fan-out."""
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import config
+import outbox
+import push
+from models import calls
+from tests.support import TempDbTestCase
+from timeutil import today
+
+
+class FakeWebPushException(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = mock.Mock(status_code=status_code)
+
+
+class TestFollowUpReminders(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sent = []
+        self.gone = set()
+        self.lock = threading.Lock()
+        for name, value in (
+            ("PUSH_AVAILABLE", True),
+            ("webpush", self._fake_webpush),
+            ("WebPushException", FakeWebPushException),
+        ):
+            patcher = mock.patch.object(push, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(config, "VAPID_PRIVATE_KEY", "test-key")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        due = today().isoformat()
+        for agent, contact in (("Easton", "Amy"), ("Easton", "Ben"), ("Marc", "Cy")):
+            calls.log_call(agent, contact, "555-0100", "2026-01-05 10:00",
+                           "Outbound", "Callback", follow_up_date=due)
+
+    def _fake_webpush(self, subscription_info, data, timeout=None, **kwargs):
+        endpoint = subscription_info["endpoint"]
+        with self.lock:
+            self.sent.append((endpoint, data, timeout))
+        if endpoint in self.gone:
+            raise FakeWebPushException(410)
+
+    def _subscribe(self, agent, endpoint):
+        push.save_subscription(agent, {"endpoint": endpoint, "keys": {}})
+
+    def _bodies(self):
+        return {endpoint: json.loads(data) for endpoint, data, _ in self.sent}
+
+    def test_each_agent_gets_their_own_follow_ups(self):
+        self._subscribe("Easton", "https://push/easton")
+        self._subscribe("Marc", "https://push/marc")
+        self._subscribe("", "https://push/team")
+        self._subscribe("Nobody", "https://push/idle")
+
+        stats = push.send_follow_up_reminders()
+        self.assertEqual(self.sent, [])  # queued, not sent inline
+        self.assertEqual(outbox.drain(), 3)
+
+        bodies = self._bodies()
+        self.assertEqual(bodies["https://push/easton"]["title"], "2 Follow-ups Due Today")
+        self.assertEqual(bodies["https://push/easton"]["body"], "Amy, Ben")
+        self.assertEqual(bodies["https://push/marc"]["body"], "Cy")
+        self.assertEqual(bodies["https://push/team"]["title"], "3 Follow-ups Due Today")
+        self.assertNotIn("https://push/idle", bodies)
+        self.assertEqual(stats["queued"], 3)
+        self.assertEqual(outbox.stats()["push"]["sent"], 3)
+        self.assertTrue(all(t == config.PUSH_TIMEOUT_SECONDS for _, _, t in self.sent))
+
+    def _drain(self):
+        # Stands in for the dispatcher thread, past the window of any prune
+        # queued while it runs.
+        return outbox.drain(now=time.time() + 2 * push.PRUNE_WINDOW_SECONDS)
+
+    def _report(self, run_id):
+        report = push.run_report(run_id)
+        return {k: report[k] for k in ("queued", "sent", "failed", "pruned", "pending")}
+
+    def test_gone_endpoints_pruned_together(self):
+        for i in range(4):
+            self._subscribe("Easton", f"https://push/{i}")
+        self.gone = {"https://push/1", "https://push/3"}
+
+        with mock.patch.object(push, "remove_subscriptions",
+                               wraps=push.remove_subscriptions) as prune:
+            stats = push.send_follow_up_reminders()
+            self._drain()
+
+        # A gone endpoint counts as handled: pruned in one batch, not retried.
+        prune.assert_called_once()
+        self.assertEqual(sorted(prune.call_args.args[0]), ["https://push/1", "https://push/3"])
+        remaining = {s["endpoint"] for s in push.get_all_subscriptions()}
+        self.assertEqual(remaining, {"https://push/0", "https://push/2"})
+        self.assertEqual(self._report(stats["run"]),
+                         {"queued": 4, "sent": 2, "failed": 0, "pruned": 2, "pending": 0})
+
+    def test_run_reports_failures_and_pending(self):
+        self._subscribe("Easton", "https://push/ok")
+        self._subscribe("Easton", "https://push/broken")
+        self._subscribe("Easton", "https://push/flaky")
+        real = self._fake_webpush
+
+        def webpush(subscription_info, data, timeout=None, **kwargs):
+            endpoint = subscription_info["endpoint"]
+            if endpoint == "https://push/broken":
+                raise outbox.PermanentError("bad keys")
+            if endpoint == "https://push/flaky":
+                raise FakeWebPushException(503)
+            return real(subscription_info, data, timeout)
+
+        with mock.patch.object(push, "webpush", webpush):
+            stats = push.send_follow_up_reminders()
+            self.assertEqual(self._report(stats["run"])["pending"], 3)
+            self._drain()
+        self.assertEqual(self._report(stats["run"]),
+                         {"queued": 3, "sent": 1, "failed": 1, "pruned": 0, "pending": 1})
+
+    def test_report_covers_only_its_own_run(self):
+        self._subscribe("Easton", "https://push/easton")
+        first = push.send_follow_up_reminders()
+        self._drain()
+        # Unrelated push traffic and a second run don't leak into the first.
+        outbox.enqueue("push", {"subscription": {"endpoint": "https://push/other"},
+                                "payload": "{}"})
+        second = push.send_follow_up_reminders()
+        self.assertNotEqual(first["run"], second["run"])
+        self._drain()
+        self.assertEqual(self._report(first["run"]),
+                         {"queued": 1, "sent": 1, "failed": 0, "pruned": 0, "pending": 0})
+        self.assertEqual(self._report(second["run"])["sent"], 1)
+        self.assertIsNone(push.run_report("missing"))
+
+    def test_disabled_without_vapid_key(self):
+        self._subscribe("Easton", "https://push/easton")
+        with mock.patch.object(config, "VAPID_PRIVATE_KEY", ""):
+            stats = push.send_follow_up_reminders()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(outbox.drain(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+"""Tests for models.referrals stats and migrations."""
+
+import os
+import sqlite3
+import time
+import unittest
+from unittest import mock
+
+import config
+import db
+from models import referrals
+from tests.support import TempDbTestCase
+
+
+class TestStats(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for referrer, referred, status in (
+            ("Bob", "Amy", "Sold"), ("Bob", "Cal", "Lost"), ("Bob", "Dee", "New"),
+            ("Ann", "Eve", "Sold"), ("Ann", "Fay", "Quoted"), ("Zed", "Gus", "New"),
+        ):
+            row_id = referrals.add_referral(referrer, referred)
+            if status != "New":
+                referrals.update_status(row_id, status)
+
+    def test_single_pass_stats(self):
+        statements = []
+        with referrals._get_conn() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                stats = referrals.get_stats()
+            finally:
+                conn.set_trace_callback(None)
+        self.assertEqual(len([s for s in statements if s.startswith("SELECT")]), 2)
+        self.assertEqual((stats["total"], stats["sold"], stats["lost"]), (6, 2, 1))
+        self.assertAlmostEqual(stats["conversion_pct"], 2 / 6 * 100)
+        self.assertAlmostEqual(stats["close_rate_pct"], 2 / 3 * 100)
+        self.assertEqual(stats["top_referrers"], [("Bob", 3), ("Ann", 2), ("Zed", 1)])
+        self.assertEqual(stats["thankyou_list"], [("Ann", "Eve"), ("Bob", "Amy")])
+
+    def test_stats_queries_use_indexes(self):
+        statements = []
+        with referrals._get_conn() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                referrals._collect_stats()
+            finally:
+                conn.set_trace_callback(None)
+            for sql in statements:
+                plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                self.assertTrue(any("COVERING INDEX idx_referrals_referrer_status" in d
+                                    or "INDEX idx_referrals_status_updated" in d
+                                    for d in plan), plan)
+
+    def test_cache_is_cleared_on_write(self):
+        first = referrals.get_stats()
+        with mock.patch.object(referrals, "_collect_stats") as collect:
+            self.assertIs(referrals.get_stats(), first)
+            collect.assert_not_called()
+        referrals.add_referral("Zed", "Hal")
+        self.assertEqual(referrals.get_stats()["total"], 7)
+        with mock.patch.object(referrals, "STATS_TTL_SECONDS", 0):
+            self.assertIsNot(referrals.get_stats(), referrals.get_stats())
+
+    def test_referrer_names_are_cached_until_a_write(self):
+        self.assertEqual(referrals.get_referrer_names(), ["Ann", "Bob", "Zed"])
+        with mock.patch.object(referrals, "_collect_referrer_names") as collect:
+            self.assertEqual(referrals.get_referrer_names(), ["Ann", "Bob", "Zed"])
+            collect.assert_not_called()
+        referrals.add_referral("Cat", "Hal")
+        self.assertEqual(referrals.get_referrer_names(), ["Ann", "Bob", "Cat", "Zed"])
+
+    def test_cache_is_per_database(self):
+        self.assertEqual(referrals.get_stats()["total"], 6)
+        with mock.patch.object(config, "REFERRALS_DB_PATH", self.tmp_path / "other.db"):
+            self.assertEqual(referrals.get_stats()["total"], 0)
+
+
+class TestBoard(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with referrals._get_conn() as conn:
+            conn.executemany(
+                "INSERT INTO referrals (referrer_name, referred_name, date_added, status, "
+                "updated_at) VALUES (?, ?, ?, ?, ?)",
+                [("Bob" if i % 3 else "Ann", f"R{i}", f"2026-03-{i % 28 + 1:02d}",
+                  "Sold" if i % 4 == 0 else "New", "2026-03-01T00:00:00")
+                 for i in range(60)],
+            )
+            conn.commit()
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = referrals.get_referrals_page(cursor=cursor, limit=7, referrer="Bob")
+            seen.extend(r["id"] for r in rows)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 40)
+        self.assertEqual(len(set(seen)), 40)
+        all_rows, _ = referrals.get_referrals_page(limit=100, referrer="Bob")
+        self.assertEqual(seen, [r["id"] for r in all_rows])
+
+    def test_filters_and_facets(self):
+        rows, _ = referrals.get_referrals_page(
+            limit=100, status="Sold", date_from="2026-03-01", date_to="2026-03-10")
+        self.assertTrue(rows)
+        self.assertTrue(all(r["status"] == "Sold" and r["date_added"] <= "2026-03-10"
+                            for r in rows))
+        counts = referrals.get_status_counts(status="Sold", referrer="Ann")
+        self.assertEqual(counts["Sold"] + counts["New"], 20)
+        self.assertEqual(counts["Lost"], 0)
+
+    def test_page_queries_use_indexes(self):
+        statements = []
+        with referrals._get_conn() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                referrals.get_referrals_page(status="New")
+                referrals.get_referrals_page(referrer="Ann", cursor="2026-03-05|9")
+                referrals.get_referrals_page()
+            finally:
+                conn.set_trace_callback(None)
+            for sql in statements:
+                plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                self.assertFalse(any(d.startswith("SCAN referrals") and "INDEX" not in d
+                                     for d in plan), plan)
+                self.assertFalse(any("TEMP B-TREE" in d for d in plan), plan)
+
+    def test_board_route(self):
+        from app import app
+        client = app.test_client()
+        resp = client.get("/referrals/?status=Sold&referrer=Ann&date_from=nope")
+        self.assertEqual(resp.status_code, 200)
+        page = resp.get_data(as_text=True)
+        self.assertIn("R0", page)
+        self.assertNotIn("R1<", page)
+        resp = client.get("/referrals/")
+        self.assertIn("Older", resp.get_data(as_text=True))
+
+
+def _change(uuid, updated_at, **fields):
+    return {"uuid": uuid, "deleted": False, "referrer_name": "Bob", "referred_name": "Amy",
+            "referred_phone": "714-335-1412", "referred_email": "", "date_added": "2026-03-01",
+            "status": "New", "notes": "", "premium_sold": "", "updated_at": updated_at,
+            **fields}
+
+
+class TestSync(TempDbTestCase):
+
+    def test_changes_follow_the_sync_sequence(self):
+        a = referrals.add_referral("Bob", "Amy")
+        b = referrals.add_referral("Bob", "Cal")
+        changes, mark, more = referrals.get_changes(0)
+        self.assertEqual([c["referred_name"] for c in changes], ["Amy", "Cal"])
+        self.assertFalse(more)
+
+        referrals.update_status(a, "Sold")
+        referrals.delete_referral(b)
+        changes, mark2, _ = referrals.get_changes(mark)
+        self.assertEqual([(c["deleted"], c.get("status")) for c in changes],
+                         [(False, "Sold"), (True, None)])
+        self.assertEqual(referrals.get_changes(mark2)[0], [])
+        page, _, more = referrals.get_changes(0, limit=1)
+        self.assertEqual(len(page), 1)
+        self.assertTrue(more)
+
+    def test_last_writer_wins(self):
+        self.assertEqual(referrals.apply_changes([_change("u1", "2026-03-01T10:00:00")]), (1, 0))
+        row = referrals.get_all_referrals()[0]
+        self.assertEqual(row["referred_phone_e164"], "+17143351412")
+
+        stale = _change("u1", "2026-03-01T09:00:00", status="Lost")
+        newer = _change("u1", "2026-03-01T11:00:00", status="Quoted")
+        self.assertEqual(referrals.apply_changes([stale, newer, newer]), (1, 2))
+        self.assertEqual(referrals.get_all_referrals()[0]["status"], "Quoted")
+
+        delete = {"uuid": "u1", "deleted": True, "updated_at": "2026-03-01T12:00:00"}
+        self.assertEqual(referrals.apply_changes([delete, newer]), (1, 1))
+        self.assertEqual(referrals.get_all_referrals(), [])
+        referrals.apply_changes([_change("u1", "2026-03-02T00:00:00")])
+        self.assertEqual(len(referrals.get_all_referrals()), 1)
+
+    def test_local_stamps_are_moved_to_utc(self):
+        # Host clock in Chicago (UTC-6 in March) when the old rows were written.
+        patcher = mock.patch.dict(os.environ, {"TZ": "America/Chicago"})
+        patcher.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patcher.stop)
+        time.tzset()
+
+        db.close_all()
+        legacy = sqlite3.connect(str(config.REFERRALS_DB_PATH))
+        legacy.row_factory = sqlite3.Row
+        db.apply_migrations(legacy, referrals.MIGRATIONS[:5])
+        legacy.executemany(
+            "INSERT INTO referrals (uuid, referrer_name, referred_name, date_added, "
+            "status, updated_at) VALUES (?, 'Bob', ?, '2026-03-01', 'Sold', ?)",
+            [("local", "Amy", "2026-03-01T10:00:00.123456"),              # 16:00 UTC
+             ("utc", "Cal", "2026-03-01T15:00:00.000000+00:00")],
+        )
+        legacy.commit()
+        seqs = dict(legacy.execute("SELECT uuid, sync_seq FROM referrals").fetchall())
+        legacy.close()
+
+        rows = {r["uuid"]: r for r in referrals.get_all_referrals()}
+        self.assertEqual(rows["local"]["updated_at"], "2026-03-01T16:00:00.123456+00:00")
+        self.assertEqual(rows["utc"]["updated_at"], "2026-03-01T15:00:00.000000+00:00")
+        self.assertEqual({u: r["sync_seq"] for u, r in rows.items()}, seqs)
+        # Newest sale first, and an edit made in between loses to Amy's row.
+        self.assertEqual(referrals.get_stats()["thankyou_list"], [("Bob", "Amy"), ("Bob", "Cal")])
+        between = _change("local", "2026-03-01T15:30:00+00:00", status="Lost")
+        self.assertEqual(referrals.apply_changes([between]), (0, 1))
+        # Other offsets compare by the instant they name, and are stored as UTC.
+        later = _change("local", "2026-03-01T11:00:00-06:00", status="Quoted")
+        self.assertEqual(referrals.apply_changes([later]), (1, 0))
+        row = {r["uuid"]: r for r in referrals.get_all_referrals()}["local"]
+        self.assertEqual((row["status"], row["updated_at"]),
+                         ("Quoted", "2026-03-01T17:00:00.000000+00:00"))
+
+    def test_pull_reads_are_indexed(self):
+        referrals.add_referral("Bob", "Amy")
+        statements = []
+        with referrals._get_conn() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                referrals.get_changes(0)
+            finally:
+                conn.set_trace_callback(None)
+            plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + statements[-1])]
+        self.assertTrue(any("idx_referrals_sync_seq" in d for d in plan), plan)
+        self.assertTrue(any("idx_referral_tombstones_seq" in d for d in plan), plan)
+
+    def test_sync_route(self):
+        from app import app
+        client = app.test_client()
+        referrals.add_referral("Ann", "Eve")
+        body = {"since": 0, "changes": [_change("u1", "2026-03-01T10:00:00")]}
+        self.assertEqual(client.post("/referrals/sync", json=body).status_code, 404)
+        with mock.patch.object(config, "REFERRAL_SYNC_TOKEN", "s3cret"):
+            bad = client.post("/referrals/sync", json=body,
+                              headers={"Authorization": "Bearer nope"})
+            self.assertEqual(bad.status_code, 401)
+            resp = client.post("/referrals/sync", json=body,
+                               headers={"Authorization": "Bearer s3cret"})
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_json()
+            self.assertEqual((data["applied"], data["more"]), (1, False))
+            self.assertEqual([c["referred_name"] for c in data["changes"]], ["Eve", "Amy"])
+            again = client.post("/referrals/sync", headers={"Authorization": "Bearer s3cret"},
+                                json={"since": data["watermark"], "changes": []}).get_json()
+            self.assertEqual(again["changes"], [])
+            self.assertEqual(
+                client.post("/referrals/sync", json={"since": "x"},
+                            headers={"Authorization": "Bearer s3cret"}).status_code, 400)
+            for change in ({**_change("u2", "2026-03-01T10:00:00"), "updated_at": 5},
+                           {**_change("u2", "2026-03-01T10:00:00"), "uuid": ["u2"]},
+                           {**_change("u2", "2026-03-01T10:00:00"), "notes": {"a": 1}},
+                           "u2"):
+                self.assertEqual(
+                    client.post("/referrals/sync", json={"since": 0, "changes": [change]},
+                                headers={"Authorization": "Bearer s3cret"}).status_code,
+                    400, change)
+            self.assertEqual(
+                client.post("/referrals/sync", json=body,
+                            headers={"Authorization": "Bearer s\u00e9cret"}).status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,585 @@
+"""Tests for models.scoreboard queries and migrations."""
+
+import sqlite3
+import unittest
+from datetime import date, datetime, timedelta
+
+import config
+import db
+import timeutil
+from models import archive, calls, scoreboard
+from tests.support import TempDbTestCase
+
+
+def _insert(agent, activity_type, logged_at, count=1, ap_amount=0.0):
+    with scoreboard._get_db() as conn:
+        conn.execute(
+            "INSERT INTO activities (agent_name, activity_type, count, ap_amount, logged_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (agent, activity_type, count, ap_amount, logged_at),
+        )
+        conn.commit()
+
+
+class TestLeaderboard(TempDbTestCase):
+
+    def test_period_bounds_are_whole_days(self):
+        today = timeutil.today()
+        yesterday = today - timedelta(days=1)
+        _insert("Easton", "appointment", f"{today} 00:00:00", count=2)
+        _insert("Easton", "appointment", f"{today} 23:59:59", count=3)
+        _insert("Easton", "appointment", f"{yesterday} 23:59:59", count=7)
+        _insert("Easton", "policy", f"{today} 12:00:00", ap_amount=900)
+        board = scoreboard.get_leaderboard("today")
+        self.assertEqual(board["Easton"]["appointments"], 5)
+        self.assertEqual(board["Easton"]["ap"], 900)
+        self.assertEqual(scoreboard.get_leaderboard("alltime")["Easton"]["appointments"], 12)
+
+    def test_leaderboard_query_is_covered_by_index(self):
+        scoreboard.init_db()
+        statements = []
+        with scoreboard._get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                scoreboard.get_leaderboard("week")
+            finally:
+                conn.set_trace_callback(None)
+            sql = next(s for s in statements if "FROM activities" in s)
+            with scoreboard._calls_attached(conn):
+                plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        self.assertTrue(any(
+            d.startswith("SEARCH activities USING COVERING INDEX idx_activities_logged")
+            for d in plan
+        ), plan)
+
+    def test_existing_database_gets_the_index(self):
+        legacy = sqlite3.connect(str(config.SCOREBOARD_DB_PATH))
+        legacy.execute("""
+            CREATE TABLE activities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                agent_name TEXT NOT NULL,
+                activity_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 1,
+                ap_amount REAL NOT NULL DEFAULT 0,
+                notes TEXT DEFAULT '',
+                logged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        legacy.execute(
+            "INSERT INTO activities (agent_name, activity_type, logged_at) "
+            "VALUES ('Easton', 'appointment', ?)", (f"{timeutil.today()} 09:00:00",),
+        )
+        legacy.commit()
+        legacy.close()
+
+        self.assertEqual(scoreboard.get_leaderboard("today")["Easton"]["appointments"], 1)
+        with scoreboard._get_db() as conn:
+            self.assertEqual(db.schema_version(conn), len(scoreboard.MIGRATIONS))
+            indexes = {r["name"] for r in conn.execute("PRAGMA index_list(activities)")}
+        self.assertIn("idx_activities_logged", indexes)
+
+
+class TestSnapshot(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        today = timeutil.today()
+        _insert("Easton", "appointment", f"{today} 09:00:00", count=4)
+        _insert("Easton", "policy", f"{today} 10:00:00", ap_amount=1000)
+        _insert("Blake", "policy", f"{today.replace(day=1)} 00:00:00", ap_amount=3000)
+        _insert("Blake", "appointment", "2001-05-01 09:00:00", count=50)
+        _insert("Nobody", "appointment", f"{today} 09:00:00", count=99)
+
+    def test_matches_single_period_boards(self):
+        snapshot = scoreboard.get_snapshot()
+        for period in scoreboard.PERIODS:
+            self.assertEqual(snapshot.board(period), scoreboard.get_leaderboard(period))
+        self.assertEqual(snapshot.board("today")["Easton"]["appointments"], 4)
+        self.assertEqual(snapshot.board("alltime")["Blake"]["appointments"], 50)
+        self.assertEqual(snapshot.agent_totals("Blake", "month")["ap"], 3000)
+        self.assertNotIn("Nobody", snapshot.board("today"))
+        self.assertEqual([r["agent"] for r in snapshot.ranked("appointments", "alltime")],
+                         ["Blake", "Easton"])
+
+    def test_scoreboard_page_reads_activities_once(self):
+        from app import app
+        statements = []
+        with scoreboard._get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                resp = app.test_client().get("/scoreboard?period=today&metric=ap")
+            finally:
+                conn.set_trace_callback(None)
+        self.assertEqual(resp.status_code, 200)
+        grouped = [s for s in statements
+                   if "GROUP BY agent_name" in s and "activities_monthly" not in s]
+        self.assertEqual(len(grouped), 1)
+
+
+class TestMilestones(TempDbTestCase):
+
+    def test_bulk_count_crosses_milestone(self):
+        for _ in range(22):
+            scoreboard.log_activity("Easton", "appointment")
+        # 22 -> 27 skips past 25 without ever equalling it.
+        _, milestone = scoreboard.record_activity("Easton", "appointment", count=5)
+        self.assertEqual(milestone, 25)
+        _, milestone = scoreboard.record_activity("Easton", "appointment", count=2)
+        self.assertIsNone(milestone)
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "appointment"), 29)
+
+    def test_highest_crossed_milestone_wins(self):
+        _, milestone = scoreboard.record_activity("Blake", "policy", count=12)
+        self.assertEqual(milestone, 10)
+        self.assertEqual(scoreboard.check_milestone("Blake", "policy", count=12), 10)
+
+    def test_totals_are_backfilled_and_rebuildable(self):
+        _insert("Easton", "appointment", "2025-01-01 09:00:00", count=4)
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "appointment"), 0)
+        self.assertEqual(scoreboard.rebuild_activity_totals(), 1)
+        _, milestone = scoreboard.record_activity("Easton", "appointment")
+        self.assertEqual(milestone, 5)
+
+    def test_check_is_a_point_read(self):
+        scoreboard.log_activity("Easton", "appointment")
+        with scoreboard._get_db() as conn:
+            plan = [r["detail"] for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT total FROM activity_totals "
+                "WHERE agent_name = 'Easton' AND activity_type = 'appointment'"
+            )]
+        self.assertTrue(all(d.startswith("SEARCH") for d in plan), plan)
+
+
+class TestDailySeries(TempDbTestCase):
+
+    def test_zero_filled_series_from_one_query(self):
+        today = timeutil.today()
+        two_ago = today - timedelta(days=2)
+        _insert("Easton", "appointment", f"{two_ago} 09:00:00", count=3)
+        _insert("Easton", "policy", f"{two_ago} 11:00:00", ap_amount=250)
+        _insert("Easton", "appointment", f"{today} 09:00:00", count=1)
+        statements = []
+        with scoreboard._get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                series = scoreboard.get_daily_series(today - timedelta(days=3), today)
+            finally:
+                conn.set_trace_callback(None)
+        self.assertEqual(len(series["days"]), 4)
+        self.assertEqual(series["agents"]["Easton"]["appointments"], [0, 3, 0, 1])
+        self.assertEqual(series["agents"]["Easton"]["ap"], [0, 250, 0, 0])
+        self.assertEqual(series["agents"]["Blake"]["appointments"], [0, 0, 0, 0])
+        # One query for the past days plus one for today.
+        self.assertEqual(len([s for s in statements if "GROUP BY day" in s]), 2)
+
+    def test_past_days_are_cached_until_the_date_changes(self):
+        today = timeutil.today()
+        yesterday = today - timedelta(days=1)
+        _insert("Blake", "appointment", f"{yesterday} 09:00:00")
+        first = scoreboard.get_daily_series(yesterday, yesterday)
+        _insert("Blake", "appointment", f"{yesterday} 10:00:00")
+        self.assertEqual(scoreboard.get_daily_series(yesterday, yesterday), first)
+        _insert("Blake", "appointment", f"{today} 10:00:00")
+        self.assertEqual(
+            scoreboard.get_daily_series(yesterday, today)["agents"]["Blake"]["appointments"][1], 1
+        )
+
+    def test_cached_days_pick_up_call_log_changes(self):
+        today = timeutil.today()
+        yesterday = today - timedelta(days=1)
+        _insert("Blake", "appointment", f"{yesterday} 09:00:00")
+        self.assertEqual(
+            scoreboard.get_daily_series(yesterday, yesterday)["agents"]["Blake"]["calls"], [0])
+        calls.log_calls_bulk([
+            {"agent_name": "Blake", "contact_name": f"Lead {i}",
+             "phone_number": f"714-555-{i:04d}", "call_datetime": f"{yesterday} 10:0{i}",
+             "direction": "Outbound", "outcome": "No Answer"}
+            for i in range(2)
+        ])
+        series = scoreboard.get_daily_series(yesterday, yesterday)["agents"]["Blake"]
+        self.assertEqual((series["calls"], series["appointments"]), ([2], [1]))
+        with calls.get_db() as conn:
+            call_id = conn.execute("SELECT MIN(id) FROM calls").fetchone()[0]
+        calls.delete_call(call_id)
+        self.assertEqual(
+            scoreboard.get_daily_series(yesterday, yesterday)["agents"]["Blake"]["calls"], [1])
+
+    def test_series_api(self):
+        from app import app
+        client = app.test_client()
+        today = timeutil.today()
+        _insert("Easton", "appointment", f"{today} 09:00:00", count=2)
+        data = client.get("/scoreboard/api/series",
+                          query_string={"agent": "Easton", "metric": "appointments"}).get_json()
+        self.assertEqual(len(data["days"]), 30)
+        self.assertEqual(list(data["agents"]), ["Easton"])
+        self.assertEqual(data["agents"]["Easton"], {"appointments": [0] * 29 + [2]})
+        bad = client.get("/scoreboard/api/series", query_string={"from": "soon"})
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(client.get("/scoreboard/api/series?metric=vibes").status_code, 400)
+
+
+class TestCallLedger(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timeutil.today()
+        self.yesterday = self.today - timedelta(days=1)
+        for when in (f"{self.today} 09:00", f"{self.today} 10:00", f"{self.yesterday} 09:00"):
+            calls.log_call("Easton", "Ann", "714-335-1412", when, "Outbound", "Sale")
+        # A manual entry from before the call log counted; it must not add up.
+        _insert("Easton", "call", f"{self.today} 08:00:00", count=5)
+
+    def test_reads_leave_calls_db_unlocked(self):
+        scoreboard.get_snapshot()
+        scoreboard.get_daily_series(self.yesterday, self.today)
+        with scoreboard._get_db() as conn:
+            schemas = {r["name"] for r in conn.execute("PRAGMA database_list")}
+            self.assertEqual(schemas, {"main"})
+            conn.execute("BEGIN IMMEDIATE")
+            other = sqlite3.connect(config.CALLS_DB_PATH, timeout=0)
+            try:
+                other.execute("BEGIN IMMEDIATE")
+                other.rollback()
+            finally:
+                other.close()
+            conn.rollback()
+
+    def test_logged_calls_are_the_only_source(self):
+        snapshot = scoreboard.get_snapshot()
+        self.assertEqual(snapshot.agent_totals("Easton", "today")["calls"], 2)
+        self.assertEqual(snapshot.agent_totals("Easton", "alltime")["calls"], 3)
+        self.assertEqual(snapshot.agent_totals("Blake", "today")["calls"], 0)
+        self.assertEqual(snapshot.ranked("calls", "today")[0]["agent"], "Easton")
+        with self.assertRaises(ValueError):
+            scoreboard.record_activity("Easton", "call")
+
+    def test_series_includes_logged_calls(self):
+        series = scoreboard.get_daily_series(self.yesterday, self.today)
+        self.assertEqual(series["agents"]["Easton"]["calls"], [1, 2])
+
+    def test_call_milestones_follow_the_call_log(self):
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "call"), 3)
+        for i in range(21):
+            calls.log_call("Easton", f"Lead {i}", f"714-555-{i:04d}",
+                           f"{self.yesterday} 12:{i:02d}", "Outbound", "No Answer")
+        _, total = calls.record_call("Easton", "Lead", "714-555-9999",
+                                     f"{self.yesterday} 13:00", "Outbound", "No Answer")
+        # 25 logged calls: the call that made it 25 crossed the milestone.
+        self.assertEqual(total, 25)
+        self.assertEqual(scoreboard.call_milestone("Easton", total), 25)
+        self.assertIsNone(scoreboard.call_milestone("Blake", 1))
+        with calls.get_db() as conn:
+            plan = [r["detail"] for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT SUM(count) FROM calls_daily WHERE agent_name = 'Easton'"
+            )]
+        self.assertTrue(any("idx_calls_daily_agent" in d for d in plan), plan)
+
+    def test_concurrent_calls_claim_a_milestone_once(self):
+        import threading
+        for i in range(18):
+            calls.log_call("Easton", f"Lead {i}", f"714-555-{i:04d}",
+                           f"{self.yesterday} 12:{i:02d}", "Outbound", "No Answer")
+        milestones, start = [], threading.Barrier(8)
+
+        def log(i):
+            start.wait()
+            _, total = calls.record_call("Easton", f"Rush {i}", f"949-555-{i:04d}",
+                                         f"{self.today} 12:{i:02d}", "Outbound", "Sale")
+            milestones.append(scoreboard.call_milestone("Easton", total))
+
+        threads = [threading.Thread(target=log, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(m for m in milestones if m), [25])
+
+    def test_log_route_announces_call_milestones(self):
+        from unittest import mock
+        from app import app
+        for i in range(21):
+            calls.log_call("Easton", f"Lead {i}", f"714-555-{i:04d}",
+                           f"{self.yesterday} 12:{i:02d}", "Outbound", "No Answer")
+        client = app.test_client()
+        client.set_cookie("agent_pref", "Easton")
+        with mock.patch("blueprints.calls.notify_milestone") as notify:
+            client.post("/log", data={
+                "contact_name": "Zed", "phone_number": "714-555-9999",
+                "call_datetime": f"{self.today} 12:00", "outcome": "Sale",
+            })
+        notify.assert_called_once_with("Easton", "call", 25)
+
+    def test_rollup_read_is_indexed(self):
+        statements = []
+        with scoreboard._get_db() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                scoreboard.get_leaderboard("week")
+            finally:
+                conn.set_trace_callback(None)
+            sql = next(s for s in statements if "calls_daily" in s)
+            with scoreboard._calls_attached(conn):
+                plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        self.assertTrue(any(d.startswith("SEARCH calls_db.calls_daily") for d in plan), plan)
+        self.assertTrue(any(d.startswith("SEARCH legacy_calls") for d in plan), plan)
+        # Only the merged subquery is walked; no table is scanned.
+        self.assertFalse(any(d.startswith("SCAN") and "subquery" not in d for d in plan), plan)
+
+    def test_legacy_manual_calls_still_count(self):
+        db.close_all()
+        config.SCOREBOARD_DB_PATH.unlink()
+        legacy = sqlite3.connect(str(config.SCOREBOARD_DB_PATH))
+        legacy.execute("""
+            CREATE TABLE activities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                agent_name TEXT NOT NULL,
+                activity_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 1,
+                ap_amount REAL NOT NULL DEFAULT 0,
+                notes TEXT DEFAULT '',
+                logged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        legacy.executemany(
+            "INSERT INTO activities (agent_name, activity_type, count, logged_at) "
+            "VALUES ('Easton', 'call', ?, ?)",
+            [(4, f"{self.yesterday} 15:00:00"), (20, "2024-01-10 09:00:00")],
+        )
+        legacy.commit()
+        legacy.close()
+
+        # Entered before the cutover: counted alongside the call log.
+        snapshot = scoreboard.get_snapshot()
+        self.assertEqual(snapshot.agent_totals("Easton", "today")["calls"], 2)
+        self.assertEqual(snapshot.agent_totals("Easton", "alltime")["calls"], 27)
+        series = scoreboard.get_daily_series(self.yesterday, self.today)
+        self.assertEqual(series["agents"]["Easton"]["calls"], [5, 2])
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "call"), 27)
+
+    def test_broker_pushes_board_when_calls_change(self):
+        import threading
+        from live_scoreboard import ScoreboardBroker, Subscriber
+        broker = ScoreboardBroker()
+        broker.poll()
+        sub = Subscriber()
+        broker._subscribers.add(sub)
+        self.assertEqual(broker.poll(), 0)
+        self.assertTrue(sub.queue.empty())
+
+        # A request thread has its own connection, as in the app.
+        writer = threading.Thread(target=calls.log_call, args=(
+            "Blake", "Bo", "714-555-0000", f"{self.today} 11:00", "Outbound", "Sale"))
+        writer.start()
+        writer.join()
+        self.assertEqual(broker.poll(), 0)
+        event, delta = sub.queue.get_nowait()
+        self.assertEqual(event, "board")
+        self.assertEqual(delta["today"]["totals"]["Blake"]["calls"], 1)
+
+
+class TestAgencyClock(TempDbTestCase):
+
+    def test_today_follows_the_agency_not_the_host(self):
+        from unittest import mock
+        # The agency is already a day ahead of the host (e.g. a UTC server
+        # during an evening in the agency's timezone).
+        agency_now = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        agency_now = agency_now.replace(hour=9)
+        with mock.patch.object(timeutil, "now", return_value=agency_now):
+            calls.log_call("Easton", "Ann", "714-335-1412",
+                           agency_now.strftime("%Y-%m-%d %H:%M"), "Outbound", "Sale")
+            scoreboard.log_activity("Easton", "appointment")
+            self.assertEqual(calls.get_stats().today_count, 1)
+            snapshot = scoreboard.get_snapshot()
+            series = scoreboard.get_daily_series(agency_now.date(), agency_now.date())
+        self.assertEqual(snapshot.agent_totals("Easton", "today")["calls"], 1)
+        self.assertEqual(snapshot.agent_totals("Easton", "today")["appointments"], 1)
+        self.assertEqual(series["agents"]["Easton"]["calls"], [1])
+
+
+class TestArchive(TempDbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timeutil.today()
+        self.before = archive.horizon(self.today, after_days=90)
+        old = self.before - timedelta(days=40)
+        self.old_day = old
+        _insert("Easton", "policy", f"{old} 10:00:00", ap_amount=1200)
+        _insert("Easton", "appointment", f"{old} 11:00:00", count=20)
+        _insert("Blake", "appointment", f"{self.before - timedelta(days=1)} 23:59:59", count=4)
+        _insert("Easton", "appointment", f"{self.before} 00:00:00", count=3)
+        _insert("Easton", "appointment", f"{self.today} 09:00:00", count=2)
+        scoreboard.rebuild_activity_totals()
+
+    def test_horizon_is_a_month_start(self):
+        self.assertEqual(self.before.day, 1)
+        self.assertLessEqual(self.before, self.today - timedelta(days=90))
+        # Too short a horizon is stretched so current boards stay hot.
+        self.assertLess(archive.horizon(self.today, after_days=0),
+                        self.today.replace(day=1))
+
+    def test_moves_old_rows_and_keeps_all_time_totals(self):
+        alltime = scoreboard.get_leaderboard("alltime")
+        self.assertEqual(scoreboard.archive_activities(self.before), 3)
+        self.assertEqual(scoreboard.archive_activities(self.before), 0)
+
+        with scoreboard._get_db() as conn:
+            hot = conn.execute("SELECT MIN(logged_at) FROM activities").fetchone()[0]
+        self.assertEqual(hot, f"{self.before} 00:00:00")
+        with archive.get_db() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0], 3)
+
+        self.assertEqual(scoreboard.get_leaderboard("alltime"), alltime)
+        self.assertEqual(scoreboard.get_leaderboard("alltime")["Easton"]["appointments"], 25)
+        self.assertEqual(scoreboard.get_leaderboard("alltime")["Easton"]["ap"], 1200)
+        self.assertEqual(scoreboard.get_leaderboard("today")["Easton"]["appointments"], 2)
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "appointment"), 25)
+        scoreboard.rebuild_activity_totals()
+        self.assertEqual(scoreboard.get_all_time_totals("Easton", "appointment"), 25)
+
+    def test_series_reads_archived_days(self):
+        scoreboard.archive_activities(self.before)
+        series = scoreboard.get_daily_series(self.old_day, self.old_day)
+        self.assertEqual(series["agents"]["Easton"]["appointments"], [20])
+        self.assertEqual(series["agents"]["Easton"]["ap"], [1200])
+
+    def test_maintenance_command(self):
+        import maintenance
+        maintenance.main(["archive", "--days", "90"])
+        self.assertEqual(scoreboard.get_leaderboard("alltime")["Blake"]["appointments"], 4)
+        with scoreboard._get_db() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0], 2)
+
+
+class TestForecast(TempDbTestCase):
+
+    def test_projects_month_end_on_working_days(self):
+        import forecast
+        from unittest import mock
+        _insert("Easton", "policy", "2026-03-05 10:00:00", ap_amount=1000)
+        _insert("Easton", "policy", "2026-03-09 10:00:00", ap_amount=500)
+        _insert("Easton", "policy", "2026-02-27 10:00:00", ap_amount=9999)
+        settings = {"COMMISSION_FIRST_YEAR_PCT": 100, "COMMISSION_RENEWAL_PCT": 5,
+                    "COMMISSION_RENEWAL_YEARS": 9, "COMMISSION_MONTHLY_GOAL": 10000}
+        with mock.patch.multiple(config, **settings):
+            # Wed 11 March 2026, noon: 7.5 of 22 working days have passed.
+            result = forecast.forecast_month(datetime(2026, 3, 11, 12, 0))
+        easton = result["Easton"]
+        self.assertEqual(easton.mtd_ap, 1500)
+        self.assertAlmostEqual(easton.projected_ap, 1500 * 22 / 7.5)
+        self.assertAlmostEqual(easton.projected_renewals, easton.projected_ap * 0.45)
+        self.assertAlmostEqual(easton.goal_pct, 44.0)
+        self.assertFalse(easton.on_pace)
+        self.assertEqual(result["Blake"].projected_ap, 0)
+
+    def test_first_of_month_does_not_blow_up(self):
+        import forecast
+        _insert("Blake", "policy", "2026-06-01 08:00:00", ap_amount=2000)
+        blake = forecast.forecast_month(datetime(2026, 6, 1, 9, 0))["Blake"]
+        # At least one working day counts as elapsed (22 in June 2026).
+        self.assertAlmostEqual(blake.projected_ap, 2000 * 22)
+
+
+class TestLiveStream(TempDbTestCase):
+
+    def test_brokers_follow_activities_across_workers(self):
+        from live_scoreboard import ScoreboardBroker, Subscriber
+        # Two brokers stand in for two gunicorn workers sharing scoreboard.db.
+        # Subscribers are attached directly so no background thread polls.
+        a, b = ScoreboardBroker(), ScoreboardBroker()
+        subs = []
+        for broker in (a, b):
+            broker.poll()
+            sub = Subscriber()
+            broker._subscribers.add(sub)
+            subs.append(sub)
+        scoreboard.log_activity("Blake", "policy", ap_amount=500)
+        self.assertEqual((a.poll(), b.poll()), (1, 1))
+        for sub in subs:
+            event, row = sub.queue.get_nowait()
+            self.assertEqual((event, row["agent_name"]), ("activity", "Blake"))
+            event, delta = sub.queue.get_nowait()
+            self.assertEqual(event, "board")
+            self.assertEqual(delta["today"]["totals"]["Blake"]["ap"], 500)
+            self.assertEqual(delta["today"]["ranks"]["ap"][0], "Blake")
+        self.assertEqual(a.poll(), 0)
+
+    def test_poll_racing_a_reset_keeps_the_new_cursor(self):
+        from unittest import mock
+        from live_scoreboard import ScoreboardBroker, Subscriber
+        broker = ScoreboardBroker()
+        broker.poll()
+        old = scoreboard.log_activity("Blake", "appointment")
+        real = scoreboard.get_activities_since
+
+        def racing(after_id, limit):
+            # The thread went idle and a new display reset the cursor while
+            # this poll was reading from the old one.
+            with broker._lock:
+                broker._go_idle()
+                broker._reset()
+            return real(after_id, limit)
+
+        with mock.patch.object(scoreboard, "get_activities_since", racing):
+            self.assertEqual(broker.poll(), 0)
+        self.assertEqual(broker._cursor, old)
+        sub = Subscriber()
+        broker._subscribers.add(sub)
+        new = scoreboard.log_activity("Blake", "appointment")
+        self.assertEqual(broker.poll(), 1)
+        self.assertEqual(sub.queue.get_nowait()[1]["id"], new)
+
+    def test_board_delta_only_reports_changes(self):
+        from live_scoreboard import board_delta
+        before = scoreboard.get_snapshot()
+        self.assertEqual(board_delta(before, scoreboard.get_snapshot()), {})
+        # Blake starts second on the tied board, so the appointment order flips.
+        scoreboard.log_activity("Blake", "appointment", count=3)
+        delta = board_delta(before, scoreboard.get_snapshot())
+        self.assertEqual(list(delta["week"]["totals"]), ["Blake"])
+        self.assertIn("appointments", delta["week"]["ranks"])
+        self.assertNotIn("ap", delta["week"]["ranks"])
+
+    def test_stream_replays_missed_activities(self):
+        from unittest import mock
+        from app import app
+        first = scoreboard.log_activity("Easton", "appointment")
+        scoreboard.log_activity("Easton", "appointment", notes="Smith family")
+        from live_scoreboard import broker
+        with mock.patch("blueprints.scoreboard.STREAM_MAX_SECONDS", 0), \
+                mock.patch.object(broker, "_ensure_thread"):
+            resp = app.test_client().get("/scoreboard/stream",
+                                         headers={"Last-Event-ID": str(first)})
+            body = resp.get_data(as_text=True)
+        self.assertEqual(resp.mimetype, "text/event-stream")
+        self.assertIn(f"id: {first + 1}\nevent: activity\n", body)
+        self.assertIn("Smith family", body)
+        self.assertNotIn(f"id: {first}\n", body)
+
+    def test_stream_turns_displays_away_past_the_limit(self):
+        from unittest import mock
+        from app import app
+        from live_scoreboard import broker
+        client = app.test_client()
+        with mock.patch.object(config, "SCOREBOARD_STREAM_MAX", 1), \
+                mock.patch.object(broker, "_ensure_thread"), \
+                mock.patch.object(broker, "_subscribers", set()):
+            held = broker.subscribe()
+            full = client.get("/scoreboard/stream")
+            self.assertEqual(full.status_code, 503)
+            self.assertEqual(full.headers["Retry-After"], "30")
+            self.assertIn("retry: 30000", full.get_data(as_text=True))
+
+            broker.unsubscribe(held)
+            with mock.patch("blueprints.scoreboard.STREAM_MAX_SECONDS", 0):
+                ok = client.get("/scoreboard/stream")
+                ok.get_data()
+                ok.close()
+            self.assertEqual(ok.status_code, 200)
+            self.assertEqual(broker._subscribers, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Agency-local time helpers.
+
+Agents enter call times as local wall-clock values, while the server (e.g.
+Railway) usually runs in UTC.  Everything that buckets by "today", "this
+week" or a calendar day goes through these helpers so buckets follow the
+agency's timezone (config.TIMEZONE) rather than the host's.
+"""
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import config
+
+TZ = ZoneInfo(config.TIMEZONE)
+
+# Accepted input formats: datetime-local inputs, stored values, and the US
+# formats power dialers export.
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S",
+    "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p", "%m/%d/%Y %H:%M:%S",
+)
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+
+def now() -> datetime:
+    """Current naive wall-clock time in the agency timezone."""
+    return datetime.now(TZ).replace(tzinfo=None)
+
+
+def today() -> date:
+    return now().date()
+
+
+def parse_datetime(value, formats=DATETIME_FORMATS):
+    """Parse a local datetime string, or return None."""
+    for fmt in formats:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(value):
+    dt = parse_datetime(value, DATE_FORMATS)
+    return dt.date() if dt else None
+
+
+def to_epoch(local_dt: datetime) -> int:
+    """Epoch seconds for a naive local wall-clock datetime."""
+    return int(local_dt.replace(tzinfo=TZ).timestamp())
+
+
+def day_start(day) -> int:
+    """Epoch seconds at local midnight starting ``day`` (date or ISO string)."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return to_epoch(datetime.combine(day, time.min))
+
+
+def day_end(day) -> int:
+    """Epoch seconds at local midnight ending ``day`` (exclusive bound)."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day_start(day + timedelta(days=1))
@@ -1,7 +1,5 @@
 """Call Logger – Flask web application."""
 
-from datetime import datetime
-
 from flask import (
     Flask, render_template, request, redirect, url_for, flash, jsonify,
     make_response,
@@ -70,7 +68,7 @@ def inject_theme():
 @app.route("/")
 def index():
     stats = models.get_stats()
-    return render_template("index.html", stats=stats, now=datetime.now())
+    return render_template("index.html", stats=stats, now=models.local_now())
 
 
 # ---------------------------------------------------------------------------
@@ -84,7 +82,7 @@ def log_call():
             contact_name=request.form.get("contact_name", "").strip(),
             phone_number=request.form.get("phone_number", "").strip(),
             call_datetime=request.form.get("call_datetime",
-                                           datetime.now().strftime("%Y-%m-%d %H:%M")),
+                                           models.local_now().strftime("%Y-%m-%d %H:%M")),
             direction=request.form.get("direction", "Outbound"),
             outcome=request.form.get("outcome", "Other"),
             notes=request.form.get("notes", "").strip(),
@@ -111,7 +109,7 @@ def log_call():
         directions=config.DIRECTION_CHOICES,
         outcomes=config.OUTCOME_CHOICES,
         agents=config.AGENT_CHOICES,
-        now=datetime.now(),
+        now=models.local_now(),
     )
 
 
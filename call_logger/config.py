@@ -12,6 +12,9 @@ load_dotenv(PROJECT_ROOT / ".env")
 # Database
 DATABASE_PATH = BASE_DIR / "calls.db"
 
+# Agency timezone: "today" and week ranges follow this, not the host clock.
+TIMEZONE = os.getenv("LIFI_TIMEZONE", "America/Los_Angeles")
+
 # Google Sheets credentials
 # On Railway: reads from GOOGLE_CREDENTIALS_JSON env variable
 # Locally: reads from credentials.json file
@@ -2,10 +2,17 @@
 
 import sqlite3
 from contextlib import contextmanager
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
-from config import DATABASE_PATH
+from config import DATABASE_PATH, TIMEZONE
+
+TZ = ZoneInfo(TIMEZONE)
+
+# Formats the log/edit forms and older rows may use for call_datetime.
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S",
+                    "%Y-%m-%dT%H:%M:%S")
 
 
 @contextmanager
@@ -45,9 +52,76 @@ def init_db():
             pass  # column already exists
         # Migration: normalize call_datetime from 'T' separator to space
         conn.execute("UPDATE calls SET call_datetime = REPLACE(call_datetime, 'T', ' ') WHERE call_datetime LIKE '%T%'")
+        # Migration: epoch + local-day columns for index-friendly ranges
+        for column in ("call_ts INTEGER", "call_day TEXT"):
+            try:
+                conn.execute(f"ALTER TABLE calls ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass  # column already exists
+        missing = conn.execute(
+            "SELECT id, call_datetime, created_at FROM calls WHERE call_ts IS NULL"
+        ).fetchall()
+        backfill, undated = [], 0
+        for r in missing:
+            times = _call_times(r["call_datetime"]) or _call_times(r["created_at"])
+            if times is None:
+                # Keep the row in (call_ts, id) ordering, last, rather than NULL.
+                undated += 1
+                times = (0, None)
+            backfill.append((*times, r["id"]))
+        conn.executemany("UPDATE calls SET call_ts = ?, call_day = ? WHERE id = ?", backfill)
+        if undated:
+            print(f"[Calls] {undated} call(s) have no readable date or created_at; "
+                  f"stored with call_ts 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls (call_ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_agent_ts ON calls (agent_name, call_ts)")
         conn.commit()
 
 
+# ---------------------------------------------------------------------------
+# Time helpers
+# ---------------------------------------------------------------------------
+
+def local_now():
+    """Current wall-clock time in the agency timezone (naive)."""
+    return datetime.now(TZ).replace(tzinfo=None)
+
+
+def _parse(value):
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except (AttributeError, ValueError):
+            continue
+    return None
+
+
+def _epoch(local_dt):
+    return int(local_dt.replace(tzinfo=TZ).timestamp())
+
+
+def _call_times(value):
+    """Return (call_ts, call_day) for a local call_datetime string, or None."""
+    dt = _parse(value)
+    if dt is None:
+        return None
+    return _epoch(dt), dt.strftime("%Y-%m-%d")
+
+
+def _day_start(day, offset=0):
+    """Epoch at local midnight of an ISO date (plus ``offset`` days), or None."""
+    try:
+        day = date.fromisoformat(day) + timedelta(days=offset)
+    except (TypeError, ValueError):
+        return None
+    return _epoch(datetime.combine(day, time.min))
+
+
+def _day_range(date_from, date_to):
+    """Half-open epoch bounds covering whole local days from date_from to date_to."""
+    return _day_start(date_from), _day_start(date_to, offset=1)
+
+
 # ---------------------------------------------------------------------------
 # CRUD operations
 # ---------------------------------------------------------------------------
@@ -56,12 +130,17 @@ def log_call(agent_name, contact_name, phone_number, call_datetime, direction,
              outcome, notes="", follow_up_date=None):
     """Insert a new call record. Returns the new row id."""
     call_datetime = call_datetime.replace("T", " ")
+    times = _call_times(call_datetime)
+    if times is None:
+        call_datetime = local_now().strftime("%Y-%m-%d %H:%M")
+        times = _call_times(call_datetime)
     with get_db() as conn:
         cur = conn.execute(
             """INSERT INTO calls
-               (agent_name, contact_name, phone_number, call_datetime, direction, outcome, notes, follow_up_date)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (agent_name, contact_name, phone_number, call_datetime, direction,
+               (agent_name, contact_name, phone_number, call_datetime, call_ts, call_day,
+                direction, outcome, notes, follow_up_date)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (agent_name, contact_name, phone_number, call_datetime, *times, direction,
              outcome, notes, follow_up_date or None),
         )
         conn.commit()
@@ -77,9 +156,16 @@ def update_call(call_id, **fields):
     updates = {k: v for k, v in fields.items() if k in allowed}
     if not updates:
         return
-    if "call_datetime" in updates and updates["call_datetime"]:
-        updates["call_datetime"] = updates["call_datetime"].replace("T", " ")
-    updates["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if "call_datetime" in updates:
+        times = _call_times(updates["call_datetime"])
+        if times is None:
+            del updates["call_datetime"]  # keep the old time rather than corrupt it
+        else:
+            updates["call_datetime"] = updates["call_datetime"].replace("T", " ")
+            updates["call_ts"], updates["call_day"] = times
+    if not updates:
+        return
+    updates["updated_at"] = local_now().strftime("%Y-%m-%d %H:%M:%S")
     set_clause = ", ".join(f"{k} = ?" for k in updates)
     values = list(updates.values()) + [call_id]
     with get_db() as conn:
@@ -118,15 +204,16 @@ def get_calls(limit=200, offset=0, direction=None, outcome=None,
     if search:
         clauses.append("(contact_name LIKE ? OR phone_number LIKE ?)")
         params.extend([f"%{search}%", f"%{search}%"])
-    if date_from:
-        clauses.append("call_datetime >= ?")
-        params.append(date_from)
-    if date_to:
-        clauses.append("call_datetime <= ?")
-        params.append(date_to + " 23:59:59")
+    start, end = _day_range(date_from, date_to)
+    if start is not None:
+        clauses.append("call_ts >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("call_ts < ?")
+        params.append(end)
 
     where = "WHERE " + " AND ".join(clauses) if clauses else ""
-    query = f"SELECT * FROM calls {where} ORDER BY call_datetime DESC LIMIT ? OFFSET ?"
+    query = f"SELECT * FROM calls {where} ORDER BY call_ts DESC, id DESC LIMIT ? OFFSET ?"
     params.extend([limit, offset])
 
     with get_db() as conn:
@@ -139,7 +226,7 @@ def get_calls(limit=200, offset=0, direction=None, outcome=None,
 
 def _week_bounds():
     """Return (monday_str, friday_str) for the current work week."""
-    today = datetime.now()
+    today = local_now()
     monday = today - timedelta(days=today.weekday())
     friday = monday + timedelta(days=4)
     return monday.strftime("%Y-%m-%d"), friday.strftime("%Y-%m-%d")
@@ -153,31 +240,31 @@ def get_week_calls():
 
 def get_today_calls():
     """Get all calls for today."""
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = local_now().strftime("%Y-%m-%d")
     return get_calls(limit=9999, date_from=today, date_to=today)
 
 
 def get_stats():
     """Return dashboard statistics."""
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = local_now().strftime("%Y-%m-%d")
     mon, fri = _week_bounds()
 
     with get_db() as conn:
         today_count = conn.execute(
-            "SELECT COUNT(*) FROM calls WHERE call_datetime >= ? AND call_datetime <= ?",
-            (today, today + " 23:59:59"),
+            "SELECT COUNT(*) FROM calls WHERE call_ts >= ? AND call_ts < ?",
+            _day_range(today, today),
         ).fetchone()[0]
 
         week_count = conn.execute(
-            "SELECT COUNT(*) FROM calls WHERE call_datetime >= ? AND call_datetime <= ?",
-            (mon, fri + " 23:59:59"),
+            "SELECT COUNT(*) FROM calls WHERE call_ts >= ? AND call_ts < ?",
+            _day_range(mon, fri),
         ).fetchone()[0]
 
         outcomes = conn.execute(
             """SELECT outcome, COUNT(*) as cnt FROM calls
-               WHERE call_datetime >= ? AND call_datetime <= ?
+               WHERE call_ts >= ? AND call_ts < ?
                GROUP BY outcome ORDER BY cnt DESC""",
-            (mon, fri + " 23:59:59"),
+            _day_range(mon, fri),
         ).fetchall()
 
         follow_ups = conn.execute(
@@ -199,7 +286,7 @@ def get_contact_suggestions(query, limit=8):
     """Return distinct contact names/numbers matching a partial query."""
     with get_db() as conn:
         rows = conn.execute(
-            """SELECT contact_name, phone_number, MAX(call_datetime) AS last_call
+            """SELECT contact_name, phone_number, MAX(call_ts) AS last_call
                FROM calls
                WHERE contact_name LIKE ? OR phone_number LIKE ?
                GROUP BY contact_name, phone_number
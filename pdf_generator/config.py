@@ -36,3 +36,9 @@ GHL_WORKFLOW_ID = os.environ.get("GHL_WORKFLOW_ID", "")
 GHL_FILE_CUSTOM_FIELD_ID = os.environ.get("GHL_FILE_CUSTOM_FIELD_ID", "")
 GHL_ENABLED = os.environ.get("GHL_ENABLED", "false").lower() in ("true", "1", "yes")
 GHL_BASE_URL = "https://services.leadconnectorhq.com"
+
+# Referral sync with the web Agent Toolkit (POST /referrals/sync)
+REFERRAL_SYNC_URL = os.environ.get(
+    "REFERRAL_SYNC_URL", "https://tools.livfinancialgroup.com/referrals/sync"
+)
+REFERRAL_SYNC_TOKEN = os.environ.get("REFERRAL_SYNC_TOKEN", "")
@@ -0,0 +1,168 @@
+"""Referral Sync — exchange referral deltas with the web Agent Toolkit.
+
+Only rows changed since the last sync travel in either direction:
+
+* Push: local rows (and deletions) flagged ``dirty`` by referral_tracker,
+  cleared once the server has taken them.  Rows pulled from the server are
+  stored clean, so they are never echoed back.
+* Pull: server changes after the ``server_watermark`` position the server
+  handed back last time.
+
+Rows are matched by their stable ``uuid``, never by id (ids differ between
+the two databases).  Conflicts go to the last writer by ``updated_at``,
+which both sides stamp in UTC (older local-time stamps are converted when
+the database is opened) and compare as datetimes; ties keep what is
+already stored, so re-sending a change is harmless.
+"""
+
+import requests
+
+from . import referral_tracker
+from .config import REFERRAL_SYNC_TOKEN, REFERRAL_SYNC_URL
+
+SYNC_FIELDS = (
+    "referrer_name", "referred_name", "referred_phone", "referred_email",
+    "date_added", "status", "notes", "premium_sold", "updated_at",
+)
+
+# Changes pushed per request; the server accepts at most 1000.
+BATCH_SIZE = 500
+
+
+class SyncError(Exception):
+    """Raised when the sync server can't be reached or rejects a request."""
+    pass
+
+
+def _get_state(conn, key: str, default: str) -> str:
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_state(conn, key: str, value):
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value))
+    )
+
+
+def local_changes(conn) -> list[dict]:
+    """Rows and tombstones changed locally and not yet pushed, oldest first."""
+    fields = ", ".join(SYNC_FIELDS)
+    rows = conn.execute(
+        f"SELECT uuid, {fields} FROM referrals WHERE dirty = 1 ORDER BY updated_at"
+    ).fetchall()
+    changes = [
+        {"uuid": r[0], "deleted": False, **dict(zip(SYNC_FIELDS, r[1:]))} for r in rows
+    ]
+    tombstones = conn.execute(
+        "SELECT uuid, deleted_at FROM referral_tombstones WHERE dirty = 1 "
+        "ORDER BY deleted_at"
+    ).fetchall()
+    changes += [{"uuid": u, "deleted": True, "updated_at": at} for u, at in tombstones]
+    changes.sort(key=lambda c: c["updated_at"])
+    return changes
+
+
+def mark_pushed(conn, changes: list[dict]):
+    """Clear the dirty flag on pushed changes not edited again since."""
+    rows = [(c["uuid"], c["updated_at"]) for c in changes if not c["deleted"]]
+    deletes = [(c["uuid"], c["updated_at"]) for c in changes if c["deleted"]]
+    conn.executemany(
+        "UPDATE referrals SET dirty = 0 WHERE uuid = ? AND updated_at = ?", rows
+    )
+    conn.executemany(
+        "UPDATE referral_tombstones SET dirty = 0 WHERE uuid = ? AND deleted_at = ?", deletes
+    )
+
+
+def apply_remote(conn, changes: list[dict]) -> int:
+    """Merge server changes into the local database. Returns how many applied."""
+    applied = 0
+    for change in changes:
+        row_uuid = change.get("uuid")
+        stamp = referral_tracker._parse_stamp(change.get("updated_at"))
+        if not row_uuid or stamp is None:
+            continue
+        updated_at = referral_tracker._format_stamp(stamp)
+        current = conn.execute(
+            "SELECT updated_at FROM referrals WHERE uuid = ? "
+            "UNION ALL SELECT deleted_at FROM referral_tombstones WHERE uuid = ?",
+            (row_uuid, row_uuid),
+        ).fetchone()
+        current_stamp = referral_tracker._parse_stamp(current[0]) if current else None
+        if current_stamp is not None and current_stamp >= stamp:
+            continue
+
+        if change.get("deleted"):
+            conn.execute("DELETE FROM referrals WHERE uuid = ?", (row_uuid,))
+            conn.execute(
+                "INSERT OR REPLACE INTO referral_tombstones (uuid, deleted_at, dirty) "
+                "VALUES (?, ?, 0)",
+                (row_uuid, updated_at),
+            )
+        else:
+            values = {f: change.get(f) or "" for f in SYNC_FIELDS}
+            values["updated_at"] = updated_at
+            values["uuid"] = row_uuid
+            conn.execute("DELETE FROM referral_tombstones WHERE uuid = ?", (row_uuid,))
+            conn.execute(
+                f"INSERT INTO referrals (uuid, {', '.join(SYNC_FIELDS)}, dirty) "
+                f"VALUES (:uuid, {', '.join(f':{f}' for f in SYNC_FIELDS)}, 0) "
+                f"ON CONFLICT (uuid) DO UPDATE SET dirty = 0, "
+                f"{', '.join(f'{f} = excluded.{f}' for f in SYNC_FIELDS)}",
+                values,
+            )
+        applied += 1
+    return applied
+
+
+def _post(session, url: str, token: str, payload: dict) -> dict:
+    try:
+        resp = session.post(
+            url, json=payload, headers={"Authorization": f"Bearer {token}"}, timeout=30,
+        )
+    except requests.ConnectionError:
+        raise SyncError("Could not reach the Agent Toolkit. Check your internet connection.")
+    except requests.Timeout:
+        raise SyncError("Referral sync timed out. Try again later.")
+
+    if resp.status_code == 401:
+        raise SyncError("Sync token rejected. Check REFERRAL_SYNC_TOKEN in .env")
+    if resp.status_code == 404:
+        raise SyncError("Referral sync is not enabled on the server.")
+    if resp.status_code != 200:
+        raise SyncError(f"Referral sync failed (HTTP {resp.status_code}): {resp.text}")
+    return resp.json()
+
+
+def sync(url: str = REFERRAL_SYNC_URL, token: str = REFERRAL_SYNC_TOKEN,
+         session=None) -> dict:
+    """Push local changes, pull server changes. Returns ``{"pushed", "pulled"}``.
+
+    ``session`` is anything with a requests-style ``post()``; tests pass a
+    stand-in server.  State is saved after every round trip, so an
+    interrupted sync resumes where it stopped.
+    """
+    if not token:
+        raise SyncError("Referral sync is not configured (set REFERRAL_SYNC_TOKEN in .env)")
+    session = session or requests.Session()
+    conn = referral_tracker._get_conn()
+    try:
+        watermark = int(_get_state(conn, "server_watermark", "0"))
+        outgoing = local_changes(conn)
+        pushed = pulled = 0
+
+        while True:
+            batch, outgoing = outgoing[:BATCH_SIZE], outgoing[BATCH_SIZE:]
+            resp = _post(session, url, token, {"since": watermark, "changes": batch})
+            mark_pushed(conn, batch)
+            pulled += apply_remote(conn, resp.get("changes", []))
+            pushed += len(batch)
+            watermark = resp.get("watermark", watermark)
+            _set_state(conn, "server_watermark", watermark)
+            conn.commit()
+            if not outgoing and not resp.get("more"):
+                break
+    finally:
+        conn.close()
+    return {"pushed": pushed, "pulled": pulled}
@@ -2,8 +2,9 @@
 
 import sqlite3
 import tkinter as tk
+import uuid
 from tkinter import ttk, messagebox
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 from pathlib import Path
 
 from .config import PACKAGE_DIR
@@ -13,6 +14,26 @@ DB_PATH = PACKAGE_DIR / "referrals.db"
 STATUSES = ["New", "Contacted", "Quoted", "Applied", "Sold", "Lost"]
 
 
+def _format_stamp(dt: datetime) -> str:
+    return dt.isoformat(timespec="microseconds")
+
+
+def _utc_now() -> str:
+    """updated_at stamp. Sync compares these with the server's, so both use UTC."""
+    return _format_stamp(datetime.now(timezone.utc))
+
+
+def _parse_stamp(stamp) -> datetime | None:
+    """An updated_at stamp as an aware UTC datetime (naive taken as UTC), or None."""
+    try:
+        dt = datetime.fromisoformat(stamp)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
 def _get_conn() -> sqlite3.Connection:
     """Get a connection to the referrals database, creating it if needed."""
     conn = sqlite3.connect(str(DB_PATH))
@@ -30,21 +51,90 @@ def _get_conn() -> sqlite3.Connection:
             updated_at TEXT NOT NULL
         )
     """)
+    _ensure_sync_schema(conn)
     conn.commit()
     return conn
 
 
+def _ensure_sync_schema(conn: sqlite3.Connection):
+    """Add the uuid/dirty columns and tables that referral_sync.py relies on.
+
+    ``dirty`` marks rows and tombstones changed on this machine and not yet
+    acknowledged by the server; rows pulled from the server are stored clean.
+    """
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(referrals)")}
+    if "uuid" not in columns:
+        conn.execute("ALTER TABLE referrals ADD COLUMN uuid TEXT")
+    if "dirty" not in columns:
+        conn.execute("ALTER TABLE referrals ADD COLUMN dirty INTEGER NOT NULL DEFAULT 1")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_referrals_uuid ON referrals (uuid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_referrals_updated ON referrals (updated_at)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_referrals_dirty ON referrals (updated_at) WHERE dirty = 1"
+    )
+    missing = conn.execute("SELECT id FROM referrals WHERE uuid IS NULL").fetchall()
+    conn.executemany("UPDATE referrals SET uuid = ? WHERE id = ?",
+                     [(uuid.uuid4().hex, r[0]) for r in missing])
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS referral_tombstones (
+            uuid TEXT PRIMARY KEY,
+            deleted_at TEXT NOT NULL,
+            dirty INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(referral_tombstones)")}
+    if "dirty" not in columns:
+        conn.execute(
+            "ALTER TABLE referral_tombstones ADD COLUMN dirty INTEGER NOT NULL DEFAULT 1"
+        )
+    conn.execute("DROP INDEX IF EXISTS idx_referral_tombstones_deleted")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_referral_tombstones_dirty "
+        "ON referral_tombstones (deleted_at) WHERE dirty = 1"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+    _utc_stamps(conn)
+
+
+def _utc_stamps(conn: sqlite3.Connection):
+    """Once per database, rewrite stamps written in local time as UTC.
+
+    Stamps used to be naive ``datetime.now()`` values, which sort (and win
+    sync conflicts) by this machine's offset once mixed with UTC ones.
+    """
+    if conn.execute("SELECT 1 FROM sync_state WHERE key = 'utc_stamps'").fetchone():
+        return
+
+    def utc(stamp):
+        try:
+            dt = datetime.fromisoformat(stamp)
+        except (TypeError, ValueError):
+            return stamp
+        # astimezone() reads a naive value as local time.
+        return _format_stamp(dt.astimezone(timezone.utc))
+
+    rows = conn.execute("SELECT id, updated_at FROM referrals").fetchall()
+    conn.executemany("UPDATE referrals SET updated_at = ? WHERE id = ?",
+                     [(utc(at), row_id) for row_id, at in rows])
+    rows = conn.execute("SELECT uuid, deleted_at FROM referral_tombstones").fetchall()
+    conn.executemany("UPDATE referral_tombstones SET deleted_at = ? WHERE uuid = ?",
+                     [(utc(at), row_uuid) for row_uuid, at in rows])
+    conn.execute("INSERT INTO sync_state (key, value) VALUES ('utc_stamps', '1')")
+
+
 def add_referral(referrer_name: str, referred_name: str, phone: str = "",
                  email: str = "", notes: str = "") -> int:
     """Insert a new referral. Returns the new row id."""
     conn = _get_conn()
-    now = datetime.now().isoformat()
+    now = _utc_now()
     today = date.today().isoformat()
     cur = conn.execute(
-        "INSERT INTO referrals (referrer_name, referred_name, referred_phone, "
+        "INSERT INTO referrals (uuid, referrer_name, referred_name, referred_phone, "
         "referred_email, date_added, status, notes, updated_at) "
-        "VALUES (?, ?, ?, ?, ?, 'New', ?, ?)",
-        (referrer_name, referred_name, phone, email, today, notes, now),
+        "VALUES (?, ?, ?, ?, ?, ?, 'New', ?, ?)",
+        (uuid.uuid4().hex, referrer_name, referred_name, phone, email, today, notes, now),
     )
     conn.commit()
     row_id = cur.lastrowid
@@ -66,15 +156,15 @@ def get_all_referrals() -> list[dict]:
 def update_status(row_id: int, new_status: str, premium: str = ""):
     """Update a referral's status (and optionally premium_sold)."""
     conn = _get_conn()
-    now = datetime.now().isoformat()
+    now = _utc_now()
     if premium:
         conn.execute(
-            "UPDATE referrals SET status=?, premium_sold=?, updated_at=? WHERE id=?",
+            "UPDATE referrals SET status=?, premium_sold=?, updated_at=?, dirty=1 WHERE id=?",
             (new_status, premium, now, row_id),
         )
     else:
         conn.execute(
-            "UPDATE referrals SET status=?, updated_at=? WHERE id=?",
+            "UPDATE referrals SET status=?, updated_at=?, dirty=1 WHERE id=?",
             (new_status, now, row_id),
         )
     conn.commit()
@@ -82,9 +172,16 @@ def update_status(row_id: int, new_status: str, premium: str = ""):
 
 
 def delete_referral(row_id: int):
-    """Delete a referral by id."""
+    """Delete a referral by id, leaving a tombstone so the delete syncs."""
     conn = _get_conn()
+    row = conn.execute("SELECT uuid FROM referrals WHERE id=?", (row_id,)).fetchone()
     conn.execute("DELETE FROM referrals WHERE id=?", (row_id,))
+    if row:
+        conn.execute(
+            "INSERT OR REPLACE INTO referral_tombstones (uuid, deleted_at, dirty) "
+            "VALUES (?, ?, 1)",
+            (row[0], _utc_now()),
+        )
     conn.commit()
     conn.close()
 
@@ -246,6 +343,13 @@ class ReferralTrackerWindow:
             padx=12, relief=tk.FLAT, cursor="hand2",
         ).pack(side=tk.RIGHT)
 
+        self.sync_btn = tk.Button(
+            action_frame, text="Sync", command=self._sync,
+            bg="#0e7fa6", fg="white", font=("Arial", 10, "bold"),
+            padx=12, relief=tk.FLAT, cursor="hand2",
+        )
+        self.sync_btn.pack(side=tk.RIGHT, padx=(0, 8))
+
         # ------ Load data ------
         self._refresh_list()
 
@@ -321,6 +425,25 @@ class ReferralTrackerWindow:
 
         self._refresh_list()
 
+    def _sync(self):
+        from .referral_sync import SyncError, sync
+
+        self.sync_btn.config(state=tk.DISABLED, text="Syncing...")
+        self.win.update_idletasks()
+        try:
+            result = sync()
+        except SyncError as e:
+            messagebox.showerror("Sync Failed", str(e), parent=self.win)
+            return
+        finally:
+            self.sync_btn.config(state=tk.NORMAL, text="Sync")
+        self._refresh_list()
+        messagebox.showinfo(
+            "Sync Complete",
+            f"Sent {result['pushed']} change(s), received {result['pulled']}.",
+            parent=self.win,
+        )
+
     def _show_stats(self):
         stats = get_stats()
 
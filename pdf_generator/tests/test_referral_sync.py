@@ -0,0 +1,175 @@
+"""Unit tests for pdf_generator.referral_sync against a stand-in server."""
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pdf_generator import referral_sync, referral_tracker
+
+
+class StandInServer:
+    """In-memory /referrals/sync: a change log keyed by a sequence number."""
+
+    def __init__(self):
+        self.rows = {}       # uuid -> latest change
+        self.seq = {}        # uuid -> sequence of that change
+        self.clock = 0
+        self.requests = []
+
+    def edit(self, change):
+        self.clock += 1
+        self.rows[change["uuid"]] = change
+        self.seq[change["uuid"]] = self.clock
+
+    def post(self, url, json, headers, timeout):
+        self.requests.append(json)
+        for change in json["changes"]:
+            current = self.rows.get(change["uuid"])
+            if current is None or current["updated_at"] < change["updated_at"]:
+                self.edit(change)
+        newer = sorted((s, u) for u, s in self.seq.items() if s > json["since"])[:2]
+        return mock.Mock(status_code=200, json=lambda: {
+            "changes": [self.rows[u] for _, u in newer],
+            "watermark": newer[-1][0] if newer else json["since"],
+            "more": len(newer) == 2,
+        })
+
+
+class TestReferralSync(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(referral_tracker, "DB_PATH", Path(tmp.name) / "r.db")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = StandInServer()
+
+    def _sync(self):
+        return referral_sync.sync(url="http://stand-in/referrals/sync", token="t",
+                                  session=self.server)
+
+    def _local(self):
+        return {r["referred_name"]: r for r in referral_tracker.get_all_referrals()}
+
+    def test_only_deltas_travel(self):
+        for i in range(5):
+            referral_tracker.add_referral("Bob", f"R{i}")
+        with mock.patch.object(referral_sync, "BATCH_SIZE", 2):
+            self.assertEqual(self._sync(), {"pushed": 5, "pulled": 0})
+        self.assertEqual([len(r["changes"]) for r in self.server.requests], [2, 2, 1])
+        self.assertEqual(len(self.server.rows), 5)
+
+        self.server.requests.clear()
+        self.assertEqual(self._sync(), {"pushed": 0, "pulled": 0})
+        self.assertEqual(self.server.requests, [{"since": 5, "changes": []}])
+
+        referral_tracker.update_status(self._local()["R3"]["id"], "Sold", "$900")
+        self.assertEqual(self._sync()["pushed"], 1)
+        row = self.server.rows[self._local()["R3"]["uuid"]]
+        self.assertEqual((row["status"], row["premium_sold"]), ("Sold", "$900"))
+
+    def test_pulls_server_changes_and_deletes(self):
+        referral_tracker.add_referral("Bob", "Amy")
+        referral_tracker.add_referral("Bob", "Cal")
+        self._sync()
+        amy, cal = self._local()["Amy"], self._local()["Cal"]
+
+        self.server.edit({**self.server.rows[amy["uuid"]], "status": "Quoted",
+                          "updated_at": "2999-01-01T00:00:00"})
+        self.server.edit({"uuid": cal["uuid"], "deleted": True,
+                          "updated_at": "2999-01-01T00:00:00"})
+        self.server.edit({"uuid": "new1", "deleted": False, "referrer_name": "Ann",
+                          "referred_name": "Eve", "referred_phone": "", "referred_email": "",
+                          "date_added": "2026-03-01", "status": "New", "notes": "",
+                          "premium_sold": "", "updated_at": "2999-01-01T00:00:00"})
+        self.assertEqual(self._sync(), {"pushed": 0, "pulled": 3})
+        local = self._local()
+        self.assertEqual(local["Amy"]["status"], "Quoted")
+        self.assertNotIn("Cal", local)
+        self.assertIn("Eve", local)
+        # Pulled rows aren't echoed back on the next sync.
+        self.assertEqual(self._sync(), {"pushed": 0, "pulled": 0})
+
+    def test_pulled_stamps_do_not_hold_back_local_changes(self):
+        # A server row stamped ahead of this machine's clock...
+        self.server.edit({"uuid": "ahead", "deleted": False, "referrer_name": "Ann",
+                          "referred_name": "Eve", "referred_phone": "", "referred_email": "",
+                          "date_added": "2026-03-01", "status": "New", "notes": "",
+                          "premium_sold": "", "updated_at": "2999-01-01T00:00:00"})
+        self.assertEqual(self._sync(), {"pushed": 0, "pulled": 1})
+        # ...must not stop later local edits and deletes from being pushed.
+        referral_tracker.add_referral("Bob", "Amy")
+        self.assertEqual(self._sync()["pushed"], 1)
+        referral_tracker.delete_referral(self._local()["Amy"]["id"])
+        self.assertEqual(self._sync()["pushed"], 1)
+        self.assertEqual(self._sync()["pushed"], 0)
+        stamp = self.server.rows[next(u for u in self.server.rows if u != "ahead")]["updated_at"]
+        self.assertTrue(stamp.endswith("+00:00"), stamp)
+
+    def test_last_writer_wins(self):
+        referral_tracker.add_referral("Bob", "Amy")
+        self._sync()
+        amy = self._local()["Amy"]
+        # An older server edit loses to the local row.
+        self.server.edit({**self.server.rows[amy["uuid"]], "status": "Lost",
+                          "updated_at": "2000-01-01T00:00:00"})
+        self._sync()
+        self.assertEqual(self._local()["Amy"]["status"], "New")
+
+        referral_tracker.delete_referral(amy["id"])
+        self.assertEqual(self._sync()["pushed"], 1)
+        self.assertTrue(self.server.rows[amy["uuid"]]["deleted"])
+
+    def test_local_time_stamps_are_converted_and_compared_as_times(self):
+        # Rows written by the old tracker on a machine in Chicago (UTC-6 in March).
+        patcher = mock.patch.dict(os.environ, {"TZ": "America/Chicago"})
+        patcher.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patcher.stop)
+        time.tzset()
+        old = sqlite3.connect(str(referral_tracker.DB_PATH))
+        old.execute("""
+            CREATE TABLE referrals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, referrer_name TEXT NOT NULL,
+                referred_name TEXT NOT NULL, referred_phone TEXT DEFAULT '',
+                referred_email TEXT DEFAULT '', date_added TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'New', notes TEXT DEFAULT '',
+                premium_sold TEXT DEFAULT '', updated_at TEXT NOT NULL
+            )
+        """)
+        old.execute("INSERT INTO referrals (referrer_name, referred_name, date_added, "
+                    "updated_at) VALUES ('Bob', 'Amy', '2026-03-01', '2026-03-01T10:00:00')")
+        old.commit()
+        old.close()
+
+        amy = self._local()["Amy"]
+        self.assertEqual(amy["updated_at"], "2026-03-01T16:00:00.000000+00:00")
+        # Opening again doesn't shift it a second time.
+        self.assertEqual(self._local()["Amy"]["updated_at"], amy["updated_at"])
+
+        conn = referral_tracker._get_conn()
+        self.addCleanup(conn.close)
+        change = {"uuid": amy["uuid"], "deleted": False, "referrer_name": "Bob",
+                  "referred_name": "Amy", "date_added": "2026-03-01"}
+        # 15:30 UTC sorts after "10:00" as text but is older than the local edit.
+        stale = {**change, "status": "Lost", "updated_at": "2026-03-01T15:30:00+00:00"}
+        self.assertEqual(referral_sync.apply_remote(conn, [stale]), 0)
+        newer = {**change, "status": "Sold", "updated_at": "2026-03-01T11:00:00-06:00"}
+        self.assertEqual(referral_sync.apply_remote(conn, [newer]), 1)
+        conn.commit()
+        amy = self._local()["Amy"]
+        self.assertEqual((amy["status"], amy["updated_at"]),
+                         ("Sold", "2026-03-01T17:00:00.000000+00:00"))
+
+    def test_requires_token(self):
+        with self.assertRaises(referral_sync.SyncError):
+            referral_sync.sync(token="", session=self.server)
+
+
+if __name__ == "__main__":
+    unittest.main()